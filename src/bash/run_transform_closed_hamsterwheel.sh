@@ -1,3 +1,3 @@
 #!/bin/bash
 sleep 2 &&
-/usr/bin/python3 /home/done4/cryptohamster/src/python/transform_closed_hamsterwheel.py
\ No newline at end of file
+/usr/bin/python3 /home/done4/cryptohamster/src/python/transform_closed_hamsterwheel.py --service
\ No newline at end of file
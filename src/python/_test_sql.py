@@ -2,9 +2,9 @@
 In this script the raw_hamsterwheel table is transformed into the closed_hamsterwheel table.
 """
 
-import pymysql
-import pandas as pd
 import logging
+from db_connection import ConnectionManager
+from retention import run_retention
 
 logging.basicConfig(
     format="%(asctime)s,%(msecs)d %(name)s %(levelname)s %(message)s",
@@ -17,33 +17,17 @@ logging.info("Running Logger")
 logger = logging.getLogger()
 
 
-def delete_rows_raw_hamsterwheel(
-    cursor: pymysql.cursors.Cursor,
-    minutes: int,
-) -> None:
-    query = (
-        f"DELETE FROM raw_hamsterwheel WHERE time < NOW() - INTERVAL {minutes} MINUTE;"
-    )
-    cursor.execute(query)
-
-
 if __name__ == "__main__":
+    connection_manager = ConnectionManager()
     try:
-        mysql_connection = pymysql.connect(
-            host="192.168.1.121",
-            user="tiberius",
-            password="q123",
-            db="cryptohamster",
-            port=3306,
-            charset="utf8",
-        )
+        mysql_connection = connection_manager.get_connection()
         # Delete rows from raw_hamsterwheel
-        delete_rows_raw_hamsterwheel(
-            cursor=mysql_connection.cursor(),
+        run_retention(
+            mysql_connection=mysql_connection,
+            table="raw_hamsterwheel",
             minutes=3,
         )
-        mysql_connection.commit()
-        mysql_connection.close()
     except Exception as e:
         logger.error(f"Error connecting to MySQL: {e}")
-        mysql_connection.close()
+    finally:
+        connection_manager.close()
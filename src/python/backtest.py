@@ -0,0 +1,354 @@
+"""
+Replay of recorded hamsterwheel samples through the decision state machine.
+
+The samples are replayed in simulated time with main.decide(), the same step
+the main loop takes, against a simulated wallet and price feed. Orders are
+executed right away at the price of the feed.
+
+The state of the loop only changes when the hamsterwheel starts or stops
+running, every other tick waits or idles. So by default decide() only runs at
+these changes, which are found on the sample arrays at once. With
+every_sample=True it runs at every sample and at every stop, like the live
+loop woken by the logger and by its timeout, which gives the same decisions.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pymysql
+
+from decision_log import DecisionLog
+from domain import Order, Price, PriceSnapshot, WalletEntry, WalletSnapshot
+from main import decide, mockup_price_df, mockup_wallet_df
+from window_store import RUNNING_SECONDS, WindowStore
+
+logger = logging.getLogger()
+
+PRICE_INTERVAL = timedelta(hours=1)
+PRICE_VOLATILITY = 0.01
+
+
+class PriceFeed:
+    """Prices per currency over time, a price holds until the next one."""
+
+    def __init__(self, times: np.ndarray, prices: Dict[str, np.ndarray]) -> None:
+        self.times = np.asarray(times, dtype="datetime64[ns]")
+        self.prices = prices
+        self._index: Optional[int] = None
+        self._snapshot: Optional[PriceSnapshot] = None
+
+    @classmethod
+    def random_walk(
+        cls,
+        start_prices: Dict[str, float],
+        start: datetime,
+        end: datetime,
+        interval: timedelta = PRICE_INTERVAL,
+        volatility: float = PRICE_VOLATILITY,
+        seed: Optional[int] = None,
+    ) -> "PriceFeed":
+        """Prices from start to end that change every interval by a log-normal step."""
+        rng = np.random.default_rng(seed)
+        n = int((end - start) / interval) + 1
+        times = np.datetime64(start, "ns") + np.arange(n) * np.timedelta64(
+            interval
+        ).astype("timedelta64[ns]")
+        prices = {}
+        for currency, price in start_prices.items():
+            steps = rng.normal(0, volatility, size=n)
+            steps[0] = 0
+            prices[currency] = price * np.exp(np.cumsum(steps))
+        return cls(times=times, prices=prices)
+
+    def snapshot(self, at: np.datetime64) -> PriceSnapshot:
+        """The prices at the time at, USD is 1. Built once per price change."""
+        index = max(int(np.searchsorted(self.times, at, side="right")) - 1, 0)
+        if index != self._index:
+            by_currency = {"USD": 1.0}
+            for currency, prices in self.prices.items():
+                by_currency[currency] = float(prices[index])
+            self._snapshot = PriceSnapshot.from_prices(
+                [
+                    Price(id=None, currency=currency, price=price)
+                    for currency, price in by_currency.items()
+                ]
+            )
+            self._index = index
+        return self._snapshot
+
+
+class SimulatedWallet:
+    """Amounts per currency that orders change, with a snapshot per change."""
+
+    def __init__(self, amounts: Dict[str, float]) -> None:
+        self.amounts = dict(amounts)
+        self._ids = {currency: i + 1 for i, currency in enumerate(self.amounts)}
+        self._snapshot: Optional[WalletSnapshot] = None
+
+    @classmethod
+    def from_df(cls, df_wallet: pd.DataFrame) -> "SimulatedWallet":
+        return cls(dict(zip(df_wallet["currency"], df_wallet["amount"].astype(float))))
+
+    def snapshot(self) -> WalletSnapshot:
+        if self._snapshot is None:
+            self._snapshot = WalletSnapshot.from_entries(
+                [
+                    WalletEntry(
+                        id=self._ids[currency], currency=currency, amount=amount
+                    )
+                    for currency, amount in self.amounts.items()
+                    # Like a wallet table, a sold out currency has no row
+                    if amount > 0 or currency == "USD"
+                ]
+            )
+        return self._snapshot
+
+    def execute(self, order: Order) -> None:
+        """Sell the order's fraction (amount) of the currency for USD, or buy the
+        currency for that fraction of the USD, at the order's price."""
+        holding = self.amounts.get(order.currency, 0.0)
+        if order.type == "sell":
+            sold = holding * order.amount
+            self.amounts[order.currency] = holding - sold
+            self.amounts["USD"] = self.amounts.get("USD", 0.0) + sold * order.price
+        elif order.type == "buy":
+            spent = self.amounts.get("USD", 0.0) * order.amount
+            self.amounts["USD"] -= spent
+            self.amounts[order.currency] = (
+                self.amounts.get(order.currency, 0.0) + spent / order.price
+            )
+        self._ids.setdefault(order.currency, len(self._ids) + 1)
+        self._snapshot = None
+
+    def value(self, prices: PriceSnapshot) -> float:
+        """The value of the wallet in USD."""
+        return sum(
+            amount * prices.price(currency) for currency, amount in self.amounts.items()
+        )
+
+
+@dataclass
+class BacktestResult:
+    """The orders, the wallet after every order and the replay throughput."""
+
+    orders: pd.DataFrame
+    wallet_path: pd.DataFrame
+    decisions: int = 0
+    samples: int = 0
+    seconds: float = 0.0
+    broke: bool = False
+    steps: int = 0
+
+    @property
+    def samples_per_second(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return self.samples / self.seconds
+
+
+def get_running_changes(
+    times: np.ndarray, magnets: np.ndarray, seconds: int = RUNNING_SECONDS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Times at which the hamsterwheel starts and stops running, and whether it
+    runs from then on. It runs while there was a closed sample in the last
+    seconds (WindowStore.is_running), so it starts at a closed sample after a
+    pause of more than seconds and stops seconds after the last closed sample."""
+    closed_times = np.asarray(times, dtype="datetime64[ns]")[np.asarray(magnets) == 0]
+    if len(closed_times) == 0:
+        return np.array([], dtype="datetime64[ns]"), np.array([], dtype=bool)
+    pause = np.diff(closed_times) > np.timedelta64(seconds, "s")
+    starts = np.concatenate([closed_times[:1], closed_times[1:][pause]])
+    stops = np.concatenate([closed_times[:-1][pause], closed_times[-1:]])
+    stops = stops + np.timedelta64(seconds, "s")
+    # Starts and stops alternate, beginning with a start
+    change_times = np.empty(2 * len(starts), dtype="datetime64[ns]")
+    change_times[0::2], change_times[1::2] = starts, stops
+    running = np.zeros(2 * len(starts), dtype=bool)
+    running[0::2] = True
+    return change_times, running
+
+
+def get_step_times(
+    times: np.ndarray, magnets: np.ndarray, every_sample: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Times of the simulated ticks and whether the hamsterwheel runs at each."""
+    change_times, running = get_running_changes(times, magnets)
+    if not every_sample:
+        return change_times, running
+    times = np.asarray(times, dtype="datetime64[ns]")
+    stops = change_times[~running]
+    step_times = np.union1d(times, stops)
+    # The last change at or before a tick tells whether it runs
+    index = np.searchsorted(change_times, step_times, side="right") - 1
+    step_running = np.where(index >= 0, running[np.maximum(index, 0)], False)
+    return step_times, step_running
+
+
+def run_backtest(
+    times: np.ndarray,
+    magnets: np.ndarray,
+    wallet: SimulatedWallet,
+    price_feed: PriceFeed,
+    every_sample: bool = False,
+) -> BacktestResult:
+    """Replay the samples (time order) through decide() and execute the orders."""
+    start = time.perf_counter()
+    times = np.asarray(times, dtype="datetime64[ns]")
+    orders: List[Dict] = []
+    wallet_path: List[Dict] = []
+    result = BacktestResult(orders=pd.DataFrame(), wallet_path=pd.DataFrame())
+    if len(times) == 0:
+        return result
+    window_store = WindowStore(capacity=len(times))
+    window_store.append(times, magnets)
+    decision_log = DecisionLog()
+    step_times, step_running = get_step_times(times, magnets, every_sample)
+    # Stops after the end of the recording did not happen yet
+    in_history = step_times <= times[-1]
+    wallet_path.append(
+        {
+            "time": times[0],
+            **wallet.amounts,
+            "value": wallet.value(price_feed.snapshot(times[0])),
+        }
+    )
+    for step_time, is_running in zip(
+        step_times[in_history].tolist(), step_running[in_history].tolist()
+    ):
+        # datetime64[ns] values come out of tolist() as int nanoseconds
+        step_time = np.datetime64(step_time, "ns")
+        prices = price_feed.snapshot(step_time)
+        step = decide(
+            now=pd.Timestamp(step_time).to_pydatetime(),
+            is_running=is_running,
+            decision_log=decision_log,
+            wallet=wallet.snapshot(),
+            prices=prices,
+            count_turns=window_store.turns_between,
+        )
+        result.steps += 1
+        if step.action == "broke":
+            result.broke = True
+            break
+        if step.order is not None:
+            wallet.execute(step.order)
+            orders.append(
+                {
+                    "time": step_time,
+                    **{f: getattr(step.order, f) for f in Order.__slots__},
+                }
+            )
+            wallet_path.append(
+                {"time": step_time, **wallet.amounts, "value": wallet.value(prices)}
+            )
+    result.orders = pd.DataFrame(orders, columns=["time"] + list(Order.__slots__))
+    result.wallet_path = pd.DataFrame(wallet_path)
+    result.decisions = len(decision_log)
+    result.samples = len(times)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def generate_history(
+    days: float,
+    rate_hz: float = 1.0,
+    run_minutes: float = 3.0,
+    rest_minutes: float = 30.0,
+    seed: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Samples of a hamster that runs for about run_minutes and then rests
+    for about rest_minutes (exponentially distributed), with an open magnet
+    while it rests."""
+    from synthetic_workload import generate_samples
+
+    rng = np.random.default_rng(seed)
+    duration_s = days * 24 * 3600
+    # The magnet is closed for half a turn, so 1 Hz samples see most turns
+    times, magnets = generate_samples(
+        rate_hz=rate_hz, duration_s=duration_s, closed_fraction=0.5, seed=seed
+    )
+    n_periods = int(duration_s / 60 / (run_minutes + rest_minutes) * 2) + 2
+    lengths = np.empty(2 * n_periods)
+    lengths[0::2] = rng.exponential(rest_minutes * 60, size=n_periods)
+    lengths[1::2] = rng.exponential(run_minutes * 60, size=n_periods)
+    period = np.searchsorted(
+        np.cumsum(lengths), np.arange(len(times)) / rate_hz, side="right"
+    )
+    # Even periods are rests
+    magnets[period % 2 == 0] = 1
+    return times, magnets
+
+
+def read_history(
+    mysql_connection: pymysql.connections.Connection, start: str, end: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Samples of raw_hamsterwheel with start <= time < end."""
+    df = pd.read_sql(
+        sql="SELECT time, magnet FROM raw_hamsterwheel "
+        "WHERE time >= %s AND time < %s ORDER BY time",
+        con=mysql_connection,
+        params=(start, end),
+    )
+    return pd.to_datetime(df["time"]).values, df["magnet"].to_numpy(dtype=np.uint8)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Replay hamsterwheel samples through the decision logic."
+    )
+    parser.add_argument("--days", type=float, default=7, help="Days of synthetic data")
+    parser.add_argument("--rate-hz", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--from-db", action="store_true", help="Replay raw_hamsterwheel instead"
+    )
+    parser.add_argument("--start", help="Start time of the replay with --from-db")
+    parser.add_argument("--end", help="End time of the replay with --from-db")
+    parser.add_argument(
+        "--every-sample", action="store_true", help="Take a step at every sample"
+    )
+    args = parser.parse_args()
+    # The decision logic logs every step
+    logger.setLevel(logging.WARNING)
+
+    if args.from_db:
+        from db_connection import ConnectionManager
+
+        connection_manager = ConnectionManager()
+        times, magnets = read_history(
+            connection_manager.get_connection(), start=args.start, end=args.end
+        )
+        connection_manager.close()
+    else:
+        times, magnets = generate_history(
+            days=args.days, rate_hz=args.rate_hz, seed=args.seed
+        )
+    start_time = pd.Timestamp(times[0]).to_pydatetime()
+    price_feed = PriceFeed.random_walk(
+        start_prices=dict(zip(mockup_price_df["currency"], mockup_price_df["price"])),
+        start=start_time,
+        end=pd.Timestamp(times[-1]).to_pydatetime(),
+        seed=args.seed,
+    )
+    result = run_backtest(
+        times=times,
+        magnets=magnets,
+        wallet=SimulatedWallet.from_df(mockup_wallet_df),
+        price_feed=price_feed,
+        every_sample=args.every_sample,
+    )
+    pd.options.display.width = 200
+    print(f"Orders:\n{result.orders}")
+    print(f"Wallet path:\n{result.wallet_path}")
+    print(
+        f"{result.samples} samples, {result.steps} steps, {result.decisions} decisions, "
+        f"{len(result.orders)} orders{' (broke)' if result.broke else ''} in "
+        f"{result.seconds:.2f} s ({result.samples_per_second:.0f} samples/s)"
+    )
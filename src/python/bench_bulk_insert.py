@@ -0,0 +1,75 @@
+"""
+Benchmark of writing rows to raw_hamsterwheel: one INSERT and commit per row vs bulk_insert().
+
+A SQLite file database is used as a local stand-in for MySQL, so each commit
+costs a sync to disk like it does on the MySQL server.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from bulk_insert import bulk_insert
+from sqlite_database import create_connection
+
+ROW_COUNTS = [10, 1_000, 100_000]
+# The per-row path commits every row, above this many rows it is timed on a sample only
+MAX_PER_ROW = 10_000
+
+
+def create_df(n: int) -> pd.DataFrame:
+    times = pd.date_range("2023-08-08 13:00:00", periods=n, freq="1s")
+    return pd.DataFrame(
+        {
+            "hash": [f"{i:032x}" for i in range(n)],
+            "time": times.astype(str),
+            "magnet": [i % 2 for i in range(n)],
+        }
+    )
+
+
+def insert_per_row(connection: sqlite3.Connection, df: pd.DataFrame) -> None:
+    """The insert path before bulk_insert(), one query and commit per row."""
+    cursor = connection.cursor()
+    for index, row in df.iterrows():
+        time = row["time"]
+        magnet = row["magnet"]
+        hash = row["hash"]
+        query = f"INSERT INTO raw_hamsterwheel (hash, time, magnet) VALUES ('{hash}', '{time}', {magnet})"
+        cursor.execute(query)
+        connection.commit()
+
+
+if __name__ == "__main__":
+    chunk_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"chunk_size={chunk_size}")
+    print(f"{'rows':>8} {'per-row [rows/s]':>18} {'bulk [rows/s]':>15} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, "bench.sqlite")
+        for n in ROW_COUNTS:
+            df = create_df(n)
+
+            connection = create_connection(file_name)
+            n_per_row = min(n, MAX_PER_ROW)
+            start = time.perf_counter()
+            insert_per_row(connection, df.iloc[:n_per_row])
+            per_row = n_per_row / (time.perf_counter() - start)
+            connection.close()
+
+            connection = create_connection(file_name)
+            result = bulk_insert(
+                connection=connection,
+                table="raw_hamsterwheel",
+                df=df,
+                columns=["hash", "time", "magnet"],
+                chunk_size=chunk_size,
+                dialect="sqlite",
+            )
+            connection.close()
+            print(
+                f"{n:>8} {per_row:>18.0f} {result.rows_per_second:>15.0f} {result.rows_per_second / per_row:>8.1f}x"
+            )
@@ -0,0 +1,97 @@
+"""
+Benchmark of the per-tick decision reads with a long decision history: the
+latest decision and the current cycle from the whole decision table
+(get_latest_decision and get_decision_cycle) vs from the DecisionLog, which
+is loaded once and then only syncs the open and new decisions.
+"""
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.WARNING)
+
+from decision_log import DecisionLog  # noqa: E402
+from main import DECISION_LIST  # noqa: E402
+from repository import InMemoryRepository  # noqa: E402
+
+N_DECISIONS = 1_000_000
+N_TICKS = 20
+
+
+# The DataFrame versions the loop used before the DecisionLog
+def get_latest_decision(df_decision):
+    if df_decision is not None:
+        df_decision = df_decision.sort_values(by="start_time", ascending=False)
+        return df_decision.iloc[[0]]
+    return None
+
+
+def get_decision_cycle(df_decision):
+    if df_decision is not None:
+        buy_or_sell_filter = df_decision["type"] == "buy_or_sell"
+        df_buy_or_sell = df_decision[buy_or_sell_filter]
+        df_buy_or_sell = df_buy_or_sell.sort_values(by="start_time", ascending=False)
+        last_buy_or_sell_index = df_buy_or_sell.iloc[[0]].index[0]
+        return df_decision.iloc[last_buy_or_sell_index:]
+    return None
+
+
+def create_df_decision(n: int) -> pd.DataFrame:
+    start_times = pd.Timestamp("2023-01-01") + pd.to_timedelta(
+        np.arange(n) * 10, unit="s"
+    )
+    types = np.array(DECISION_LIST)[np.arange(n) % len(DECISION_LIST)]
+    status = np.full(n, "closed", dtype=object)
+    status[-1] = "open"
+    return pd.DataFrame(
+        {
+            "id": np.arange(1, n + 1),
+            "start_time": start_times.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "end_time": None,
+            "type": types,
+            "number_hamsterwheel_turns": 1,
+            "status": status,
+            "result": None,
+        }
+    )
+
+
+if __name__ == "__main__":
+    df_decision = create_df_decision(N_DECISIONS)
+    repository = InMemoryRepository(
+        df_raw_hamsterwheel=pd.DataFrame(),
+        df_decision=df_decision,
+        df_wallet=pd.DataFrame(),
+        df_price=pd.DataFrame(),
+    )
+
+    start = time.perf_counter()
+    for _ in range(N_TICKS):
+        df_decision_latest = get_latest_decision(df_decision)
+        df_decision_cycle = get_decision_cycle(df_decision)
+    table_seconds = (time.perf_counter() - start) / N_TICKS
+
+    decision_log = DecisionLog()
+    start = time.perf_counter()
+    decision_log.sync(repository)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(N_TICKS):
+        repository.start_tick()
+        decision_log.sync(repository)
+        decision_latest = decision_log.latest()
+        decision_cycle = decision_log.cycle()
+    log_seconds = (time.perf_counter() - start) / N_TICKS
+
+    assert decision_latest.id == df_decision_latest["id"].values[0]
+    assert [decision.id for decision in decision_cycle] == (
+        df_decision_cycle["id"].tolist()
+    )
+    print(f"{N_DECISIONS} decisions")
+    print(f"{'whole table per tick':>24}: {table_seconds * 1e3:>10.3f} ms")
+    print(f"{'decision log load':>24}: {load_seconds * 1e3:>10.3f} ms (once)")
+    print(f"{'decision log per tick':>24}: {log_seconds * 1e3:>10.3f} ms")
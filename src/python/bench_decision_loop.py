@@ -0,0 +1,203 @@
+"""
+Benchmark of the decision loop on one-row DataFrames vs slotted domain
+objects: decision cycles (open, close, order) per second of the decision
+logic, without the database reads and the sleeps of the main loop.
+"""
+
+import logging
+import time
+
+logging.basicConfig(level=logging.WARNING)
+
+import main  # noqa: E402
+import pandas as pd  # noqa: E402
+from bench_snapshot import (  # noqa: E402
+    get_currencies_to_sell_df,
+    get_price_df,
+    get_wallet_id_df,
+    has_crypto_df,
+    has_money_df,
+)
+from domain import (  # noqa: E402
+    Decision,
+    PriceSnapshot,
+    SnapshotCache,
+    WalletSnapshot,
+    decision_from_df,
+    decisions_from_df,
+    to_df,
+)
+
+N_CYCLES = 500
+END_TIME = "2023-08-03 12:00:09.000000"
+# The results the amount decision needs from the earlier decisions of the cycle
+CYCLE_RESULTS = {"buy_or_sell": "sell", "currency": "BTC"}
+
+
+# The DataFrame versions the loop used before the domain objects, main's
+# DataFrame functions are wrappers over the domain versions now
+def is_decision_open_df(df_decision_latest) -> bool:
+    if df_decision_latest is not None:
+        if "open" in df_decision_latest["status"].values:
+            return True
+    return False
+
+
+def get_next_decision_df(df_decision_latest, decisions=main.DECISION_LIST) -> str:
+    if df_decision_latest is not None:
+        current_decision = df_decision_latest["type"].values[0]
+        next_decision_index = decisions.index(current_decision) + 1
+        if next_decision_index >= len(decisions):
+            next_decision_index = 0
+        return decisions[next_decision_index]
+    return decisions[0]
+
+
+def close_decision_df(
+    df_decision_latest,
+    df_decision_cycle,
+    number_hamsterwheel_turns,
+    end_time,
+    df_wallet,
+):
+    main.save_log(message=f"Closing decision: {df_decision_latest}")
+    df_decision_latest["end_time"] = end_time
+    df_decision_latest["status"] = "closed"
+    df_decision_latest["number_hamsterwheel_turns"] = number_hamsterwheel_turns
+    current_decision = df_decision_latest["type"].values[0]
+    if current_decision == "buy_or_sell":
+        result = main.get_result_buy_or_sell(number_hamsterwheel_turns)
+        if has_money_df(df_wallet) and not has_crypto_df(df_wallet):
+            result = "buy"
+        if not has_money_df(df_wallet) and has_crypto_df(df_wallet):
+            result = "sell"
+    elif current_decision == "currency":
+        if main.get_buy_or_sell_decision(df_decision_cycle) == "sell":
+            currency_list = get_currencies_to_sell_df(df_wallet=df_wallet)
+        if main.get_buy_or_sell_decision(df_decision_cycle) == "buy":
+            currency_list = ["USD"]
+        result = main.get_result_currency(
+            number_hamsterwheel_turns=number_hamsterwheel_turns,
+            currency_list=currency_list,
+        )
+    elif current_decision == "amount":
+        result = main.get_result_amount(number_hamsterwheel_turns)
+    df_decision_latest["result"] = result
+    main.update_decision(df_decision_latest)
+    return df_decision_latest
+
+
+def prepare_order_df(df_decision_closed, df_decision_cycle, df_wallet, df_price):
+    currency_decision = main.get_currency_decision(df_decision_cycle=df_decision_cycle)
+    return pd.DataFrame(
+        {
+            "wallet_id": [
+                get_wallet_id_df(currency=currency_decision, df_wallet=df_wallet)
+            ],
+            "type": [
+                main.get_buy_or_sell_decision(df_decision_cycle=df_decision_cycle)
+            ],
+            "currency": [currency_decision],
+            "amount": [df_decision_closed["result"].values[0]],
+            "price": [get_price_df(currency=currency_decision, df_price=df_price)],
+            "state": ["pending"],
+        }
+    )
+
+
+def run_dataframes(df_wallet, df_price) -> None:
+    df_decision_latest = None
+    df_decisions = []
+    for _ in range(N_CYCLES * len(main.DECISION_LIST)):
+        has_money_df(df_wallet)
+        has_crypto_df(df_wallet)
+        is_decision_open_df(df_decision_latest)
+        next_decision = get_next_decision_df(df_decision_latest)
+        # The one-row DataFrame save_new_decision used to build
+        df_decision_latest = to_df(Decision, [main.save_new_decision(next_decision)])
+        if next_decision == "buy_or_sell":
+            df_decisions = []
+        df_decisions.append(df_decision_latest)
+        df_decision_cycle = pd.concat(df_decisions, ignore_index=True)
+        df_decision_latest = close_decision_df(
+            df_decision_latest=df_decision_latest,
+            df_decision_cycle=df_decision_cycle,
+            number_hamsterwheel_turns=3,
+            end_time=END_TIME,
+            df_wallet=df_wallet,
+        )
+        df_decision_latest["result"] = CYCLE_RESULTS.get(
+            next_decision, df_decision_latest["result"].values[0]
+        )
+        if next_decision == "amount":
+            prepare_order_df(
+                df_decision_closed=df_decision_latest,
+                df_decision_cycle=df_decision_cycle,
+                df_wallet=df_wallet,
+                df_price=df_price,
+            )
+
+
+def run_objects(wallet, prices) -> None:
+    decision_latest = None
+    decision_cycle = []
+    for _ in range(N_CYCLES * len(main.DECISION_LIST)):
+        wallet.has_money
+        wallet.has_crypto
+        main.decision_is_open(decision_latest)
+        next_decision = main.get_next_decision_type(decision_latest)
+        decision_latest = main.save_new_decision(next_decision)
+        if next_decision == "buy_or_sell":
+            decision_cycle = []
+        decision_cycle.append(decision_latest)
+        main.finish_decision(
+            decision_latest=decision_latest,
+            decision_cycle=decision_cycle,
+            number_hamsterwheel_turns=3,
+            end_time=END_TIME,
+            wallet=wallet,
+        )
+        decision_latest.result = CYCLE_RESULTS.get(
+            next_decision, decision_latest.result
+        )
+        if next_decision == "amount":
+            main.create_order(
+                decision_closed=decision_latest,
+                decision_cycle=decision_cycle,
+                wallet=wallet,
+                prices=prices,
+            )
+
+
+if __name__ == "__main__":
+    # The decision logic logs every step, only the logic is measured
+    main.logger.setLevel(logging.WARNING)
+    df_wallet, df_price = main.mockup_wallet_df, main.mockup_price_df
+    n_ticks = N_CYCLES * len(main.DECISION_LIST)
+
+    start = time.perf_counter()
+    run_dataframes(df_wallet, df_price)
+    dataframe_rate = n_ticks / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    # The conversion at the I/O boundary happens once per tick in the loop, the
+    # wallet and price rows are compared and only converted when they change
+    wallet_snapshots = SnapshotCache(WalletSnapshot.from_df)
+    price_snapshots = SnapshotCache(PriceSnapshot.from_df)
+    for _ in range(n_ticks):
+        wallet = wallet_snapshots.get(df_wallet.copy())
+        prices = price_snapshots.get(df_price.copy())
+        decision_from_df(None), decisions_from_df(None)
+    conversion_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    run_objects(wallet, prices)
+    object_seconds = time.perf_counter() - start
+    object_rate = n_ticks / object_seconds
+
+    print(f"{n_ticks} decision ticks")
+    print(f"{'dataframes':>22}: {dataframe_rate:>10.0f} ticks/s")
+    print(f"{'objects':>22}: {object_rate:>10.0f} ticks/s")
+    print(
+        f"{'objects + conversion':>22}: "
+        f"{n_ticks / (object_seconds + conversion_seconds):>10.0f} ticks/s"
+    )
@@ -0,0 +1,49 @@
+"""
+Benchmark of the decision rules on many turn counts: the scalar get_result_*
+functions called once per turn count vs the get_results_* functions on an
+array of them. The turn counts grow with the number of decisions, like a long
+backtest with hypothetical turn counts would have.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+logging.basicConfig(level=logging.WARNING)
+
+import main  # noqa: E402
+
+DECISION_COUNTS = [1_000, 100_000, 1_000_000]
+CURRENCY_LIST = ["BTC", "ETH", "DOGE", "ADA", "AVAX", "XRP"]
+
+
+def evaluate_scalar(turns: list) -> None:
+    for n in turns:
+        main.get_result_buy_or_sell(n)
+        main.get_result_currency(n, CURRENCY_LIST)
+        main.get_result_amount(n)
+
+
+def evaluate_arrays(turns: np.ndarray) -> None:
+    main.get_results_buy_or_sell(turns)
+    main.get_results_currency(turns, CURRENCY_LIST)
+    main.get_results_amount(turns)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(
+        f"{'decisions':>10} {'scalar [decisions/s]':>21} {'arrays [decisions/s]':>21}"
+    )
+    for n_decisions in DECISION_COUNTS:
+        turns = rng.integers(0, 10 * n_decisions, size=n_decisions)
+        # The scalar functions are slow, so they run on a sample at most
+        scalar_turns = turns[:100_000].tolist()
+        start = time.perf_counter()
+        evaluate_scalar(scalar_turns)
+        scalar_rate = len(scalar_turns) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        evaluate_arrays(turns)
+        array_rate = n_decisions / (time.perf_counter() - start)
+        print(f"{n_decisions:>10} {scalar_rate:>21.0f} {array_rate:>21.0f}")
@@ -0,0 +1,57 @@
+"""
+Benchmark of add_hash_column(): the row-wise apply() it used before vs the "md5"
+(compatible) and "fast" (vectorized) modes.
+"""
+
+import hashlib
+import logging
+import time
+
+import pandas as pd
+
+logging.basicConfig(level=logging.WARNING)
+
+from logger import add_hash_column  # noqa: E402
+
+ROW_COUNTS = [1_000, 10_000, 100_000, 1_000_000]
+# The row-wise apply() takes minutes for more rows than this
+MAX_APPLY = 100_000
+
+
+def create_df(n: int) -> pd.DataFrame:
+    times = pd.date_range("2023-08-08 13:00:00.000001", periods=n, freq="1s")
+    return pd.DataFrame(
+        {"time": times.astype(str), "magnet": [str(i % 2) for i in range(n)]}
+    )
+
+
+def add_hash_column_apply(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """The hashing before the vectorized modes, one Series and MD5 per row."""
+    df["hash"] = (
+        df[columns]
+        .astype(str)
+        .apply(lambda x: hashlib.md5(x.to_string().encode()).hexdigest(), axis=1)
+    )
+    return df
+
+
+def time_it(function, df: pd.DataFrame) -> float:
+    start = time.perf_counter()
+    function(df.copy())
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    columns = ["time", "magnet"]
+    print(f"{'rows':>9} {'apply [s]':>10} {'md5 [s]':>9} {'fast [s]':>9}")
+    for n in ROW_COUNTS:
+        df = create_df(n)
+        if n <= MAX_APPLY:
+            apply_s = (
+                f"{time_it(lambda d: add_hash_column_apply(d, columns), df):>10.3f}"
+            )
+        else:
+            apply_s = f"{'-':>10}"
+        md5_s = time_it(lambda d: add_hash_column(d, columns, mode="md5"), df)
+        fast_s = time_it(lambda d: add_hash_column(d, columns, mode="fast"), df)
+        print(f"{n:>9} {apply_s} {md5_s:>9.3f} {fast_s:>9.3f}")
@@ -0,0 +1,163 @@
+"""
+Benchmark suite for the ingest path of logger.py and transform_closed_hamsterwheel.py.
+
+For every rate and number of wheels, synthetic log lines are appended to one
+file per wheel every (simulated) second. Each tick reads the new lines with
+LogFollower, parses, hashes and dedupes them and inserts them into a SQLite
+stand-in for raw_hamsterwheel. Then the closed samples are moved to
+closed_hamsterwheel like the transform does.
+
+The p50/p99 tick latency and rows/s are printed and saved as JSON, e.g.
+
+    python bench_ingest.py --rates 1 100 1000 10000 --wheels 1 4 --output results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+logging.basicConfig(level=logging.WARNING)
+
+from bulk_insert import bulk_insert  # noqa: E402
+from logger import LogFollower, RecentKeys, lines_to_df  # noqa: E402
+from sqlite_database import create_connection  # noqa: E402
+from synthetic_workload import (  # noqa: E402
+    START_TIME,
+    format_lines,
+    generate_samples,
+    get_wheel_file_name,
+)
+from transform_closed_hamsterwheel import filter_on_closed  # noqa: E402
+
+COLUMNS = ["hash", "time", "magnet"]
+
+
+def run_case(directory: str, rate_hz: float, n_wheels: int, ticks: int) -> Dict:
+    """Run ticks ticks of one simulated second each, return the measured stats."""
+    connection = create_connection(
+        os.path.join(directory, f"bench_{rate_hz}_{n_wheels}.sqlite")
+    )
+    file_names = [get_wheel_file_name(directory, wheel) for wheel in range(n_wheels)]
+    for file_name in file_names:
+        open(file_name, "w").close()
+    followers = [
+        LogFollower(get_file_name=lambda f=file_name: f) for file_name in file_names
+    ]
+    wheel_lines = []
+    for wheel in range(n_wheels):
+        # Shift the wheels by a microsecond, the hash of equal samples would be equal
+        times, magnets = generate_samples(
+            rate_hz=rate_hz,
+            duration_s=ticks,
+            start_time=START_TIME + timedelta(microseconds=wheel),
+            seed=wheel,
+        )
+        wheel_lines.append(format_lines(times, magnets))
+    per_tick = int(rate_hz)
+    recent_keys = RecentKeys(max_size=max(1000, 2 * per_tick * n_wheels))
+
+    stage_seconds = {"read": 0.0, "parse": 0.0, "dedupe": 0.0, "insert": 0.0}
+    tick_seconds = []
+    rows = 0
+    for tick in range(ticks):
+        for file_name, lines in zip(file_names, wheel_lines):
+            with open(file_name, "a") as f:
+                f.writelines(lines[tick * per_tick : (tick + 1) * per_tick])
+
+        start = time.perf_counter()
+        lines = []
+        for follower in followers:
+            lines += follower.read_new_lines()
+        t_read = time.perf_counter()
+        df = lines_to_df(lines)
+        t_parse = time.perf_counter()
+        df = recent_keys.remove_known(df=df, compare_col="hash")
+        recent_keys.add(df["hash"])
+        t_dedupe = time.perf_counter()
+        bulk_insert(
+            connection=connection,
+            table="raw_hamsterwheel",
+            df=df,
+            columns=COLUMNS,
+            dialect="sqlite",
+            ignore_duplicates=True,
+        )
+        bulk_insert(
+            connection=connection,
+            table="closed_hamsterwheel",
+            df=filter_on_closed(df),
+            columns=COLUMNS,
+            dialect="sqlite",
+            ignore_duplicates=True,
+        )
+        end = time.perf_counter()
+
+        stage_seconds["read"] += t_read - start
+        stage_seconds["parse"] += t_parse - t_read
+        stage_seconds["dedupe"] += t_dedupe - t_parse
+        stage_seconds["insert"] += end - t_dedupe
+        tick_seconds.append(end - start)
+        rows += len(df)
+
+    for follower in followers:
+        follower.close()
+    connection.close()
+    tick_ms = np.array(tick_seconds) * 1e3
+    return {
+        "rate_hz": rate_hz,
+        "wheels": n_wheels,
+        "ticks": ticks,
+        "rows": rows,
+        "tick_p50_ms": float(np.percentile(tick_ms, 50)),
+        "tick_p99_ms": float(np.percentile(tick_ms, 99)),
+        "rows_per_second": rows / sum(tick_seconds),
+        "stage_seconds": stage_seconds,
+    }
+
+
+def run_suite(rates: List[float], wheels: List[int], ticks: int) -> List[Dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rate_hz in rates:
+            for n_wheels in wheels:
+                result = run_case(directory, rate_hz, n_wheels, ticks)
+                print(
+                    f"{rate_hz:>8.0f} Hz {n_wheels:>3} wheels: "
+                    f"p50 {result['tick_p50_ms']:8.2f} ms, "
+                    f"p99 {result['tick_p99_ms']:8.2f} ms, "
+                    f"{result['rows_per_second']:10.0f} rows/s"
+                )
+                results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--wheels", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    args = parser.parse_args()
+
+    results = run_suite(rates=args.rates, wheels=args.wheels, ticks=args.ticks)
+    output = args.output or f"bench_ingest_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "created": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Saved results to {output}")
@@ -0,0 +1,54 @@
+"""
+Benchmark of reading the hourly log file per tick: read_last_n_lines() vs LogFollower.
+
+The file grows by a few lines per tick (like the sensor does at ~1 Hz). The cost
+of read_last_n_lines() grows with the file size, the cost of LogFollower stays flat.
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+logging.basicConfig(level=logging.WARNING)
+
+from logger import LogFollower, read_last_n_lines  # noqa: E402
+
+LINE = "2023-08-08 13:59:59.763742 - 0\n"
+LINES_PER_TICK = 2
+TICKS = 200
+FILE_SIZES = [1_000, 10_000, 100_000]
+
+
+def time_ticks(file_name: str, read_tick) -> float:
+    """Append LINES_PER_TICK lines and call read_tick() TICKS times, return us per tick."""
+    elapsed = 0.0
+    for _ in range(TICKS):
+        with open(file_name, "a") as f:
+            f.write(LINE * LINES_PER_TICK)
+        start = time.perf_counter()
+        read_tick()
+        elapsed += time.perf_counter() - start
+    return elapsed / TICKS * 1e6
+
+
+if __name__ == "__main__":
+    print(
+        f"{'lines in file':>14} {'read_last_n_lines [us/tick]':>28} {'LogFollower [us/tick]':>22}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, "log.log")
+        for n_lines in FILE_SIZES:
+            with open(file_name, "w") as f:
+                f.write(LINE * n_lines)
+            us_full = time_ticks(
+                file_name, lambda: read_last_n_lines(file_name=file_name, n=20)
+            )
+
+            with open(file_name, "w") as f:
+                f.write(LINE * n_lines)
+            follower = LogFollower(get_file_name=lambda: file_name, n_initial_lines=20)
+            follower.read_new_lines()
+            us_follow = time_ticks(file_name, follower.read_new_lines)
+            follower.close()
+            print(f"{n_lines:>14} {us_full:>28.1f} {us_follow:>22.1f}")
@@ -0,0 +1,74 @@
+"""
+Benchmark of the delay from a change to the wake-up of the main loop: a
+sender thread makes changes at random times, which the listener waits for
+as notifications, compared with a loop that polls for them every 0.5
+seconds like the main loop did.
+"""
+
+import random
+import threading
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from notifications import TOPIC_SAMPLES, ChangeListener, Notifier
+
+N_NOTIFICATIONS = 200
+POLL_INTERVAL = 0.5
+
+
+def send(sent_at: list, notify: Callable[[], None] = lambda: None) -> None:
+    for _ in range(N_NOTIFICATIONS):
+        time.sleep(random.uniform(0.001, 0.01))
+        sent_at.append(time.perf_counter())
+        notify()
+
+
+def measure_notifications() -> List[float]:
+    listener = ChangeListener(address=("127.0.0.1", 0))
+    notifier = Notifier(address=listener.address)
+    sent_at, delays = [], []
+    sender = threading.Thread(
+        target=send, args=(sent_at, lambda: notifier.notify(TOPIC_SAMPLES))
+    )
+    sender.start()
+    while len(delays) < N_NOTIFICATIONS:
+        wake_up = listener.wait(timeout=1.0)
+        if wake_up.timed_out:
+            break
+        # A wake-up can stand for several notifications, the oldest waited longest
+        n_new = min(len(sent_at), N_NOTIFICATIONS) - len(delays)
+        for sent in sent_at[len(delays) : len(delays) + n_new]:
+            delays.append(wake_up.woke_at - sent)
+    sender.join()
+    notifier.close()
+    listener.close()
+    return delays
+
+
+def measure_polling() -> List[float]:
+    sent_at, delays = [], []
+    sender = threading.Thread(target=send, args=(sent_at,))
+    sender.start()
+    while len(delays) < N_NOTIFICATIONS:
+        time.sleep(POLL_INTERVAL)
+        # Every change since the last poll is seen at this one
+        woke_at = time.perf_counter()
+        for sent in sent_at[len(delays) :]:
+            delays.append(woke_at - sent)
+    sender.join()
+    return delays
+
+
+if __name__ == "__main__":
+    print(f"{N_NOTIFICATIONS} changes")
+    for name, measure in [
+        ("notification", measure_notifications),
+        ("polling", measure_polling),
+    ]:
+        delays_ms = np.array(measure()) * 1e3
+        print(
+            f"{name:>14}: mean {delays_ms.mean():>8.3f} ms, "
+            f"p99 {np.percentile(delays_ms, 99):>8.3f} ms"
+        )
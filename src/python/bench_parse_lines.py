@@ -0,0 +1,93 @@
+"""
+Benchmark of parsing log lines: the per-line regex checks and splits of the
+logger before parse_lines(), alone and with strptime() to get typed values
+like parse_lines() does, vs parse_lines().
+
+The baseline functions are kept here as they were, so the benchmark measures
+the old code path and not the current check_line().
+"""
+
+import logging
+import re
+import time
+from datetime import datetime
+
+logging.basicConfig(level=logging.WARNING)
+
+from log_lines import parse_lines  # noqa: E402
+
+LINE_COUNTS = [20, 1_000, 100_000]
+REPEAT = 5
+
+
+def create_lines(n: int) -> list:
+    return [
+        f"2023-08-08 13:{i // 60 % 60:02d}:{i % 60:02d}.763742 - {i % 2}\n"
+        for i in range(n)
+    ]
+
+
+def extract_date(line: str) -> str:
+    return line.split(" - ")[0]
+
+
+def extract_magnet(line: str) -> str:
+    return line.split(" - ")[1]
+
+
+def check_line(line: str) -> bool:
+    if " - " not in line:
+        return False
+
+    # Check the date is like '2023-08-08 13:59:59.763742'
+    date = extract_date(line)
+    if not re.match(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+", date):
+        return False
+
+    # Check that magnet is either 0 or 1
+    magnet = extract_magnet(line)
+    if not re.match(r"0|1", magnet):
+        return False
+
+    return True
+
+
+def parse_lines_per_line(lines: list) -> tuple:
+    """The parsing before parse_lines(), which kept the values as strings."""
+    dates = []
+    magnets = []
+    for line in lines:
+        if check_line(line):
+            line = line.strip()
+            dates.append(extract_date(line))
+            magnets.append(extract_magnet(line))
+    return dates, magnets
+
+
+def parse_lines_per_line_typed(lines: list) -> tuple:
+    """The parsing before parse_lines(), with typed values like parse_lines()."""
+    dates, magnets = parse_lines_per_line(lines)
+    dates = [datetime.strptime(date, "%Y-%m-%d %H:%M:%S.%f") for date in dates]
+    return dates, [int(magnet) for magnet in magnets]
+
+
+def lines_per_second(function, lines: list) -> float:
+    # Small batches run more often, so every count runs about as long
+    repeat = max(REPEAT, 100_000 // len(lines))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(lines)
+    return repeat * len(lines) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    print(
+        f"{'lines':>8} {'per line [lines/s]':>20} {'+ strptime [lines/s]':>22} "
+        f"{'parse_lines [lines/s]':>23}"
+    )
+    for n in LINE_COUNTS:
+        lines = create_lines(n)
+        per_line = lines_per_second(parse_lines_per_line, lines)
+        typed = lines_per_second(parse_lines_per_line_typed, lines)
+        block = lines_per_second(parse_lines, lines)
+        print(f"{n:>8} {per_line:>20.0f} {typed:>22.0f} {block:>23.0f}")
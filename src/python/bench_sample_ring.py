@@ -0,0 +1,72 @@
+"""
+Benchmark of the text log vs the binary sample ring: bytes and CPU time per sample
+for writing samples and for reading them back as arrays.
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+logging.basicConfig(level=logging.WARNING)
+
+from log_lines import format_lines, parse_lines  # noqa: E402
+from logger import LogFollower  # noqa: E402
+from sample_ring import RECORD_DTYPE, RingReader, SampleRing  # noqa: E402
+from synthetic_workload import generate_samples  # noqa: E402
+
+N_SAMPLES = 1_000_000
+BATCH = 1000
+
+
+if __name__ == "__main__":
+    times, magnets = generate_samples(rate_hz=1000, duration_s=N_SAMPLES / 1000)
+    times_ns = times.astype("datetime64[ns]").view(np.int64)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_file = os.path.join(tmp_dir, "log.log")
+        ring_file = os.path.join(tmp_dir, "ring.bin")
+        open(log_file, "w").close()
+        follower = LogFollower(get_file_name=lambda: log_file)
+        follower.read_new_lines()
+        ring = SampleRing.create(ring_file, capacity=N_SAMPLES)
+        reader = RingReader(ring)
+
+        text_write = text_read = ring_write = ring_read = 0.0
+        for i in range(0, N_SAMPLES, BATCH):
+            start = time.perf_counter()
+            with open(log_file, "a") as f:
+                f.writelines(format_lines(times[i : i + BATCH], magnets[i : i + BATCH]))
+            text_write += time.perf_counter() - start
+
+            start = time.perf_counter()
+            parsed = parse_lines(follower.read_new_lines())
+            text_read += time.perf_counter() - start
+            assert len(parsed.times) == BATCH
+
+            start = time.perf_counter()
+            ring.append(times_ns[i : i + BATCH], magnets[i : i + BATCH])
+            ring_write += time.perf_counter() - start
+
+            start = time.perf_counter()
+            read_times, read_magnets = reader.read_new_arrays()
+            ring_read += time.perf_counter() - start
+            assert len(read_times) == BATCH
+
+        text_bytes = os.path.getsize(log_file)
+        follower.close()
+
+    ring_bytes = N_SAMPLES * RECORD_DTYPE.itemsize
+    print(f"{N_SAMPLES} samples in batches of {BATCH}")
+    print(
+        f"{'':>6} {'bytes/sample':>13} {'write [ns/sample]':>18} {'read [ns/sample]':>17}"
+    )
+    for name, n_bytes, write_s, read_s in [
+        ("text", text_bytes, text_write, text_read),
+        ("ring", ring_bytes, ring_write, ring_read),
+    ]:
+        print(
+            f"{name:>6} {n_bytes / N_SAMPLES:>13.1f} "
+            f"{write_s / N_SAMPLES * 1e9:>18.0f} {read_s / N_SAMPLES * 1e9:>17.0f}"
+        )
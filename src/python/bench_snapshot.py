@@ -0,0 +1,121 @@
+"""
+Benchmark of the wallet and price questions of one decision tick on the
+DataFrames vs on WalletSnapshot/PriceSnapshot, for the handful of currencies
+of today and for thousands of them. A tick asks has_money and has_crypto
+twice (like close_decision did), the currencies to sell, a wallet id and a
+price. Building the snapshots, which happens once per change of the rows, is
+reported separately.
+"""
+
+import logging
+import time
+
+import pandas as pd
+
+logging.basicConfig(level=logging.WARNING)
+
+from domain import PriceSnapshot, WalletSnapshot  # noqa: E402
+
+CURRENCY_COUNTS = [4, 100, 1_000, 10_000]
+N_TICKS = 1_000
+
+
+def create_dfs(n_currencies: int):
+    currencies = [f"C{i}" for i in range(n_currencies - 1)] + ["USD"]
+    df_wallet = pd.DataFrame(
+        {
+            "id": range(1, n_currencies + 1),
+            "currency": currencies,
+            "amount": [1.0] * (n_currencies - 1) + [10_000.0],
+        }
+    )
+    df_price = pd.DataFrame(
+        {"id": range(1, n_currencies + 1), "currency": currencies, "price": 1.5}
+    )
+    return df_wallet, df_price
+
+
+# The DataFrame versions the loop used before the snapshots, main's
+# DataFrame functions are wrappers over the snapshots now
+def has_money_df(df_wallet) -> bool:
+    if df_wallet is not None:
+        if "USD" in df_wallet["currency"].values:
+            usd_filter = df_wallet["currency"] == "USD"
+            df_usd = df_wallet[usd_filter]
+            if df_usd["amount"].values[0] > 5:
+                return True
+            else:
+                return False
+    return False
+
+
+def has_crypto_df(df_wallet) -> bool:
+    if df_wallet is not None:
+        currencies = df_wallet["currency"].values
+        if len(currencies) > 1:
+            return True
+    return False
+
+
+def get_currencies_to_sell_df(df_wallet) -> list:
+    if df_wallet is not None:
+        currencies = df_wallet["currency"].values
+        return [currency for currency in currencies if currency != "USD"]
+    return []
+
+
+def get_wallet_id_df(currency: str, df_wallet) -> int:
+    currency_filter = df_wallet["currency"] == currency
+    return df_wallet[currency_filter]["id"].values[0]
+
+
+def get_price_df(currency: str, df_price) -> float:
+    currency_filter = df_price["currency"] == currency
+    return df_price[currency_filter]["price"].values[0]
+
+
+def tick_dataframes(df_wallet, df_price, currency: str) -> None:
+    for _ in range(2):
+        has_money_df(df_wallet)
+        has_crypto_df(df_wallet)
+    get_currencies_to_sell_df(df_wallet)
+    get_wallet_id_df(currency=currency, df_wallet=df_wallet)
+    get_price_df(currency=currency, df_price=df_price)
+
+
+def tick_snapshots(wallet, prices, currency: str) -> None:
+    for _ in range(2):
+        wallet.has_money
+        wallet.has_crypto
+    wallet.currencies_to_sell
+    wallet.wallet_id(currency)
+    prices.price(currency)
+
+
+if __name__ == "__main__":
+    print(
+        f"{'currencies':>10} {'dataframes [ticks/s]':>21} "
+        f"{'snapshots [ticks/s]':>20} {'build [ms]':>11}"
+    )
+    for n in CURRENCY_COUNTS:
+        df_wallet, df_price = create_dfs(n)
+        currency = df_wallet["currency"].values[n // 2]
+
+        start = time.perf_counter()
+        for _ in range(N_TICKS):
+            tick_dataframes(df_wallet, df_price, currency)
+        dataframe_rate = N_TICKS / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        wallet = WalletSnapshot.from_df(df_wallet)
+        prices = PriceSnapshot.from_df(df_price)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(N_TICKS):
+            tick_snapshots(wallet, prices, currency)
+        snapshot_rate = N_TICKS / (time.perf_counter() - start)
+        print(
+            f"{n:>10} {dataframe_rate:>21.0f} {snapshot_rate:>20.0f} "
+            f"{build_seconds * 1e3:>11.2f}"
+        )
@@ -0,0 +1,60 @@
+"""
+Benchmark of the closed_hamsterwheel transform modes: "pandas" reads the new
+raw rows into python and filters them there, "sql" runs one INSERT ... SELECT
+per batch in the database.
+
+A SQLite file database is used as a local stand-in for MySQL. raw_hamsterwheel
+is filled with synthetic samples, then all rows are transformed from an empty
+watermark.
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+
+logging.basicConfig(level=logging.WARNING)
+
+from bulk_insert import bulk_insert  # noqa: E402
+from logger import samples_to_df  # noqa: E402
+from sqlite_database import create_connection  # noqa: E402
+from synthetic_workload import generate_samples  # noqa: E402
+from transform_closed_hamsterwheel import transform  # noqa: E402
+
+# One hour of samples at 1 Hz, 100 Hz and 1 kHz
+ROW_COUNTS = [3_600, 360_000, 3_600_000]
+MODES = ["pandas", "sql"]
+
+
+def create_raw_hamsterwheel(file_name: str, df_raw) -> sqlite3.Connection:
+    connection = create_connection(file_name)
+    bulk_insert(
+        connection=connection,
+        table="raw_hamsterwheel",
+        df=df_raw,
+        columns=["hash", "time", "magnet"],
+        chunk_size=100_000,
+        dialect="sqlite",
+    )
+    return connection
+
+
+if __name__ == "__main__":
+    print(f"{'rows':>8} " + " ".join(f"{mode + ' [rows/s]':>16}" for mode in MODES))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, "bench.sqlite")
+        for n in ROW_COUNTS:
+            times, magnets = generate_samples(rate_hz=n / 3600, duration_s=3600, seed=0)
+            df_raw = samples_to_df(times, magnets)
+            rates = []
+            for mode in MODES:
+                connection = create_raw_hamsterwheel(file_name, df_raw)
+                start = time.perf_counter()
+                processed = transform(
+                    mysql_connection=connection, mode=mode, dialect="sqlite"
+                )
+                rates.append(processed / (time.perf_counter() - start))
+                assert processed == n
+                connection.close()
+            print(f"{n:>8} " + " ".join(f"{rate:>16.0f}" for rate in rates))
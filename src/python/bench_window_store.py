@@ -0,0 +1,81 @@
+"""
+Benchmark of the hamsterwheel reads of the main loop on one hour of samples:
+the DataFrame path (the last 5 seconds for is_hamsterwheel_running and the
+samples of a decision for get_number_hamsterwheel_turns, filtered by their
+time strings like the repository does) vs the WindowStore.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+logging.basicConfig(level=logging.WARNING)
+
+import main  # noqa: E402
+from repository import InMemoryRepository  # noqa: E402
+from synthetic_workload import generate_samples  # noqa: E402
+from window_store import RUNNING_SECONDS, WindowStore  # noqa: E402
+
+RATE_HZ = 100
+DURATION_S = 3600
+DECISION_SECONDS = 60
+N_TICKS = 50
+
+
+if __name__ == "__main__":
+    main.logger.setLevel(logging.WARNING)
+    times, magnets = generate_samples(rate_hz=RATE_HZ, duration_s=DURATION_S, seed=0)
+    df_raw_hamsterwheel = pd.DataFrame(
+        {
+            "id": range(1, len(times) + 1),
+            "time": pd.to_datetime(times).strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "magnet": magnets,
+        }
+    )
+    now = pd.Timestamp(times[-1]).to_pydatetime()
+    start_time = now - timedelta(seconds=DECISION_SECONDS)
+    repository = InMemoryRepository(
+        df_raw_hamsterwheel=df_raw_hamsterwheel,
+        df_decision=pd.DataFrame(),
+        df_wallet=pd.DataFrame(),
+        df_price=pd.DataFrame(),
+        now=lambda: now,
+    )
+
+    start = time.perf_counter()
+    for _ in range(N_TICKS):
+        repository.start_tick()
+        main.is_hamsterwheel_running(
+            repository.hamsterwheel_between(
+                start_time=now - timedelta(seconds=RUNNING_SECONDS), end_time=now
+            )
+        )
+        df_turns = repository.hamsterwheel_between(start_time=start_time, end_time=now)
+        df_turns = df_turns.assign(time=pd.to_datetime(df_turns["time"]))
+        dataframe_turns = main.get_number_hamsterwheel_turns(
+            df_raw_hamsterwheel=df_turns, start_time=start_time, end_time=now
+        )
+    dataframe_seconds = (time.perf_counter() - start) / N_TICKS
+
+    # The default capacity is sized for the sensor's rate, hold the whole hour
+    window_store = WindowStore(capacity=len(times))
+    start = time.perf_counter()
+    window_store.sync(repository)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(N_TICKS):
+        repository.start_tick()
+        window_store.sync(repository)
+        window_store.is_running(now=now)
+        store_turns = window_store.turns_between(start_time=start_time, end_time=now)
+    store_seconds = (time.perf_counter() - start) / N_TICKS
+
+    # The DataFrame path counts a closed first sample of the decision as a turn
+    assert abs(store_turns - dataframe_turns) <= 1
+    print(f"{len(times)} samples, turns of the last {DECISION_SECONDS} s")
+    print(f"{'dataframes per tick':>22}: {dataframe_seconds * 1e3:>10.3f} ms")
+    print(f"{'window store load':>22}: {load_seconds * 1e3:>10.3f} ms (once)")
+    print(f"{'window store per tick':>22}: {store_seconds * 1e3:>10.3f} ms")
@@ -0,0 +1,103 @@
+"""
+Bulk writer used by the scripts that insert rows into the database.
+
+Rows are sent as parameterized multi-row inserts (executemany) in chunks with
+one commit per chunk instead of one query and one commit per row.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, List
+
+import pandas as pd
+
+# Placeholder used in parameterized queries per database dialect
+PLACEHOLDERS = {"mysql": "%s", "sqlite": "?"}
+INSERT_IGNORE = {"mysql": "INSERT IGNORE INTO", "sqlite": "INSERT OR IGNORE INTO"}
+CHUNK_SIZE = 1000
+
+
+@dataclass
+class BulkInsertResult:
+    """Number of rows and batches written and the time it took."""
+
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return self.rows / self.seconds
+
+
+def get_insert_query(
+    table: str,
+    columns: List[str],
+    dialect: str = "mysql",
+    ignore_duplicates: bool = False,
+    replace_duplicates: bool = False,
+) -> str:
+    """Get the parameterized INSERT query for table and columns.
+
+    With ignore_duplicates, rows violating a unique key are skipped, with
+    replace_duplicates they replace the existing row.
+    """
+    placeholders = ", ".join([PLACEHOLDERS[dialect]] * len(columns))
+    insert = INSERT_IGNORE[dialect] if ignore_duplicates else "INSERT INTO"
+    if replace_duplicates:
+        insert = "REPLACE INTO"
+    return f"{insert} {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+def df_to_rows(df: pd.DataFrame, columns: List[str]) -> List[tuple]:
+    """Convert the columns of df to a list of tuples of plain python values."""
+    df = df[columns]
+    for column in columns:
+        # Timestamps are written as strings like the old f-string inserts did
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df = df.assign(**{column: df[column].astype(str)})
+    return list(df.astype(object).itertuples(index=False, name=None))
+
+
+def bulk_insert(
+    connection: Any,
+    table: str,
+    df: pd.DataFrame,
+    columns: List[str],
+    chunk_size: int = CHUNK_SIZE,
+    dialect: str = "mysql",
+    ignore_duplicates: bool = False,
+    commit: bool = True,
+    replace_duplicates: bool = False,
+) -> BulkInsertResult:
+    """Insert the columns of df into table in chunks of chunk_size rows,
+    with one commit per chunk.
+
+    Without commit, committing is left to the caller, e.g. to commit the rows
+    together with other changes in one transaction.
+    """
+    result = BulkInsertResult()
+    if len(df) == 0:
+        return result
+    start = time.perf_counter()
+    query = get_insert_query(
+        table=table,
+        columns=columns,
+        dialect=dialect,
+        ignore_duplicates=ignore_duplicates,
+        replace_duplicates=replace_duplicates,
+    )
+    rows = df_to_rows(df=df, columns=columns)
+    cursor = connection.cursor()
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i : i + chunk_size]
+        cursor.executemany(query, chunk)
+        if commit:
+            connection.commit()
+        result.rows += len(chunk)
+        result.batches += 1
+    cursor.close()
+    result.seconds = time.perf_counter() - start
+    return result
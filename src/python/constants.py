@@ -1,6 +1,18 @@
 import numpy as np
 from typing import Dict
 
+# Database connection
+HOST = "192.168.1.121"
+PORT = 3306
+DATABASE = "cryptohamster"
+USER = "tiberius"
+PASSWORD = "q123"
+CHARSET = "utf8"
+
+# Change notifications to the main loop (UDP, host of main.py)
+NOTIFY_HOST = "127.0.0.1"
+NOTIFY_PORT = 50007
+
 
 # SQL Table names
 class SQLTable:
@@ -12,7 +24,18 @@ class SQLTable:
 
 
 table_raw_hamsterwheel = SQLTable(
-    table_name="raw_hamsterwheel", columns={"magnet": "magnet"}
+    table_name="raw_hamsterwheel",
+    columns={"hash": "hash", "time": "time", "magnet": "magnet"},
+)
+
+table_closed_hamsterwheel = SQLTable(
+    table_name="closed_hamsterwheel",
+    columns={"hash": "hash", "time": "time", "magnet": "magnet"},
+)
+
+table_turn_event = SQLTable(
+    table_name="turn_event",
+    columns={"start_time": "start_time", "duration": "duration", "rpm": "rpm"},
 )
 
 table_log = SQLTable(
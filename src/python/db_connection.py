@@ -0,0 +1,122 @@
+"""
+Long-lived, self-healing MySQL connection shared by the scripts that use the database.
+
+Instead of connecting and closing every tick, the scripts keep one connection
+open. The connection is pinged after being idle for a while and re-established
+with exponential backoff when it is lost.
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pymysql
+
+from constants import CHARSET, DATABASE, HOST, PASSWORD, PORT, USER
+
+logger = logging.getLogger()
+
+
+class ConnectionManager:
+    """Keep one database connection open and reconnect when it is lost."""
+
+    def __init__(
+        self,
+        connect: Callable[..., Any] = pymysql.connect,
+        connect_timeout: int = 5,
+        read_timeout: int = 10,
+        write_timeout: int = 10,
+        ping_interval: float = 10.0,
+        max_attempts: int = 5,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.connect = connect
+        self.connect_kwargs = {
+            "host": HOST,
+            "user": USER,
+            "password": PASSWORD,
+            "db": DATABASE,
+            "port": PORT,
+            "charset": CHARSET,
+            "connect_timeout": connect_timeout,
+            "read_timeout": read_timeout,
+            "write_timeout": write_timeout,
+        }
+        self.ping_interval = ping_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.sleep = sleep
+
+        self.connect_count = 0
+        self.failed_connect_count = 0
+        self.connect_seconds = 0.0
+        self._connection: Optional[Any] = None
+        self._last_used = 0.0
+
+    def get_connection(self) -> Any:
+        """Return an open connection, reconnecting if it was lost."""
+        if self._connection is not None and self._is_stale():
+            try:
+                self._connection.ping(reconnect=False)
+            except Exception as e:
+                logger.warning(f"Database connection lost: {e}")
+                self.close()
+        if self._connection is None:
+            self._connection = self._connect_with_backoff()
+        self._last_used = time.monotonic()
+        return self._connection
+
+    def close(self) -> None:
+        """Close the connection, the next get_connection() reconnects."""
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+        self._connection = None
+
+    def stats(self) -> Dict[str, float]:
+        """Return the number of (failed) connects and the total time spent connecting."""
+        return {
+            "connect_count": self.connect_count,
+            "failed_connect_count": self.failed_connect_count,
+            "connect_seconds": self.connect_seconds,
+        }
+
+    def __enter__(self) -> "ConnectionManager":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _is_stale(self) -> bool:
+        return time.monotonic() - self._last_used > self.ping_interval
+
+    def _connect_with_backoff(self) -> Any:
+        backoff = self.backoff_seconds
+        for attempt in range(1, self.max_attempts + 1):
+            start = time.perf_counter()
+            try:
+                connection = self.connect(**self.connect_kwargs)
+            except Exception as e:
+                self.connect_seconds += time.perf_counter() - start
+                self.failed_connect_count += 1
+                logger.warning(
+                    f"Connecting to the database failed (attempt {attempt}/{self.max_attempts}): {e}"
+                )
+                if attempt == self.max_attempts:
+                    raise
+                self.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff_seconds)
+                continue
+            self.connect_seconds += time.perf_counter() - start
+            self.connect_count += 1
+            logger.info(
+                f"Connected to the database (connects: {self.connect_count}, "
+                f"failed: {self.failed_connect_count}, "
+                f"time connecting: {self.connect_seconds:.3f} s)"
+            )
+            return connection
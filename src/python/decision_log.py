@@ -0,0 +1,144 @@
+"""
+In-memory log of the decisions for the main loop.
+
+The log keeps the decisions ordered by start_time together with the index of
+the latest buy_or_sell decision, so the latest decision and the current cycle
+are available without sorting the decision history. It is loaded from the
+database once and afterwards only reads the delta: decisions are immutable
+once closed, so only rows from the first still open decision on can change.
+"""
+
+import bisect
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from domain import Decision, decisions_from_df
+from repository import Repository
+
+
+class DecisionLog:
+    def __init__(self) -> None:
+        self.decisions: List[Decision] = []
+        # Parallel to decisions in nanoseconds, to insert a decision that
+        # starts earlier
+        self._start_times: List[int] = []
+        self._by_id: Dict[int, Decision] = {}
+        self._open_ids: Set[int] = set()
+        self._cycle_start: Optional[int] = None
+        self._max_id = 0
+
+    def __len__(self) -> int:
+        return len(self.decisions)
+
+    def latest(self) -> Optional[Decision]:
+        """The decision with the latest start_time, None without decisions."""
+        return self.decisions[-1] if len(self.decisions) > 0 else None
+
+    def cycle(self) -> List[Decision]:
+        """The decisions since the last buy_or_sell decision, ordered by start_time."""
+        if self._cycle_start is None:
+            return []
+        return self.decisions[self._cycle_start :]
+
+    def append(self, decision: Decision, start_time: Optional[int] = None) -> None:
+        """Add an opened decision. Closing it later changes the same object."""
+        if start_time is None:
+            start_time = pd.Timestamp(decision.start_time).value
+        if len(self.decisions) == 0 or start_time >= self._start_times[-1]:
+            index = len(self.decisions)
+            self.decisions.append(decision)
+            self._start_times.append(start_time)
+            if decision.type == "buy_or_sell":
+                self._cycle_start = index
+        else:
+            index = bisect.bisect_right(self._start_times, start_time)
+            self.decisions.insert(index, decision)
+            self._start_times.insert(index, start_time)
+            self._find_cycle_start()
+        if decision.id is not None:
+            self._add_id(decision)
+
+    def _add_id(self, decision: Decision) -> None:
+        self._by_id[decision.id] = decision
+        self._max_id = max(self._max_id, decision.id)
+        if decision.status == "open":
+            self._open_ids.add(decision.id)
+        else:
+            self._open_ids.discard(decision.id)
+
+    def _extend(self, decisions: List[Decision], start_times: List[int]) -> None:
+        self.decisions.extend(decisions)
+        self._start_times.extend(start_times)
+        self._by_id.update(
+            (decision.id, decision) for decision in decisions if decision.id is not None
+        )
+        self._open_ids.update(
+            decision.id
+            for decision in decisions
+            if decision.status == "open" and decision.id is not None
+        )
+        self._max_id = max(self._by_id, default=0)
+        self._find_cycle_start()
+
+    def _find_cycle_start(self) -> None:
+        self._cycle_start = None
+        for index in range(len(self.decisions) - 1, -1, -1):
+            if self.decisions[index].type == "buy_or_sell":
+                self._cycle_start = index
+                return
+
+    def _find_unsaved(self, decision: Decision, start_time: int) -> Optional[Decision]:
+        """The decision appended before it had an id that decision is the saved row of."""
+        index = bisect.bisect_left(self._start_times, start_time)
+        while index < len(self.decisions) and self._start_times[index] == start_time:
+            candidate = self.decisions[index]
+            if candidate.id is None and candidate.type == decision.type:
+                return candidate
+            index += 1
+        return None
+
+    def upsert(self, decision: Decision, start_time: Optional[int] = None) -> None:
+        """Add a decision read from the database or update the one with its id."""
+        existing = self._by_id.get(decision.id)
+        if existing is None:
+            if start_time is None:
+                start_time = pd.Timestamp(decision.start_time).value
+            # Only a decision starting at or before the latest can be in the log
+            if len(self.decisions) > 0 and start_time <= self._start_times[-1]:
+                existing = self._find_unsaved(decision, start_time)
+            if existing is None:
+                self.append(decision, start_time)
+                return
+        # The type and start_time of a decision do not change
+        existing.id = decision.id
+        existing.end_time = decision.end_time
+        existing.number_hamsterwheel_turns = decision.number_hamsterwheel_turns
+        existing.status = decision.status
+        existing.result = decision.result
+        self._add_id(existing)
+
+    def sync_id(self) -> int:
+        """The lowest id whose row can have changed since the last sync."""
+        if len(self._open_ids) > 0:
+            return min(self._open_ids)
+        return self._max_id + 1
+
+    def load(self, df_decision: Optional[pd.DataFrame]) -> None:
+        """Add or update the decisions of df_decision."""
+        if df_decision is None or len(df_decision) == 0:
+            return
+        start_times = pd.to_datetime(df_decision["start_time"]).values.view("int64")
+        decisions = decisions_from_df(df_decision)
+        if len(self.decisions) == 0 and np.all(np.diff(start_times) >= 0):
+            # The first load of the history in order, added at once
+            self._extend(decisions, start_times.tolist())
+            return
+        start_times = start_times.tolist()
+        for decision, start_time in zip(decisions, start_times):
+            self.upsert(decision, start_time)
+
+    def sync(self, repository: Repository) -> None:
+        """Read the decisions that are new or can have changed since the last sync."""
+        self.load(repository.decisions_since(self.sync_id()))
@@ -0,0 +1,178 @@
+"""
+Domain objects of the decision loop.
+
+The loop works on these small slotted objects instead of one-row DataFrames.
+DataFrames are only used at the I/O boundary, the converters below turn the
+rows read from the database into objects and back.
+"""
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Generic, List, Mapping, Optional, Tuple, Type, TypeVar
+
+import pandas as pd
+
+T = TypeVar("T")
+
+# Less USD than this and the hamster is broke
+MIN_USD = 5
+
+
+# The classes declare __slots__ themselves (instead of dataclass(slots=True),
+# python 3.10+), so their fields have no defaults.
+@dataclass
+class Decision:
+    __slots__ = (
+        "id",
+        "start_time",
+        "end_time",
+        "type",
+        "number_hamsterwheel_turns",
+        "status",
+        "result",
+    )
+    id: Optional[int]
+    start_time: Any
+    end_time: Any
+    type: str
+    number_hamsterwheel_turns: Optional[int]
+    status: Optional[str]
+    result: Any
+
+
+@dataclass
+class Order:
+    __slots__ = ("wallet_id", "type", "currency", "amount", "price", "state")
+    wallet_id: int
+    type: str
+    currency: str
+    amount: float
+    price: float
+    state: str
+
+
+@dataclass
+class WalletEntry:
+    __slots__ = ("id", "currency", "amount")
+    id: Optional[int]
+    currency: str
+    amount: float
+
+
+@dataclass
+class Price:
+    __slots__ = ("id", "currency", "price")
+    id: Optional[int]
+    currency: str
+    price: float
+
+
+def from_df(cls: Type[T], df: Optional[pd.DataFrame]) -> List[T]:
+    """Objects of cls from the rows of df, missing columns and NaN become None."""
+    if df is None:
+        return []
+    values = df.reindex(columns=list(cls.__slots__)).to_numpy(dtype=object)
+    values[pd.isna(values)] = None
+    return [cls(*row) for row in values.tolist()]
+
+
+def to_df(cls: Type[T], objects: List[T]) -> pd.DataFrame:
+    """DataFrame with one row per object and one column per field of cls."""
+    return pd.DataFrame(
+        [tuple(getattr(obj, field) for field in cls.__slots__) for obj in objects],
+        columns=list(cls.__slots__),
+    )
+
+
+def decisions_from_df(df: Optional[pd.DataFrame]) -> List[Decision]:
+    return from_df(Decision, df)
+
+
+def decision_from_df(df: Optional[pd.DataFrame]) -> Optional[Decision]:
+    """The decision in the first row of df, None for no or an empty df."""
+    decisions = decisions_from_df(df)
+    return decisions[0] if len(decisions) > 0 else None
+
+
+def wallet_from_df(df: Optional[pd.DataFrame]) -> List[WalletEntry]:
+    return from_df(WalletEntry, df)
+
+
+def prices_from_df(df: Optional[pd.DataFrame]) -> List[Price]:
+    return from_df(Price, df)
+
+
+@dataclass(frozen=True)
+class WalletSnapshot:
+    """The wallet keyed by currency, with the answers the loop needs precomputed."""
+
+    __slots__ = (
+        "entries",
+        "by_currency",
+        "has_money",
+        "has_crypto",
+        "currencies_to_sell",
+    )
+    entries: Tuple[WalletEntry, ...]
+    by_currency: Mapping[str, WalletEntry]
+    has_money: bool
+    has_crypto: bool
+    currencies_to_sell: Tuple[str, ...]
+
+    @classmethod
+    def from_entries(cls, entries: List[WalletEntry]) -> "WalletSnapshot":
+        # The first entry of a currency wins, like the lookups on the DataFrame
+        by_currency = {entry.currency: entry for entry in reversed(entries)}
+        usd = by_currency.get("USD")
+        return cls(
+            entries=tuple(entries),
+            by_currency=MappingProxyType(by_currency),
+            has_money=usd is not None and usd.amount > MIN_USD,
+            # Any currency besides USD is crypto
+            has_crypto=len(entries) > 1,
+            currencies_to_sell=tuple(
+                entry.currency for entry in entries if entry.currency != "USD"
+            ),
+        )
+
+    @classmethod
+    def from_df(cls, df: Optional[pd.DataFrame]) -> "WalletSnapshot":
+        return cls.from_entries(wallet_from_df(df))
+
+    def wallet_id(self, currency: str) -> int:
+        return self.by_currency[currency].id
+
+
+@dataclass(frozen=True)
+class PriceSnapshot:
+    """The current price per currency."""
+
+    __slots__ = ("by_currency",)
+    by_currency: Mapping[str, float]
+
+    @classmethod
+    def from_prices(cls, prices: List[Price]) -> "PriceSnapshot":
+        # The last price of a currency is the current one
+        return cls(MappingProxyType({price.currency: price.price for price in prices}))
+
+    @classmethod
+    def from_df(cls, df: Optional[pd.DataFrame]) -> "PriceSnapshot":
+        return cls.from_prices(prices_from_df(df))
+
+    def price(self, currency: str) -> float:
+        return self.by_currency[currency]
+
+
+class SnapshotCache(Generic[T]):
+    """Keeps the snapshot of the last rows and only rebuilds it when they change."""
+
+    def __init__(self, build: Callable[[pd.DataFrame], T]) -> None:
+        self.build = build
+        self._df: Optional[pd.DataFrame] = None
+        self._snapshot: Optional[T] = None
+
+    def get(self, df: pd.DataFrame) -> T:
+        if self._df is None or not (df is self._df or df.equals(self._df)):
+            self._snapshot = self.build(df)
+            self._df = df
+        return self._snapshot
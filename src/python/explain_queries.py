@@ -0,0 +1,90 @@
+"""
+Capture the EXPLAIN plans of the hot queries, e.g. before and after the index
+migrations:
+
+    python explain_queries.py --migrate --output explain.json
+
+prints the access type, the chosen key and the estimated rows of every query
+before and after running the migrations and saves the full plans as JSON.
+"""
+
+import argparse
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+import pymysql
+
+from db_connection import ConnectionManager
+from migrations import run_migrations
+
+logger = logging.getLogger()
+
+HOT_QUERIES = {
+    "read_last_mins_raw": "SELECT * FROM raw_hamsterwheel WHERE time > NOW() - INTERVAL 10 MINUTE",
+    "read_last_mins_closed": "SELECT * FROM closed_hamsterwheel WHERE time > NOW() - INTERVAL 30 MINUTE",
+    "retention_delete": (
+        "DELETE FROM raw_hamsterwheel WHERE id > 0 AND id <= 1000 "
+        "AND time < NOW() - INTERVAL 15 MINUTE"
+    ),
+    "dedupe_hash": "SELECT id FROM raw_hamsterwheel WHERE hash = '0000000000000000'",
+    "transform_anti_join": (
+        "SELECT raw.hash, raw.time, raw.magnet FROM raw_hamsterwheel AS raw "
+        "LEFT JOIN closed_hamsterwheel AS closed ON closed.hash = raw.hash "
+        "WHERE raw.id > 0 AND raw.id <= 10000 AND raw.magnet = 0 AND closed.id IS NULL"
+    ),
+    "latest_decision": "SELECT * FROM decision ORDER BY start_time DESC LIMIT 1",
+    "open_orders": "SELECT * FROM orderbook WHERE state = 'open'",
+}
+
+
+def capture_plans(
+    mysql_connection: pymysql.connections.Connection,
+) -> Dict[str, List[Dict]]:
+    """Return the EXPLAIN rows of every hot query as dicts."""
+    plans = {}
+    cursor = mysql_connection.cursor()
+    for name, query in HOT_QUERIES.items():
+        cursor.execute(f"EXPLAIN {query}")
+        columns = [column[0] for column in cursor.description]
+        plans[name] = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    cursor.close()
+    return plans
+
+
+def format_plan(plan: List[Dict]) -> str:
+    """Summary of a plan: table, access type, key and estimated rows per step."""
+    return ", ".join(
+        f"{step.get('table')}: {step.get('type')} key={step.get('key')} rows={step.get('rows')}"
+        for step in plan
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--migrate", action="store_true", help="Run the migrations between captures"
+    )
+    parser.add_argument("--output", default=None, help="JSON file for the plans")
+    args = parser.parse_args()
+
+    connection_manager = ConnectionManager()
+    try:
+        mysql_connection = connection_manager.get_connection()
+        captures = {"before": capture_plans(mysql_connection=mysql_connection)}
+        if args.migrate:
+            run_migrations(mysql_connection=mysql_connection)
+            captures["after"] = capture_plans(mysql_connection=mysql_connection)
+    finally:
+        connection_manager.close()
+
+    for name in HOT_QUERIES:
+        print(name)
+        for capture, plans in captures.items():
+            print(f"  {capture:>6}: {format_plan(plans[name])}")
+    output = args.output or f"explain_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(output, "w") as f:
+        json.dump(captures, f, indent=2, default=str)
+    print(f"Saved plans to {output}")
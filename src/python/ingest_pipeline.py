@@ -0,0 +1,172 @@
+"""
+asyncio ingest pipeline for the hamsterwheel log files.
+
+Reader, parser and writer stages are connected by bounded queues, so a slow
+database write does not delay reading and a full queue slows down the stage
+before it (backpressure) instead of growing memory. Readers are woken by a file
+watcher when the log file changed instead of sleeping a fixed second.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger()
+
+QUEUE_SIZE = 100
+POLL_INTERVAL = 0.05
+REPORT_INTERVAL = 60.0
+# Maximum number of rows the writer combines into one write
+MAX_WRITE_ROWS = 10_000
+
+
+class FileWatcher:
+    """Wait until the file returned by get_file_name() changed.
+
+    A change is a new file name, inode or size. Only a stat() call is done per
+    poll, the file itself is read by the follower once it changed.
+    """
+
+    def __init__(
+        self, get_file_name: Callable[[], str], poll_interval: float = POLL_INTERVAL
+    ) -> None:
+        self.get_file_name = get_file_name
+        self.poll_interval = poll_interval
+        self._last_seen: Optional[Tuple[str, int, int]] = None
+
+    def has_changed(self) -> bool:
+        file_name = self.get_file_name()
+        try:
+            stat = os.stat(file_name)
+        except FileNotFoundError:
+            return False
+        seen = (file_name, stat.st_ino, stat.st_size)
+        if seen == self._last_seen:
+            return False
+        self._last_seen = seen
+        return True
+
+    async def wait(self) -> None:
+        while not self.has_changed():
+            await asyncio.sleep(self.poll_interval)
+
+
+class IngestPipeline:
+    """Read new log lines of every follower, parse them and write the rows.
+
+    parse(lines) returns the rows as a DataFrame, write(df) is blocking (the
+    database write) and runs in a worker thread.
+    """
+
+    def __init__(
+        self,
+        followers: List[Any],
+        parse: Callable[[List[str]], pd.DataFrame],
+        write: Callable[[pd.DataFrame], Any],
+        queue_size: int = QUEUE_SIZE,
+        poll_interval: float = POLL_INTERVAL,
+        report_interval: float = REPORT_INTERVAL,
+    ) -> None:
+        self.followers = followers
+        self.parse = parse
+        self.write = write
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.report_interval = report_interval
+        self.line_queue: Optional[asyncio.Queue] = None
+        self.row_queue: Optional[asyncio.Queue] = None
+        self.rows_written = 0
+        self._stop_event: Optional[asyncio.Event] = None
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Number of items waiting in front of the parser and the writer."""
+        return {
+            "parser": self.line_queue.qsize() if self.line_queue else 0,
+            "writer": self.row_queue.qsize() if self.row_queue else 0,
+        }
+
+    async def run(self) -> None:
+        """Run all stages until stop() is called."""
+        self.line_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.row_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stop_event = asyncio.Event()
+        tasks = [
+            asyncio.create_task(self.read(follower)) for follower in self.followers
+        ]
+        tasks += [
+            asyncio.create_task(self.parse_lines()),
+            asyncio.create_task(self.write_rows()),
+            asyncio.create_task(self.report()),
+        ]
+        await self._stop_event.wait()
+        # Let the parser and writer finish what was read
+        await self.line_queue.join()
+        await self.row_queue.join()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    async def read(self, follower: Any) -> None:
+        """Reader stage: put new lines of follower on the line queue.
+
+        A follower can bring its own wait_for_change(), else a FileWatcher on
+        its file waits for the next change.
+        """
+        wait_for_change = getattr(follower, "wait_for_change", None)
+        if wait_for_change is None:
+            wait_for_change = FileWatcher(
+                get_file_name=follower.get_file_name, poll_interval=self.poll_interval
+            ).wait
+        while True:
+            try:
+                lines = follower.read_new_lines()
+            except Exception as e:
+                logger.error(f"Error reading log file: {e}")
+                lines = []
+            if len(lines) > 0:
+                await self.line_queue.put(lines)
+            await wait_for_change()
+
+    async def parse_lines(self) -> None:
+        """Parser stage: turn lines into rows and put them on the row queue."""
+        while True:
+            lines = await self.line_queue.get()
+            try:
+                df = self.parse(lines)
+                if len(df) > 0:
+                    await self.row_queue.put(df)
+            except Exception as e:
+                logger.error(f"Error parsing log lines: {e}")
+            finally:
+                self.line_queue.task_done()
+
+    async def write_rows(self) -> None:
+        """Writer stage: combine the queued rows and write them in a worker thread."""
+        while True:
+            dfs = [await self.row_queue.get()]
+            n_rows = len(dfs[0])
+            while not self.row_queue.empty() and n_rows < MAX_WRITE_ROWS:
+                dfs.append(self.row_queue.get_nowait())
+                n_rows += len(dfs[-1])
+            try:
+                df = pd.concat(dfs, ignore_index=True) if len(dfs) > 1 else dfs[0]
+                await asyncio.to_thread(self.write, df)
+                self.rows_written += len(df)
+            except Exception as e:
+                logger.error(f"Error writing {n_rows} rows: {e}")
+            finally:
+                for _ in dfs:
+                    self.row_queue.task_done()
+
+    async def report(self) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            logger.info(
+                f"Ingest queue depths: {self.queue_depths()}, rows written: {self.rows_written}"
+            )
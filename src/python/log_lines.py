@@ -0,0 +1,85 @@
+"""
+Parsing and formatting of the hamsterwheel log lines.
+
+This module only depends on numpy, so tools like the sample ring converter can use it without
+the database and logging setup of logger.py.
+"""
+
+import re
+from typing import List, NamedTuple
+
+import numpy as np
+
+# A log line looks like '2023-08-08 13:59:59.763742 - 0'
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+")
+LINE_PATTERN = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{1,6}) - ([01])[ \t\r]*$",
+    flags=re.MULTILINE,
+)
+
+
+class ParsedLines(NamedTuple):
+    """Timestamps and magnet values of the valid lines and the number of rejected lines."""
+
+    times: np.ndarray
+    magnets: np.ndarray
+    rejected: int
+
+
+def parse_lines(lines: List[str]) -> ParsedLines:
+    """Parse a block of log lines in one pass of LINE_PATTERN.
+
+    Returns datetime64[us] timestamps and uint8 magnet values of the valid lines,
+    invalid lines are counted as rejected.
+    """
+    matches = LINE_PATTERN.findall("\n".join(line.rstrip("\n") for line in lines))
+    dates = [date for date, _ in matches]
+    magnets = np.frombuffer(
+        "".join(magnet for _, magnet in matches).encode(), dtype=np.uint8
+    ) - np.uint8(ord("0"))
+    try:
+        times = np.array(dates, dtype="datetime64[us]")
+    except ValueError:
+        # Matches the pattern but is no valid date, e.g. month 13
+        valid = np.array([is_valid_date(date) for date in dates], dtype=bool)
+        times = np.array([d for d, v in zip(dates, valid) if v], dtype="datetime64[us]")
+        magnets = magnets[valid]
+    return ParsedLines(times=times, magnets=magnets, rejected=len(lines) - len(times))
+
+
+def format_lines(times: np.ndarray, magnets: np.ndarray) -> List[str]:
+    """Format samples as log lines, the inverse of parse_lines()."""
+    dates = np.datetime_as_string(times.astype("datetime64[us]"), unit="us")
+    return [
+        f"{date[:10]} {date[11:]} - {magnet}\n"
+        for date, magnet in zip(dates.tolist(), magnets.tolist())
+    ]
+
+
+def is_valid_date(date: str) -> bool:
+    try:
+        np.datetime64(date, "us")
+    except ValueError:
+        return False
+    return True
+
+
+def extract_date(line: str) -> str:
+    return line.split(" - ")[0]
+
+
+def extract_magnet(line: str) -> str:
+    return line.split(" - ")[1]
+
+
+def check_date(date: str) -> bool:
+    if not DATE_PATTERN.match(date):
+        return False
+    return True
+
+
+def check_line(line: str) -> bool:
+    """Check the line is like '2023-08-08 13:59:59.763742 - 0' with magnet 0 or 1."""
+    if not LINE_PATTERN.match(line.rstrip("\n")):
+        return False
+    return True
@@ -1,13 +1,43 @@
-import time
-from typing import Generator, List
-import re
+import asyncio
+import os
+from collections import OrderedDict
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
 import pymysql
 import sys
+import numpy as np
 import pandas as pd
 import warnings
 from datetime import datetime
 import hashlib
 import logging
+from bulk_insert import BulkInsertResult, bulk_insert
+from constants import table_raw_hamsterwheel
+from db_connection import ConnectionManager
+from ingest_pipeline import IngestPipeline
+from log_lines import (  # noqa: F401 (re-exported for the existing importers)
+    DATE_PATTERN,
+    LINE_PATTERN,
+    ParsedLines,
+    check_date,
+    check_line,
+    extract_date,
+    extract_magnet,
+    format_lines,
+    is_valid_date,
+    parse_lines,
+)
+from notifications import TOPIC_SAMPLES, Notifier, RunningStarts
+from sample_ring import RingFollower, SampleBatch, SampleRing
+from spool import SampleSpool, SpoolDrainer
 
 logging.basicConfig(
     filename=f"/home/done4/log_logger.log",
@@ -23,6 +53,16 @@ logger = logging.getLogger()
 
 warnings.simplefilter(action="ignore", category=UserWarning)
 
+# Local spool for samples that could not be written to the DB
+SPOOL_PATH = "/home/done4/logger_spool.sqlite3"
+# Hash used as dedupe key, "md5" (the hashes stored in raw_hamsterwheel and
+# closed_hamsterwheel) or "fast" (vectorized). Switching to "fast" needs the
+# stored hashes migrated first, else the re-read log tail is inserted again.
+HASH_MODE = "md5"
+# Number of recently written hashes kept to drop duplicate rows
+DEDUPE_INDEX_SIZE = 1000
+HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
 
 def read_last_n_lines(file_name: str, n: int) -> list:
     with open(file_name, "r") as f:
@@ -31,49 +71,122 @@ def read_last_n_lines(file_name: str, n: int) -> list:
         return last_n_lines
 
 
-def extract_date(line: str) -> str:
-    return line.split(" - ")[0]
-
-
-def extract_magnet(line: str) -> str:
-    return line.split(" - ")[1]
-
-
-def check_date(date: str) -> bool:
-    if not re.match(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+", date):
-        return False
-    return True
-
-
-def check_line(line: str) -> bool:
-    if " - " not in line:
-        return False
-
-    # Check the date is like '2023-08-08 13:59:59.763742'
-    date = extract_date(line)
-    if not re.match(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+", date):
-        return False
-
-    # Check that magnet is either 0 or 1
-    magnet = extract_magnet(line)
-    if not re.match(r"0|1", magnet):
-        return False
-
-    return True
+class LogFollower:
+    """Follow the hourly log file and return only the lines appended since the last call.
+
+    The follower keeps the file open and remembers its inode and byte offset, so
+    each call reads only the newly written bytes instead of the whole file. It
+    handles the hourly filename switch (the rest of the old file is read before
+    moving on) and truncation, e.g. by `> file` in the crontab (reading restarts
+    at the beginning of the file).
+    """
+
+    def __init__(
+        self,
+        get_file_name: Optional[Callable[[], str]] = None,
+        n_initial_lines: int = 20,
+    ) -> None:
+        # get_filename is defined further down in this module
+        self.get_file_name = get_file_name or get_filename
+        self.n_initial_lines = n_initial_lines
+        self.file_name: Optional[str] = None
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self._file: Optional[BinaryIO] = None
+        self._partial = b""
+        self._started = False
+
+    def read_new_lines(self) -> List[str]:
+        """Return the complete lines written since the last call."""
+        file_name = self.get_file_name()
+        lines = []
+        if self._file is not None and (
+            file_name != self.file_name or self._is_replaced()
+        ):
+            # Finish the old file before switching to the new one
+            lines += self._read_appended()
+            if self._partial:
+                lines.append(self._partial.decode(errors="replace"))
+            self.close()
+
+        if self._file is None:
+            if not self._open(file_name=file_name):
+                return lines
+        elif os.fstat(self._file.fileno()).st_size < self.offset:
+            # The file was truncated, start again from the beginning
+            self.offset = 0
+            self._partial = b""
+
+        lines += self._read_appended()
+        return lines
+
+    def close(self) -> None:
+        """Close the currently followed file."""
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self.file_name = None
+        self.inode = None
+        self.offset = 0
+        self._partial = b""
+
+    def _open(self, file_name: str) -> bool:
+        try:
+            self._file = open(file_name, "rb")
+        except FileNotFoundError:
+            return False
+        self.file_name = file_name
+        self.inode = os.fstat(self._file.fileno()).st_ino
+        self.offset = 0
+        if not self._started:
+            # On startup only pick up the last lines, like read_last_n_lines did
+            self._skip_to_last_lines()
+        self._started = True
+        return True
+
+    def _skip_to_last_lines(self) -> None:
+        data = self._file.read()
+        end = data.rfind(b"\n") + 1
+        start = end
+        for _ in range(self.n_initial_lines):
+            start = data.rfind(b"\n", 0, max(start - 1, 0)) + 1
+            if start == 0:
+                break
+        self.offset = start
+
+    def _is_replaced(self) -> bool:
+        try:
+            return os.stat(self.file_name).st_ino != self.inode
+        except FileNotFoundError:
+            return False
+
+    def _read_appended(self) -> List[str]:
+        self._file.seek(self.offset)
+        data = self._file.read()
+        self.offset += len(data)
+        data = self._partial + data
+        end = data.rfind(b"\n") + 1
+        self._partial = data[end:]
+        if end == 0:
+            return []
+        return data[: end - 1].decode(errors="replace").split("\n")
 
 
 def update_raw_hamsterwheel(
-    cursor: pymysql.cursors.Cursor,
     mysql_connection: pymysql.connections.Connection,
     df: pd.DataFrame,
-) -> None:
-    for index, row in df.iterrows():
-        time = row["time"]
-        magnet = row["magnet"]
-        hash = row["hash"]
-        query = f"INSERT INTO raw_hamsterwheel (hash, time, magnet) VALUES ('{hash}', '{time}', {magnet})"
-        cursor.execute(query)
-        mysql_connection.commit()
+) -> BulkInsertResult:
+    result = bulk_insert(
+        connection=mysql_connection,
+        table=table_raw_hamsterwheel.table_name,
+        df=df,
+        columns=list(table_raw_hamsterwheel.columns),
+        ignore_duplicates=True,
+    )
+    logger.info(
+        f"Inserted {result.rows} rows into raw_hamsterwheel ({result.rows_per_second:.0f} rows/s)."
+    )
+    return result
 
 
 def read_last_n_rows_from_raw_hamsterwheel(
@@ -85,7 +198,9 @@ def read_last_n_rows_from_raw_hamsterwheel(
     return df
 
 
-def create_df_from_log(dates: List[str], magnets: List[str]) -> pd.DataFrame:
+def create_df_from_log(
+    dates: Union[List[str], np.ndarray], magnets: Union[List[str], np.ndarray]
+) -> pd.DataFrame:
     df = pd.DataFrame(
         data={
             "time": dates,
@@ -104,6 +219,38 @@ def remove_rows(
     return df
 
 
+class RecentKeys:
+    """Size-bounded set of the keys written most recently.
+
+    Used to drop rows that were already inserted without querying the database.
+    When full, the oldest keys are evicted first.
+    """
+
+    def __init__(self, max_size: int = DEDUPE_INDEX_SIZE) -> None:
+        self.max_size = max_size
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, keys: Iterable[str]) -> None:
+        """Add keys, evicting the oldest keys above max_size."""
+        for key in keys:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    def remove_known(self, df: pd.DataFrame, compare_col: str) -> pd.DataFrame:
+        """Remove rows in df whose compare_col is already known or repeated in df."""
+        known = np.array([key in self._keys for key in df[compare_col]], dtype=bool)
+        df = df[~known]
+        return df[~df[compare_col].duplicated()]
+
+
 def get_filename() -> str:
     """Get filename from now."""
     now = datetime.now()
@@ -112,61 +259,214 @@ def get_filename() -> str:
     return log_path_fname
 
 
-def add_hash_column(df: pd.DataFrame, columns: list) -> pd.DataFrame:
-    """Add hash column to df based on columns."""
-    df["hash"] = (
-        df[columns]
-        .astype(str)
-        .apply(lambda x: hashlib.md5(x.to_string().encode()).hexdigest(), axis=1)
-    )
+def md5_row_hash(row: pd.Series) -> str:
+    """MD5 hex of the row's to_string(), the hash stored in raw_hamsterwheel by
+    earlier versions of the logger."""
+    return hashlib.md5(row.to_string().encode()).hexdigest()
+
+
+def md5_hash_column(df: pd.DataFrame) -> List[str]:
+    """Get md5_row_hash() of every row of df (all columns strings) without
+    building a Series per row.
+
+    The to_string() layout is rebuilt directly: labels left-justified, four
+    spaces, values right-justified to the longest value of the row. Rows with
+    values that to_string() would escape or truncate fall back to md5_row_hash().
+    """
+    labels = [str(column) for column in df.columns]
+    label_width = max(len(label) for label in labels)
+    labels = [label.ljust(label_width) + "    " for label in labels]
+    max_colwidth = pd.get_option("display.max_colwidth")
+
+    needs_fallback = np.zeros(len(df), dtype=bool)
+    for column in df.columns:
+        values = df[column]
+        needs_fallback |= values.str.contains(r"[^ -~]", regex=True).to_numpy()
+        if max_colwidth is not None:
+            needs_fallback |= (values.str.len() >= max_colwidth).to_numpy()
+
+    hashes = []
+    columns = [df[column].tolist() for column in df.columns]
+    for i, values in enumerate(zip(*columns)):
+        if needs_fallback[i]:
+            hashes.append(md5_row_hash(df.iloc[i]))
+            continue
+        value_width = max(len(value) for value in values)
+        row_string = "\n".join(
+            label + value.rjust(value_width) for label, value in zip(labels, values)
+        )
+        hashes.append(hashlib.md5(row_string.encode()).hexdigest())
+    return hashes
+
+
+def columns_to_str(df: pd.DataFrame) -> pd.DataFrame:
+    """The columns of df as strings that do not depend on the other rows.
+
+    astype(str) formats datetime64 values to the precision the whole column
+    needs, so the same time could hash differently depending on its batch.
+    Times are rendered like the log lines instead, '2023-08-08 13:59:59.100000'.
+    Without rows the columns are empty str columns.
+    """
+    df_str = pd.DataFrame(index=df.index)
+    for column in df.columns:
+        values = df[column]
+        if len(values) == 0:
+            # np.char.replace raises on zero-length arrays in some numpy versions
+            df_str[column] = pd.Series(index=df.index, dtype=str)
+        elif pd.api.types.is_datetime64_any_dtype(values.dtype):
+            dates = np.datetime_as_string(
+                values.to_numpy(dtype="datetime64[us]"), unit="us"
+            )
+            df_str[column] = np.char.replace(dates, "T", " ")
+        else:
+            df_str[column] = values.astype(str)
+    return df_str
+
+
+def add_hash_column(
+    df: pd.DataFrame, columns: list, mode: str = HASH_MODE
+) -> pd.DataFrame:
+    """Add hash column to df based on columns.
+
+    mode "fast" hashes all rows at once with pandas.util.hash_pandas_object and
+    stores the 64 bit hash as hex. mode "md5" gives the MD5 hex of the rows as
+    stored in raw_hamsterwheel by earlier versions of the logger.
+    """
+    df_str = columns_to_str(df[columns])
+    if mode == "fast":
+        hashes = pd.util.hash_pandas_object(df_str, index=False).to_numpy()
+        # Format the 64 bit hashes as 16 hex digits without a python loop
+        shifts = np.arange(60, -4, -4, dtype=np.uint64)
+        nibbles = (hashes[:, None] >> shifts) & np.uint64(0xF)
+        df["hash"] = HEX_DIGITS[nibbles].view("S16").ravel().astype(str)
+    elif mode == "md5":
+        df["hash"] = md5_hash_column(df_str) if len(df) > 0 else []
+    else:
+        raise ValueError(f"Unknown hash mode: {mode}")
     return df
 
 
-if __name__ == "__main__":
-    while True:
-        try:
-            file_name = get_filename()
-            # Create mysql connection
-            mysql_connection = pymysql.connect(
-                host="192.168.1.121",
-                user="tiberius",
-                password="q123",
-                db="cryptohamster",
-                port=3306,
-                charset="utf8",
-            )
+def samples_to_df(times: np.ndarray, magnets: np.ndarray) -> pd.DataFrame:
+    """Rows for raw_hamsterwheel with a hash column from sample arrays, e.g.
+    from parse_lines() or a sample_ring.RingReader."""
+    df = create_df_from_log(dates=times.astype("datetime64[us]"), magnets=magnets)
+    df = add_hash_column(df=df, columns=["time", "magnet"])
+    return df
 
-            # Get Cursor
-            cursor = mysql_connection.cursor()
-            loglines = read_last_n_lines(file_name=file_name, n=20)
-            dates = []
-            magnets = []
-            for line in loglines:
-                if check_line(line):
-                    line = line.strip()
-                    date = extract_date(line)
-                    magnet = extract_magnet(line)
-                    dates.append(date)
-                    magnets.append(magnet)
-
-            df_new = create_df_from_log(dates=dates, magnets=magnets)
-            df_new = add_hash_column(df=df_new, columns=["time", "magnet"])
-            df_read = read_last_n_rows_from_raw_hamsterwheel(
-                mysql_connection=mysql_connection, n=20
-            )
-            df = remove_rows(df_1=df_new, df_2=df_read, compare_col="hash")
+
+def lines_to_df(lines: List[str]) -> pd.DataFrame:
+    """Parse log lines into rows for raw_hamsterwheel with a hash column."""
+    parsed = parse_lines(lines)
+    if parsed.rejected > 0:
+        logger.warning(f"Rejected {parsed.rejected} invalid log lines")
+    return samples_to_df(times=parsed.times, magnets=parsed.magnets)
+
+
+def batches_to_df(batches: List[SampleBatch]) -> pd.DataFrame:
+    """Rows for raw_hamsterwheel with a hash column from the sample batches of a
+    sample_ring.RingFollower."""
+    return samples_to_df(
+        times=np.concatenate([batch.times for batch in batches]),
+        magnets=np.concatenate([batch.magnets for batch in batches]),
+    )
+
+
+class RawHamsterwheelWriter:
+    """Write new rows to raw_hamsterwheel.
+
+    Rows already written are dropped with RecentKeys, seeded from the database on
+    the first write. Rows that cannot be written are appended to the spool. When
+    written rows start the hamsterwheel running, the notifier, if any, wakes
+    the main loop.
+    """
+
+    def __init__(
+        self,
+        connection_manager: ConnectionManager,
+        spool: SampleSpool,
+        dedupe_index_size: int = DEDUPE_INDEX_SIZE,
+        notifier: Optional[Notifier] = None,
+        write: Callable[[Any, pd.DataFrame], Any] = update_raw_hamsterwheel,
+    ) -> None:
+        self.connection_manager = connection_manager
+        self.spool = spool
+        self.notifier = notifier
+        self.dedupe_index_size = dedupe_index_size
+        self.recent_keys: Optional[RecentKeys] = None
+        self.running_starts = RunningStarts()
+        self._write = write
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.recent_keys is not None:
+            df = self.recent_keys.remove_known(df=df, compare_col="hash")
+        try:
+            mysql_connection = self.connection_manager.get_connection()
+            if self.recent_keys is None:
+                # Seed the dedupe index from the database once at startup
+                df_read = read_last_n_rows_from_raw_hamsterwheel(
+                    mysql_connection=mysql_connection, n=self.dedupe_index_size
+                )
+                self.recent_keys = RecentKeys(max_size=self.dedupe_index_size)
+                self.recent_keys.add(df_read["hash"].iloc[::-1])
+                df = self.recent_keys.remove_known(df=df, compare_col="hash")
             if len(df) > 0:
                 logger.info(f"Saving to DB new rows: {len(df)}")
-                update_raw_hamsterwheel(
-                    cursor=cursor, mysql_connection=mysql_connection, df=df
+                self._write(mysql_connection, df)
+                starts_running = self.running_starts.update(
+                    times=pd.to_datetime(df["time"]).to_numpy(), magnets=df["magnet"]
                 )
-            mysql_connection.close()
-            time.sleep(1)
-        except KeyboardInterrupt:
-            print("Exiting")
-            mysql_connection.close()
-            sys.exit(0)
+                if starts_running and self.notifier is not None:
+                    self.notifier.notify(TOPIC_SAMPLES)
         except Exception as e:
-            logger.error(f"Error: {e}")
-            mysql_connection.close()
-            continue
+            logger.error(f"Error writing to DB, spooling {len(df)} rows: {e}")
+            # Reconnect on the next write
+            self.connection_manager.close()
+            self.spool.append(df)
+            logger.info(f"Spool: {self.spool.metrics()}")
+        if self.recent_keys is not None:
+            self.recent_keys.add(df["hash"])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write the sensor samples to the DB.")
+    parser.add_argument(
+        "--ring", help="Follow this sample ring file instead of the text log"
+    )
+    args = parser.parse_args()
+    connection_manager = ConnectionManager()
+    # Samples that cannot be written to the DB are spooled locally and replayed later
+    spool = SampleSpool(path=SPOOL_PATH)
+    drainer = SpoolDrainer(spool=spool, write=update_raw_hamsterwheel)
+    drainer.start()
+    # Wake the main loop when new samples were written
+    writer = RawHamsterwheelWriter(
+        connection_manager=connection_manager, spool=spool, notifier=Notifier()
+    )
+    if args.ring is not None:
+        pipeline = IngestPipeline(
+            followers=[
+                # Resume after the samples read before a restart
+                RingFollower(
+                    SampleRing.open_or_create(args.ring),
+                    state_path=f"{args.ring}.read_count",
+                )
+            ],
+            parse=batches_to_df,
+            write=writer.write,
+        )
+    else:
+        pipeline = IngestPipeline(
+            followers=[LogFollower(n_initial_lines=20)],
+            parse=lines_to_df,
+            write=writer.write,
+        )
+    try:
+        asyncio.run(pipeline.run())
+    except KeyboardInterrupt:
+        print("Exiting")
+        drainer.stop()
+        connection_manager.close()
+        spool.close()
+        sys.exit(0)
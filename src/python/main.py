@@ -1,9 +1,26 @@
-import time
+import numpy as np
 import pandas as pd
 import logging
-from typing import List, Optional
+from typing import Any, Callable, List, NamedTuple, Optional
 from datetime import datetime
 import sys
+from functools import partial
+from db_connection import ConnectionManager
+from decision_log import DecisionLog
+from domain import (
+    Decision,
+    Order,
+    PriceSnapshot,
+    SnapshotCache,
+    WalletSnapshot,
+    decision_from_df,
+    decisions_from_df,
+    to_df,
+)
+from repository import InMemoryRepository, MySQLRepository, Repository
+from turn_events import falling_edges
+from notifications import ChangeListener, WakeLatency, WAKE_TIMEOUT
+from window_store import WindowStore
 
 logging.basicConfig(
     format="%(asctime)s %(levelname)s %(message)s",
@@ -13,7 +30,10 @@ logging.basicConfig(
 logger = logging.getLogger()
 
 DECISION_LIST = ["buy_or_sell", "currency", "amount"]
-SLEEP_TIME = 0.5
+AMOUNT_OPTIONS = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0])
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+# Log the repository query and wake-to-decision latency every this many ticks
+REPORT_TICKS = 120
 
 mockup_raw_hamsterwheel_df = pd.DataFrame(
     {
@@ -34,20 +54,6 @@ mockup_raw_hamsterwheel_df = pd.DataFrame(
     }
 )
 
-mockup_latest_hamsterwheel_df = pd.DataFrame(
-    {
-        "id": [1, 2, 3, 4, 5],
-        "time": [
-            "2023-08-03 12:00:00",
-            "2023-08-03 12:00:01",
-            "2023-08-03 12:00:02",
-            "2023-08-03 12:00:03",
-            "2023-08-03 12:00:04",
-        ],
-        "magnet": [1, 1, 1, 1, 1],
-    }
-)
-
 mockup_decision_df = pd.DataFrame(
     {
         "id": [1],
@@ -80,16 +86,6 @@ mockup_price_df = pd.DataFrame(
 # TODO Write function to read price from binance and save to database
 
 
-def get_latest_decision(df_decision: pd.DataFrame) -> Optional[pd.DataFrame]:
-    """Function to get the latest decision"""
-    if df_decision is not None:
-        # order by start_time desc
-        df_decision = df_decision.sort_values(by="start_time", ascending=False)
-        df_decision_latest = df_decision.iloc[[0]]
-        return df_decision_latest
-    return None
-
-
 def is_hamsterwheel_running(df: pd.DataFrame) -> bool:
     """Function to determine if the hamsterwheel is running, i.e., there has been a magnet 0 in the last 5 seconds"""
     if 0 in df["magnet"].values:
@@ -97,23 +93,23 @@ def is_hamsterwheel_running(df: pd.DataFrame) -> bool:
     return False
 
 
-def is_decision_open(df_decision_latest: pd.DataFrame) -> bool:
+def decision_is_open(decision_latest: Optional[Decision]) -> bool:
     """Function to determine if there is currently a decision open"""
-    # During init, the length of df is 0
-    if df_decision_latest is not None:
-        if "open" in df_decision_latest["status"].values:
-            return True
-    return False
+    # During init, there is no decision
+    return decision_latest is not None and decision_latest.status == "open"
 
 
-def get_next_decision(
-    df_decision_latest: pd.DataFrame, decisions: List[str] = DECISION_LIST
+def is_decision_open(df_decision_latest: Optional[pd.DataFrame]) -> bool:
+    """Function to determine if there is currently a decision open"""
+    return decision_is_open(decision_from_df(df_decision_latest))
+
+
+def get_next_decision_type(
+    decision_latest: Optional[Decision], decisions: List[str] = DECISION_LIST
 ) -> str:
-    """Function to get the next decision"""
-    if df_decision_latest is not None:
-        current_decision = df_decision_latest["type"].values[0]
-        current_decision_index = decisions.index(current_decision)
-        next_decision_index = current_decision_index + 1
+    """Function to get the type of the next decision"""
+    if decision_latest is not None:
+        next_decision_index = decisions.index(decision_latest.type) + 1
         if next_decision_index >= len(decisions):
             next_decision_index = 0
         return decisions[next_decision_index]
@@ -122,69 +118,55 @@ def get_next_decision(
     return decisions[0]
 
 
-def save_new_decision(next_decision: str) -> None:
+def get_next_decision(
+    df_decision_latest: Optional[pd.DataFrame], decisions: List[str] = DECISION_LIST
+) -> str:
+    """Function to get the next decision"""
+    return get_next_decision_type(decision_from_df(df_decision_latest), decisions)
+
+
+def save_new_decision(
+    next_decision: str, start_time: Optional[datetime] = None
+) -> Decision:
     """Function to save a new decision to the database"""
     save_log(message=f"Saving new decision: {next_decision}")
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-    new_decision = pd.DataFrame(
-        {
-            "start_time": [now],
-            "end_time": [None],
-            "number_hamsterwheel_turns": [None],
-            "type": [next_decision],
-            "status": ["open"],
-            "result": [None],
-        }
+    new_decision = Decision(
+        id=None,
+        start_time=(start_time or datetime.now()).strftime(TIME_FORMAT),
+        end_time=None,
+        type=next_decision,
+        number_hamsterwheel_turns=None,
+        status="open",
+        result=None,
     )
     # TODO: Save the new decision to the database
     logger.debug(f"New decision: {new_decision}")
+    return new_decision
 
 
-def update_decision(df_decision_latest: pd.DataFrame) -> None:
+def update_decision(decision: Any) -> None:
     """Function to update a decision in the database"""
     # TODO: Update the decision in the database
-    save_log(message=f"Updating decision: {df_decision_latest}")
-
-
-def get_decision_cycle(df_decision: pd.DataFrame) -> Optional[pd.DataFrame]:
-    """Function to get the decision cycle, i.e., all
-    decisions after the last buy_or_sell decision"""
-    # Get the last buy_or_sell decision
-    if df_decision is not None:
-        buy_or_sell_filter = df_decision["type"] == "buy_or_sell"
-        df_buy_or_sell = df_decision[buy_or_sell_filter]
-        # Order by start_time desc
-        df_buy_or_sell = df_buy_or_sell.sort_values(by="start_time", ascending=False)
-        last_buy_or_sell = df_buy_or_sell.iloc[[0]]
-        last_buy_or_sell_index = last_buy_or_sell.index[0]
-        # Get all the decisions after the last buy_or_sell decision
-        df_decision_cycle = df_decision.iloc[last_buy_or_sell_index:]
-        return df_decision_cycle
-    return None
-
-
-def has_money(df_wallet: pd.DataFrame) -> bool:
+    save_log(message=f"Updating decision: {decision}")
+
+
+def has_money(df_wallet: Optional[pd.DataFrame]) -> bool:
     """Function to check if the hamster has money.
     If the hamster has less than 5 USD, then it is broke"""
-    if df_wallet is not None:
-        if "USD" in df_wallet["currency"].values:
-            usd_filter = df_wallet["currency"] == "USD"
-            df_usd = df_wallet[usd_filter]
-            if df_usd["amount"].values[0] > 5:
-                return True
-            else:
-                return False
-    return False
+    return WalletSnapshot.from_df(df_wallet).has_money
 
 
-def has_crypto(df_wallet: pd.DataFrame) -> bool:
+def has_crypto(df_wallet: Optional[pd.DataFrame]) -> bool:
     """Function to determine if the hamster has crypto (True)."""
-    if df_wallet is not None:
-        # Check if there is any non USD currency
-        currencies = df_wallet["currency"].values
-        if len(currencies) > 1:
-            return True
-    return False
+    return WalletSnapshot.from_df(df_wallet).has_crypto
+
+
+def get_cycle_result(decision_cycle: List[Decision], decision_type: str) -> Any:
+    """Function to get the result of the decision of decision_type in the cycle"""
+    for decision in decision_cycle:
+        if decision.type == decision_type:
+            return decision.result
+    raise ValueError(f"No {decision_type} decision in the decision cycle")
 
 
 def get_buy_or_sell_decision(df_decision_cycle: pd.DataFrame) -> str:
@@ -203,153 +185,301 @@ def get_currency_decision(df_decision_cycle: pd.DataFrame) -> str:
     return df_currency["result"].values[0]
 
 
-def get_currencies_to_sell(df_wallet: pd.DataFrame) -> List[str]:
+def get_currencies_to_sell(df_wallet: Optional[pd.DataFrame]) -> List[str]:
     """Function to get the currencies to sell"""
-    currencies_to_sell = []
-    if df_wallet is not None:
-        # Get all the currencies
-        currencies = df_wallet["currency"].values
-        # Remove USD from the currencies
-        currencies = [currency for currency in currencies if currency != "USD"]
-        # If there are currencies left, return them
-        if len(currencies) > 0:
-            return currencies
-    return currencies_to_sell
+    return list(WalletSnapshot.from_df(df_wallet).currencies_to_sell)
 
 
-def close_decision(
-    df_decision_latest: pd.DataFrame,
-    df_decision_cycle: pd.DataFrame,
+def get_decision_result(
+    decision_type: str,
     number_hamsterwheel_turns: int,
-    end_time: datetime,
-    df_wallet: pd.DataFrame,
-) -> pd.DataFrame:
-    """Function to close a decision and return the result"""
-    save_log(message=f"Closing decision: {df_decision_latest}")
-
-    df_decision_latest["end_time"] = end_time
-    df_decision_latest["status"] = "closed"
-    df_decision_latest["number_hamsterwheel_turns"] = number_hamsterwheel_turns
-    current_decision = df_decision_latest["type"].values[0]
-    if current_decision == "buy_or_sell":
+    decision_cycle: List[Decision],
+    wallet: WalletSnapshot,
+) -> Any:
+    """Function to get the result of a decision from the number of hamsterwheel turns"""
+    if decision_type == "buy_or_sell":
         result = get_result_buy_or_sell(number_hamsterwheel_turns)
         # If the hamster has money but no crypto, then the result will be buy
-        if has_money(df_wallet) and not has_crypto(df_wallet):
+        if wallet.has_money and not wallet.has_crypto:
             result = "buy"
 
         # If the hamster has no money but crypto, then the result will be sell
-        if not has_money(df_wallet) and has_crypto(df_wallet):
+        if not wallet.has_money and wallet.has_crypto:
             result = "sell"
 
-    elif current_decision == "currency":
+    elif decision_type == "currency":
         # TODO Add logic if the buy_or_sell decision was sell, then the currency_list is the list of currencies the hamster has
-        if get_buy_or_sell_decision(df_decision_cycle) == "sell":
-            currency_list = get_currencies_to_sell(df_wallet=df_wallet)
-        if get_buy_or_sell_decision(df_decision_cycle) == "buy":
+        buy_or_sell_decision = get_cycle_result(decision_cycle, "buy_or_sell")
+        if buy_or_sell_decision == "sell":
+            currency_list = list(wallet.currencies_to_sell)
+        if buy_or_sell_decision == "buy":
             currency_list = ["USD"]
 
         result = get_result_currency(
             number_hamsterwheel_turns=number_hamsterwheel_turns,
             currency_list=currency_list,
         )
-    elif current_decision == "amount":
+    elif decision_type == "amount":
         result = get_result_amount(number_hamsterwheel_turns)
-    df_decision_latest["result"] = result
+    return result
+
+
+def finish_decision(
+    decision_latest: Decision,
+    decision_cycle: List[Decision],
+    number_hamsterwheel_turns: int,
+    end_time: Any,
+    wallet: WalletSnapshot,
+) -> Decision:
+    """Function to close a decision and set its result"""
+    save_log(message=f"Closing decision: {decision_latest}")
+    decision_latest.end_time = end_time
+    decision_latest.status = "closed"
+    decision_latest.number_hamsterwheel_turns = number_hamsterwheel_turns
+    decision_latest.result = get_decision_result(
+        decision_type=decision_latest.type,
+        number_hamsterwheel_turns=number_hamsterwheel_turns,
+        decision_cycle=decision_cycle,
+        wallet=wallet,
+    )
+    update_decision(decision_latest)
+    return decision_latest
 
-    update_decision(df_decision_latest)
 
+def close_decision(
+    df_decision_latest: pd.DataFrame,
+    df_decision_cycle: pd.DataFrame,
+    number_hamsterwheel_turns: int,
+    end_time: datetime,
+    df_wallet: pd.DataFrame,
+) -> pd.DataFrame:
+    """Function to close a decision and return the result, finish_decision()
+    on the row of df_decision_latest"""
+    decision = finish_decision(
+        decision_latest=decision_from_df(df_decision_latest),
+        decision_cycle=decisions_from_df(df_decision_cycle),
+        number_hamsterwheel_turns=number_hamsterwheel_turns,
+        end_time=end_time,
+        wallet=WalletSnapshot.from_df(df_wallet),
+    )
+    for field in ["end_time", "status", "number_hamsterwheel_turns", "result"]:
+        df_decision_latest[field] = getattr(decision, field)
     return df_decision_latest
 
 
 def get_number_hamsterwheel_turns(
     df_raw_hamsterwheel: pd.DataFrame, start_time: datetime, end_time: datetime
 ) -> int:
-    """Function to get the number of hamsterwheel turns"""
-    time_filter = (df_raw_hamsterwheel["time"] >= start_time) & (
-        df_raw_hamsterwheel["time"] <= end_time
-    )
-    df_hamsterwheel_turns = df_raw_hamsterwheel[time_filter]
-    magnet_filter = df_hamsterwheel_turns["magnet"] == 0
-    df_hamsterwheel_turns = df_hamsterwheel_turns[magnet_filter]
-    number_hamsterwheel_turns = len(df_hamsterwheel_turns)
+    """Function to get the number of hamsterwheel turns, i.e., the number of
+    times the magnet closed (changed from 1 to 0) between start_time and end_time"""
+    df_raw_hamsterwheel = df_raw_hamsterwheel.sort_values(by="time")
+    # A slow pass over the magnet gives several closed samples but one edge
+    edges = falling_edges(df_raw_hamsterwheel["magnet"].to_numpy())
+    edge_times = df_raw_hamsterwheel["time"].iloc[edges]
+    time_filter = (edge_times >= start_time) & (edge_times <= end_time)
+    number_hamsterwheel_turns = int(time_filter.sum())
     logger.debug(
         f"Between {start_time} and {end_time} there were {number_hamsterwheel_turns} hamsterwheel turns"
     )
     return number_hamsterwheel_turns
 
 
+def get_results_buy_or_sell(number_hamsterwheel_turns: np.ndarray) -> np.ndarray:
+    """Function to get the results of buy or sell decisions for an array of turns"""
+    # An even number of hamsterwheel turns is buy, an odd number is sell
+    return np.where(np.asarray(number_hamsterwheel_turns) % 2 == 0, "buy", "sell")
+
+
+def get_results_currency(
+    number_hamsterwheel_turns: np.ndarray, currency_list: List[str]
+) -> np.ndarray:
+    """Function to get the results of currency decisions for an array of turns"""
+    if len(currency_list) == 0:
+        raise ValueError("No currencies to choose from")
+    # The currency list repeats, so the turns index it modulo its length
+    return np.asarray(currency_list)[
+        np.asarray(number_hamsterwheel_turns) % len(currency_list)
+    ]
+
+
+def get_results_amount(number_hamsterwheel_turns: np.ndarray) -> np.ndarray:
+    """Function to get the results of amount decisions for an array of turns"""
+    # The amount options repeat, so the turns index them modulo their length
+    return AMOUNT_OPTIONS[np.asarray(number_hamsterwheel_turns) % len(AMOUNT_OPTIONS)]
+
+
 def get_result_buy_or_sell(number_hamsterwheel_turns: int) -> str:
     """Function to get the result of the buy or sell decision"""
-    # If the number of hamsterwheel turns is even, then buy
-    if number_hamsterwheel_turns % 2 == 0:
-        return "buy"
-    # If the number of hamsterwheel turns is odd, then sell
-    return "sell"
+    return get_results_buy_or_sell(number_hamsterwheel_turns).item()
 
 
 def get_result_currency(
     number_hamsterwheel_turns: int, currency_list: List[str]
 ) -> str:
     """Function to get the result of the currency decision"""
-    # Repeat the list of currencies until it is longer than the number of hamsterwheel turns
-    currency_list = currency_list * (
-        number_hamsterwheel_turns // len(currency_list) + 1
-    )
-    # Get the currency at the index of the number of hamsterwheel turns
-    return currency_list[number_hamsterwheel_turns]
+    return get_results_currency(number_hamsterwheel_turns, currency_list).item()
 
 
 def get_result_amount(number_hamsterwheel_turns: int) -> float:
     """Function to get the result of the amount decision"""
-    amount_options = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
-    # Repeat the list of amount options until it is longer than the number of hamsterwheel turns
-    amount_options = amount_options * (
-        number_hamsterwheel_turns // len(amount_options) + 1
-    )
-    # Get the amount at the index of the number of hamsterwheel turns
-    return amount_options[number_hamsterwheel_turns]
+    return get_results_amount(number_hamsterwheel_turns).item()
 
 
 def get_wallet_id(currency: str, df_wallet: pd.DataFrame) -> int:
     """Function to get the wallet id"""
-    currency_filter = df_wallet["currency"] == currency
-    df_currency = df_wallet[currency_filter]
-    return df_currency["id"].values[0]
+    return WalletSnapshot.from_df(df_wallet).wallet_id(currency)
 
 
 def get_price(currency: str, df_price: pd.DataFrame) -> float:
     """Function to get the price"""
-    currency_filter = df_price["currency"] == currency
-    df_currency = df_price[currency_filter]
-    return df_currency["price"].values[0]
+    return PriceSnapshot.from_df(df_price).price(currency)
+
+
+def create_order(
+    decision_closed: Decision,
+    decision_cycle: List[Decision],
+    wallet: WalletSnapshot,
+    prices: PriceSnapshot,
+) -> Order:
+    """Function to create the order of a closed amount decision"""
+    currency_decision = get_cycle_result(decision_cycle, "currency")
+    return Order(
+        wallet_id=wallet.wallet_id(currency_decision),
+        type=get_cycle_result(decision_cycle, "buy_or_sell"),
+        currency=currency_decision,
+        amount=decision_closed.result,
+        price=prices.price(currency_decision),
+        state="pending",
+    )
 
 
 def prepare_order(
     df_decision_closed: pd.DataFrame,
     df_decision_cycle: pd.DataFrame,
     df_wallet: pd.DataFrame,
+    df_price: pd.DataFrame,
 ) -> pd.DataFrame:
-    """Function to prepare the order"""
-    # Get the buy_or_sell decision
-    buy_or_sell_decision = get_buy_or_sell_decision(df_decision_cycle=df_decision_cycle)
-    # Get the currency decision
-    currency_decision = get_currency_decision(df_decision_cycle=df_decision_cycle)
-    # Get the amount decision
-    amount_decision = df_decision_closed["result"].values[0]
-
-    wallet_id = get_wallet_id(currency=currency_decision, df_wallet=df_wallet)
-    price = get_price(currency=currency_decision, df_price=df_price)
-    order = pd.DataFrame(
-        {
-            "wallet_id": [wallet_id],
-            "type": [buy_or_sell_decision],
-            "currency": [currency_decision],
-            "amount": [amount_decision],
-            "price": [price],
-            "state": ["pending"],
-        }
+    """Function to prepare the order, create_order() on DataFrames"""
+    order = create_order(
+        decision_closed=decision_from_df(df_decision_closed),
+        decision_cycle=decisions_from_df(df_decision_cycle),
+        wallet=WalletSnapshot.from_df(df_wallet),
+        prices=PriceSnapshot.from_df(df_price),
     )
-    return order
+    return to_df(Order, [order])
+
+
+def get_wake_timeout(
+    running_until: Optional[pd.Timestamp],
+    now: datetime,
+    timeout: float = WAKE_TIMEOUT,
+) -> float:
+    """Function to get the seconds to wait for a change notification, at most
+    timeout and only until the hamsterwheel stops counting as running"""
+    if running_until is None:
+        return timeout
+    seconds = (running_until - pd.Timestamp(now)).total_seconds()
+    # When the hamsterwheel is already stopped, only a change can wake the loop
+    if seconds <= 0:
+        return timeout
+    return min(seconds, timeout)
+
+
+def count_turns(
+    window_store: WindowStore, repository: Repository, start_time: str, end_time: str
+) -> int:
+    """Function to get the number of hamsterwheel turns from the window store,
+    or from the database if the window does not reach back to start_time"""
+    if window_store.covers(start_time):
+        return window_store.turns_between(start_time=start_time, end_time=end_time)
+    return get_number_hamsterwheel_turns(
+        df_raw_hamsterwheel=repository.hamsterwheel_between(
+            start_time=start_time, end_time=end_time
+        ),
+        start_time=start_time,
+        end_time=end_time,
+    )
+
+
+class Step(NamedTuple):
+    """What decide() did: open, close, wait (decision open and hamsterwheel
+    running), idle (no decision open and hamsterwheel not running) or broke."""
+
+    action: str
+    decision: Optional[Decision] = None
+    order: Optional[Order] = None
+
+
+def decide(
+    now: datetime,
+    is_running: bool,
+    decision_log: DecisionLog,
+    wallet: WalletSnapshot,
+    prices: PriceSnapshot,
+    count_turns: Callable[[str, str], int],
+) -> Step:
+    """Function to take the decision of one tick of the main loop at time now.
+    count_turns(start_time, end_time) returns the hamsterwheel turns in between"""
+    decision_latest = decision_log.latest()
+    logger.debug(f"Latest decision: {decision_latest}")
+    save_log(message=f"Hamsterwheel is running? {is_running}")
+
+    # Check if there is currently a decision open
+    decision_open = decision_is_open(decision_latest)
+    save_log(message=f"Decision open? {decision_open}")
+
+    # If the hamster has no money and no crypto, then it is broke
+    if not wallet.has_money and not wallet.has_crypto:
+        save_log(message="Hamster is broke")
+        return Step("broke")
+    # If the hamsterwheel is running and there is no decision open, then open a new decision
+    if is_running and not decision_open:
+        save_log(message="Opening a new decision")
+        next_decision = get_next_decision_type(decision_latest)
+        save_log(message=f"Next decision: {next_decision}")
+        decision_new = save_new_decision(next_decision, start_time=now)
+        decision_log.append(decision_new)
+        return Step("open", decision=decision_new)
+
+    # If the hamsterwheel is not running and there is no decision open, then do nothing
+    if not is_running and not decision_open:
+        save_log(message="No decision open and hamsterwheel not running")
+        return Step("idle")
+
+    # If the hamsterwheel is running and there is a decision open, then do nothing
+    if is_running and decision_open:
+        save_log(message="Hamsterwheel running and decision open")
+        return Step("wait", decision=decision_latest)
+
+    # The hamsterwheel is not running and there is a decision open, so close the decision
+    save_log(message="Closing the decision")
+    end_time = now.strftime(TIME_FORMAT)
+    # Check how many hamsterwheel turns there were
+    number_hamsterwheel_turns = count_turns(decision_latest.start_time, end_time)
+    logger.debug(f"Number of hamsterwheel turns: {number_hamsterwheel_turns}")
+    # Get all the decisions for this cycle of decisions
+    decision_cycle = decision_log.cycle()
+    decision_closed = finish_decision(
+        decision_latest=decision_latest,
+        decision_cycle=decision_cycle,
+        number_hamsterwheel_turns=number_hamsterwheel_turns,
+        end_time=end_time,
+        wallet=wallet,
+    )
+    save_log(message=f"Decision closed: {decision_closed}")
+
+    # If the decision was amount and is closed, place the order
+    order = None
+    if decision_closed.type == "amount":
+        save_log(message="Preparing order")
+        order = create_order(
+            decision_closed=decision_closed,
+            decision_cycle=decision_cycle,
+            wallet=wallet,
+            prices=prices,
+        )
+        logger.debug(f"Order: {order}")
+    return Step("close", decision=decision_closed, order=order)
 
 
 def save_log(message: str) -> None:
@@ -360,86 +490,74 @@ def save_log(message: str) -> None:
 
 
 if __name__ == "__main__":
-    while True:
-        # TODO Check if there is an open order
-        # TODO: Read the latest 5 seconds of hamsterwheel data from the mysql database and store in a pandas dataframe
-        df_latest_hamsterwheel = mockup_latest_hamsterwheel_df
-
-        # TODO: Read the latest decision in the decision table from the database
-        df_decision = mockup_decision_df
-
-        # TODO: Read the wallet of the hamster from the database
-        df_wallet = mockup_wallet_df
+    import argparse
 
-        # TODO: Read the price of the currencies from the database
-        df_price = mockup_price_df
-
-        df_decision_latest = get_latest_decision(df_decision=df_decision)
-
-        logger.debug(f"Latest decision: {df_decision_latest}")
+    parser = argparse.ArgumentParser(description="Run the cryptohamster.")
+    parser.add_argument(
+        "--mockup", action="store_true", help="Use the mockup data instead of MySQL"
+    )
+    args = parser.parse_args()
+    if args.mockup:
+        repository = InMemoryRepository(
+            df_raw_hamsterwheel=mockup_raw_hamsterwheel_df,
+            df_decision=mockup_decision_df,
+            df_wallet=mockup_wallet_df,
+            df_price=mockup_price_df,
+            now=lambda: datetime(2023, 8, 3, 12, 0, 9),
+        )
+    else:
+        repository = MySQLRepository(connection_manager=ConnectionManager())
+
+    # The wallet and price snapshots are only rebuilt when their rows change
+    wallet_snapshots = SnapshotCache(WalletSnapshot.from_df)
+    price_snapshots = SnapshotCache(PriceSnapshot.from_df)
+    decision_log = DecisionLog()
+    window_store = WindowStore()
+    # The loop waits for change notifications, e.g. new samples from the
+    # logger, instead of polling
+    listener = ChangeListener()
+    wake_latency = WakeLatency()
+    wake_up = None
+    timeout = 0.0
+    tick = 0
+    while True:
+        if wake_up is not None:
+            # The decision of the last wake-up was taken
+            wake_latency.record(wake_up)
+        wake_up = listener.wait(timeout=timeout)
+        # Every tick reads fresh data, repeated reads within a tick are cached
+        repository.start_tick()
+        tick += 1
+        if tick % REPORT_TICKS == 0:
+            logger.info(f"Repository latency: {repository.latency_stats()}")
+            logger.info(f"Wake-to-decision latency: {wake_latency.stats()}")
 
+        # TODO Check if there is an open order
+        # Append the hamsterwheel samples logged since the last tick
+        window_store.sync(repository)
+
+        # Read the wallet, the current prices of the currencies and the latest
+        # decision, the loop works on domain objects made from these rows
+        wallet = wallet_snapshots.get(repository.wallet())
+        prices = price_snapshots.get(repository.prices())
+        # Only the new and the still open decisions are read from the database
+        decision_log.sync(repository)
+
+        # One clock for the tick: the running state, the wake-up and the
+        # decision times all use the repository's (simulated under --mockup)
+        now = repository.now()
         # Determine if the hamsterwheel is running, i.e., there has been a magnet 0 in the last 5 seconds
-        is_running = is_hamsterwheel_running(df_latest_hamsterwheel)
-        save_log(message=f"Hamsterwheel is running? {is_running}")
-
-        # Check if there is currently a decision open
-        decision_open = is_decision_open(df_decision_latest)
-        save_log(message=f"Decision open? {decision_open}")
-
-        # If the hamster has no money and no crypto, then it is broke
-        if not has_money(df_wallet) and not has_crypto(df_wallet):
-            save_log(message="Hamster is broke")
+        is_running = window_store.is_running(now=now)
+        # Without a notification, wake up when the hamsterwheel stops running
+        timeout = get_wake_timeout(running_until=window_store.running_until(), now=now)
+
+        step = decide(
+            now=now,
+            is_running=is_running,
+            decision_log=decision_log,
+            wallet=wallet,
+            prices=prices,
+            count_turns=partial(count_turns, window_store, repository),
+        )
+        if step.action == "broke":
             sys.exit()
-        # If the hamsterwheel is running and there is no decision open, then open a new decision
-        if is_running and not decision_open:
-            save_log(message="Opening a new decision")
-            next_decision = get_next_decision(df_decision_latest)
-            save_log(message=f"Next decision: {next_decision}")
-
-            save_new_decision(next_decision)
-            time.sleep(SLEEP_TIME)
-            continue
-
-        # If the hamsterwheel is not running and there is no decision open, then do nothing
-        if not is_running and not decision_open:
-            save_log(message="No decision open and hamsterwheel not running")
-            time.sleep(SLEEP_TIME)
-            continue
-
-        # If the hamsterwheel is running and there is a decision open, then do nothing
-        if is_running and decision_open:
-            save_log(message="Hamsterwheel running and decision open")
-            time.sleep(SLEEP_TIME)
-            continue
-
-        # If the hamsterwheel is not running and there is a decision open, then close the decision
-        if not is_running and decision_open:
-            save_log(message="Closing the decision")
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-            # Check how many hamsterwheel turns there were
-            number_hamsterwheel_turns = get_number_hamsterwheel_turns(
-                df_raw_hamsterwheel=mockup_raw_hamsterwheel_df,
-                start_time=df_decision_latest["start_time"].values[0],
-                end_time=now,
-            )
-            logging.debug(f"Number of hamsterwheel turns: {number_hamsterwheel_turns}")
-            # Get all the decisions for this cycle of decisions
-            df_decision_cycle = get_decision_cycle(df_decision=df_decision)
-            df_decision_closed = close_decision(
-                df_decision_latest=df_decision_latest,
-                df_decision_cycle=df_decision_cycle,
-                number_hamsterwheel_turns=number_hamsterwheel_turns,
-                end_time=now,
-                df_wallet=df_wallet,
-            )
-            save_log(message=f"Decision closed: {df_decision_closed}")
-
-            # If the decision was amount and is closed, place the order
-            if df_decision_closed["type"].values[0] == "amount":
-                save_log(message="Preparing order")
-                order = prepare_order(
-                    df_decision_closed=df_decision_closed,
-                    df_decision_cycle=df_decision_cycle,
-                    df_wallet=df_wallet,
-                )
-                logging.debug(f"Order: {order}")
@@ -0,0 +1,339 @@
+"""
+Versioned schema migrations for the cryptohamster database.
+
+Every migration has a number and is applied once, in order. The applied
+versions are recorded in the schema_version table. The migrations check the
+current schema before changing it, so running one again (e.g. after a crash
+between its DDL and its version record, as MySQL commits DDL implicitly) is
+harmless.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Callable, List
+
+import pymysql
+
+from bulk_insert import PLACEHOLDERS
+
+logger = logging.getLogger()
+
+# Rows per DELETE and commit when duplicate hashes are removed
+DEDUPE_CHUNK_SIZE = 10_000
+DROP_TEMPORARY_TABLE = {
+    "mysql": "DROP TEMPORARY TABLE IF EXISTS",
+    "sqlite": "DROP TABLE IF EXISTS",
+}
+
+CREATE_SCHEMA_VERSION = """CREATE TABLE IF NOT EXISTS schema_version(
+    version INT NOT NULL,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY ( version )
+    );
+"""
+
+CREATE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS raw_hamsterwheel(
+    id INT NOT NULL AUTO_INCREMENT,
+    hash VARCHAR(255) NOT NULL,
+    time TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    magnet TINYINT(1) NOT NULL,
+    PRIMARY KEY ( id )
+    );
+""",
+    """CREATE TABLE IF NOT EXISTS closed_hamsterwheel(
+    id INT NOT NULL AUTO_INCREMENT,
+    hash VARCHAR(255) NOT NULL,
+    time TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    magnet TINYINT(1) NOT NULL,
+    PRIMARY KEY ( id )
+    );
+""",
+    """CREATE TABLE IF NOT EXISTS log(
+    id INT NOT NULL AUTO_INCREMENT,
+    time TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    event VARCHAR(100) NOT NULL,
+    PRIMARY KEY ( id )
+    );
+""",
+    """CREATE TABLE IF NOT EXISTS control(
+    id INT NOT NULL AUTO_INCREMENT,
+    variable VARCHAR(100) NOT NULL,
+    state VARCHAR(255),
+    PRIMARY KEY ( id ),
+    UNIQUE KEY ( variable )
+    );
+""",
+    """CREATE TABLE IF NOT EXISTS wallet(
+    id INT NOT NULL AUTO_INCREMENT,
+    currency_symbol VARCHAR(50) NOT NULL,
+    amount FLOAT NOT NULL,
+    PRIMARY KEY ( id )
+    );
+""",
+    """CREATE TABLE IF NOT EXISTS price(
+    id INT NOT NULL AUTO_INCREMENT,
+    currency_symbol VARCHAR(50) NOT NULL,
+    price FLOAT NOT NULL,
+    PRIMARY KEY ( id )
+    );
+""",
+    """CREATE TABLE IF NOT EXISTS orderbook(
+    id INT NOT NULL AUTO_INCREMENT,
+    time TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    wallet_id INT NOT NULL,
+    price FLOAT NOT NULL,
+    amount FLOAT NOT NULL,
+    currency VARCHAR(50) NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    state VARCHAR(50) NOT NULL,
+    PRIMARY KEY ( id ),
+    FOREIGN KEY ( wallet_id ) REFERENCES wallet( id )
+    );
+""",
+    """CREATE TABLE IF NOT EXISTS decision(
+    id INT NOT NULL AUTO_INCREMENT,
+    start_time TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    end_time TIMESTAMP(6),
+    number_hamsterwheels INT,
+    type VARCHAR(50) NOT NULL,
+    status VARCHAR(100),
+    result VARCHAR(50),
+    PRIMARY KEY ( id )
+    );
+""",
+]
+
+
+def create_table_statement(statement: str, dialect: str = "mysql") -> str:
+    """Translate a CREATE TABLE statement written for MySQL to dialect.
+
+    SQLite has no AUTO_INCREMENT, its INTEGER PRIMARY KEY is the auto-incrementing
+    id, and it calls a unique key UNIQUE.
+    """
+    if dialect == "mysql":
+        return statement
+    statement = statement.replace(
+        "id INT NOT NULL AUTO_INCREMENT", "id INTEGER PRIMARY KEY"
+    )
+    statement = re.sub(r",\s*PRIMARY KEY \( id \)", "", statement)
+    return statement.replace("UNIQUE KEY", "UNIQUE")
+
+
+@dataclass
+class Migration:
+    """A numbered schema change, apply(cursor, dialect) has to be idempotent."""
+
+    version: int
+    description: str
+    apply: Callable[[pymysql.cursors.Cursor, str], None]
+
+
+def has_index(
+    cursor: pymysql.cursors.Cursor,
+    table: str,
+    column: str,
+    unique: bool = False,
+    dialect: str = "mysql",
+) -> bool:
+    """Return whether table has an index (a unique one with unique) starting with column."""
+    if dialect == "sqlite":
+        cursor.execute(f"PRAGMA index_list({table})")
+        indexes = [(row[1], row[2]) for row in cursor.fetchall()]
+        for name, is_unique in indexes:
+            cursor.execute(f"PRAGMA index_info({name})")
+            first_column = [row[2] for row in cursor.fetchall() if row[0] == 0]
+            if first_column == [column] and (is_unique or not unique):
+                return True
+        return False
+    qry = (
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+        "AND COLUMN_NAME = %s AND SEQ_IN_INDEX = 1"
+    )
+    if unique:
+        qry += " AND NON_UNIQUE = 0"
+    cursor.execute(qry, (table, column))
+    return cursor.fetchone()[0] > 0
+
+
+def add_index(
+    cursor: pymysql.cursors.Cursor,
+    table: str,
+    column: str,
+    unique: bool = False,
+    dialect: str = "mysql",
+) -> None:
+    """Add an index on column to table if there is none yet."""
+    if has_index(
+        cursor=cursor, table=table, column=column, unique=unique, dialect=dialect
+    ):
+        return
+    name = f"{'ux' if unique else 'ix'}_{table}_{column}"
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    cursor.execute(f"CREATE {kind} {name} ON {table} ( {column} )")
+
+
+def remove_duplicate_hashes(
+    cursor: pymysql.cursors.Cursor,
+    table: str,
+    chunk_size: int = DEDUPE_CHUNK_SIZE,
+    dialect: str = "mysql",
+) -> int:
+    """Delete all but the first row (lowest id) of rows with equal hash, return
+    the number of rows deleted.
+
+    The hashes with duplicates and their first id are collected in a
+    temporary table with one GROUP BY, then the newer rows are deleted in
+    primary key ranges of chunk_size ids with a commit each, like the
+    retention job, so no DELETE scans or locks the whole table.
+    """
+    placeholder = PLACEHOLDERS[dialect]
+    # Left over when an earlier run of the migration failed in this session
+    cursor.execute(f"{DROP_TEMPORARY_TABLE[dialect]} duplicate_hash")
+    cursor.execute(
+        "CREATE TEMPORARY TABLE duplicate_hash ("
+        "hash VARCHAR(255) NOT NULL, first_id INT NOT NULL, PRIMARY KEY ( hash ))"
+    )
+    cursor.execute(
+        f"INSERT INTO duplicate_hash (hash, first_id) "
+        f"SELECT hash, MIN(id) FROM {table} GROUP BY hash HAVING COUNT(*) > 1"
+    )
+    cursor.execute("SELECT MIN(first_id) FROM duplicate_hash")
+    start_id = cursor.fetchone()[0]
+    cursor.execute(f"SELECT MAX(id) FROM {table}")
+    end_id = cursor.fetchone()[0]
+    delete_qry = (
+        f"DELETE FROM {table} WHERE id > {placeholder} AND id <= {placeholder} "
+        f"AND EXISTS (SELECT 1 FROM duplicate_hash "
+        f"WHERE duplicate_hash.hash = {table}.hash "
+        f"AND duplicate_hash.first_id < {table}.id)"
+    )
+    removed = 0
+    if start_id is not None:
+        for chunk_start in range(start_id, end_id, chunk_size):
+            cursor.execute(delete_qry, (chunk_start, chunk_start + chunk_size))
+            removed += cursor.rowcount
+            cursor.connection.commit()
+    cursor.execute(f"{DROP_TEMPORARY_TABLE[dialect]} duplicate_hash")
+    logger.info(f"Removed {removed} duplicate rows from {table}.")
+    return removed
+
+
+def create_tables(cursor: pymysql.cursors.Cursor, dialect: str = "mysql") -> None:
+    for statement in CREATE_TABLES:
+        cursor.execute(create_table_statement(statement, dialect=dialect))
+
+
+def add_time_indexes(cursor: pymysql.cursors.Cursor, dialect: str = "mysql") -> None:
+    for table in ["raw_hamsterwheel", "closed_hamsterwheel"]:
+        add_index(cursor=cursor, table=table, column="time", dialect=dialect)
+
+
+def add_unique_hash_indexes(
+    cursor: pymysql.cursors.Cursor, dialect: str = "mysql"
+) -> None:
+    for table in ["raw_hamsterwheel", "closed_hamsterwheel"]:
+        if not has_index(
+            cursor=cursor, table=table, column="hash", unique=True, dialect=dialect
+        ):
+            remove_duplicate_hashes(cursor=cursor, table=table, dialect=dialect)
+            add_index(
+                cursor=cursor, table=table, column="hash", unique=True, dialect=dialect
+            )
+
+
+def add_decision_start_time_index(
+    cursor: pymysql.cursors.Cursor, dialect: str = "mysql"
+) -> None:
+    add_index(cursor=cursor, table="decision", column="start_time", dialect=dialect)
+
+
+def add_orderbook_state_index(
+    cursor: pymysql.cursors.Cursor, dialect: str = "mysql"
+) -> None:
+    add_index(cursor=cursor, table="orderbook", column="state", dialect=dialect)
+
+
+def create_turn_event_table(
+    cursor: pymysql.cursors.Cursor, dialect: str = "mysql"
+) -> None:
+    cursor.execute(
+        create_table_statement(
+            """CREATE TABLE IF NOT EXISTS turn_event(
+    id INT NOT NULL AUTO_INCREMENT,
+    start_time TIMESTAMP(6) NOT NULL,
+    duration FLOAT NOT NULL,
+    rpm FLOAT,
+    PRIMARY KEY ( id ),
+    UNIQUE KEY ( start_time )
+    );
+""",
+            dialect=dialect,
+        )
+    )
+
+
+def create_rollup_tables(
+    cursor: pymysql.cursors.Cursor, dialect: str = "mysql"
+) -> None:
+    for table in ["turn_rollup_second", "turn_rollup_minute", "turn_rollup_hour"]:
+        cursor.execute(
+            f"""CREATE TABLE IF NOT EXISTS {table}(
+    wheel INT NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    turns INT NOT NULL,
+    active_seconds INT NOT NULL,
+    max_rpm FLOAT,
+    PRIMARY KEY ( wheel, bucket_start )
+    );
+"""
+        )
+
+
+MIGRATIONS = [
+    Migration(1, "Create tables", create_tables),
+    Migration(2, "Index time of the hamsterwheel tables", add_time_indexes),
+    Migration(3, "Unique hash of the hamsterwheel tables", add_unique_hash_indexes),
+    Migration(4, "Index decision.start_time", add_decision_start_time_index),
+    Migration(5, "Index orderbook.state", add_orderbook_state_index),
+    Migration(6, "Create turn_event table", create_turn_event_table),
+    Migration(7, "Create turn rollup tables", create_rollup_tables),
+]
+
+
+def get_schema_version(mysql_connection: pymysql.connections.Connection) -> int:
+    """Return the highest applied migration version, 0 for an empty database."""
+    cursor = mysql_connection.cursor()
+    cursor.execute(CREATE_SCHEMA_VERSION)
+    cursor.execute("SELECT MAX(version) FROM schema_version")
+    version = cursor.fetchone()[0]
+    cursor.close()
+    return int(version or 0)
+
+
+def run_migrations(
+    mysql_connection: pymysql.connections.Connection,
+    migrations: List[Migration] = MIGRATIONS,
+    dialect: str = "mysql",
+) -> List[int]:
+    """Apply the migrations newer than the schema version, return their versions."""
+    placeholder = PLACEHOLDERS[dialect]
+    current_version = get_schema_version(mysql_connection=mysql_connection)
+    applied = []
+    for migration in sorted(migrations, key=lambda migration: migration.version):
+        if migration.version <= current_version:
+            continue
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        cursor = mysql_connection.cursor()
+        migration.apply(cursor, dialect)
+        cursor.execute(
+            f"INSERT INTO schema_version (version, description) VALUES ({placeholder}, {placeholder})",
+            (migration.version, migration.description),
+        )
+        cursor.close()
+        mysql_connection.commit()
+        applied.append(migration.version)
+    return applied
@@ -0,0 +1,156 @@
+"""
+Change notifications that wake the main loop.
+
+Writers send a small UDP datagram with a topic (new samples, a changed
+decision, wallet or prices) after they committed a change; the logger only
+for samples that start the wheel running (RunningStarts). The main loop
+waits on a ChangeListener until a notification arrives or the timeout
+passes, so it reacts right after a change and idles while nothing happens.
+Datagrams can get lost and not every writer notifies, so the timeout is the
+fallback that still polls the database now and then.
+"""
+
+import logging
+import select
+import socket
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from constants import NOTIFY_HOST, NOTIFY_PORT
+from window_store import RUNNING_SECONDS
+
+logger = logging.getLogger()
+
+TOPIC_SAMPLES = "samples"
+TOPIC_DECISION = "decision"
+TOPIC_WALLET = "wallet"
+TOPIC_PRICE = "price"
+WAKE_TIMEOUT = 5.0
+MAX_DATAGRAM_SIZE = 64
+
+
+class Notifier:
+    """Send change notifications, never blocks or raises."""
+
+    def __init__(self, address: Tuple[str, int] = (NOTIFY_HOST, NOTIFY_PORT)) -> None:
+        self.address = address
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def notify(self, topic: str) -> None:
+        try:
+            self._socket.sendto(topic.encode(), self.address)
+        except OSError as e:
+            # Nobody listening or a full buffer, the listener's timeout covers it
+            logger.debug(f"Could not send notification {topic}: {e}")
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+class RunningStarts:
+    """Tell whether new samples start the hamsterwheel running.
+
+    Only a start needs to wake the main loop: while the wheel runs the loop
+    wakes up by itself when running would end (WindowStore.running_until) and
+    reads the newer closed samples then. The sensor logs about once per
+    second while the wheel is idle, so notifying every write would wake the
+    loop just as often as polling.
+    """
+
+    def __init__(self, seconds: int = RUNNING_SECONDS) -> None:
+        self.seconds = np.timedelta64(seconds, "s")
+        self.last_closed_time: Optional[np.datetime64] = None
+
+    def update(self, times: np.ndarray, magnets: np.ndarray) -> bool:
+        """Whether a closed sample comes seconds or more after the closed sample
+        before it, or is the first closed sample seen."""
+        times = np.asarray(times, dtype="datetime64[ns]")
+        closed_times = np.sort(times[np.asarray(magnets) == 0])
+        if len(closed_times) == 0:
+            return False
+        if self.last_closed_time is None:
+            self.last_closed_time = closed_times[-1]
+            return True
+        previous = np.concatenate([[self.last_closed_time], closed_times[:-1]])
+        starts = bool(np.any(closed_times - previous >= self.seconds))
+        self.last_closed_time = max(self.last_closed_time, closed_times[-1])
+        return starts
+
+
+class WakeUp(NamedTuple):
+    """Why wait() returned: the topics received, none after a timeout."""
+
+    topics: Set[str]
+    woke_at: float
+
+    @property
+    def timed_out(self) -> bool:
+        return len(self.topics) == 0
+
+
+class ChangeListener:
+    """Wait for change notifications sent by Notifiers."""
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = (NOTIFY_HOST, NOTIFY_PORT),
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.clock = clock
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(address)
+        self._socket.setblocking(False)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """The bound address, with the port chosen by the system for port 0."""
+        return self._socket.getsockname()
+
+    def _drain(self) -> Set[str]:
+        """Read all waiting notifications, a burst of them wakes the loop once."""
+        topics = set()
+        while True:
+            try:
+                data = self._socket.recv(MAX_DATAGRAM_SIZE)
+            except BlockingIOError:
+                return topics
+            topics.add(data.decode(errors="replace"))
+
+    def wait(self, timeout: float = WAKE_TIMEOUT) -> WakeUp:
+        """Wait up to timeout seconds for notifications."""
+        topics = self._drain()
+        if len(topics) == 0:
+            readable, _, _ = select.select([self._socket], [], [], max(timeout, 0.0))
+            if len(readable) > 0:
+                topics = self._drain()
+        return WakeUp(topics=topics, woke_at=self.clock())
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+class WakeLatency:
+    """Seconds from a wake-up of the loop until its decision was taken."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, wake_up: WakeUp, now: Optional[float] = None) -> float:
+        """Record the latency of wake_up, separately for notifications and timeouts."""
+        seconds = (self.clock() if now is None else now) - wake_up.woke_at
+        name = "timeout" if wake_up.timed_out else "notification"
+        stats = self._stats.setdefault(
+            name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        stats["count"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        return seconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Number of wake-ups, total and maximum seconds per wake-up reason."""
+        return {name: dict(stats) for name, stats in self._stats.items()}
@@ -0,0 +1,169 @@
+"""
+Repositories with the data the main loop reads every tick.
+
+MySQLRepository runs one narrow, parameterized query per kind of data,
+InMemoryRepository answers the same calls from DataFrames for tests and
+benchmarks. Both cache every result until the next start_tick() and count
+the calls and latency per query.
+"""
+
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable
+
+import pandas as pd
+
+from db_connection import ConnectionManager
+
+
+class Repository:
+    """Per-tick cache and latency counters, the queries are in the subclasses."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self._cache: Dict[Hashable, Any] = {}
+        self._latency: Dict[str, Dict[str, float]] = {}
+
+    def start_tick(self) -> None:
+        """Forget the cached results of the last tick."""
+        self._cache.clear()
+
+    def _cached(self, name: str, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        if (name, key) in self._cache:
+            return self._cache[(name, key)]
+        start = self.clock()
+        result = fetch()
+        seconds = self.clock() - start
+        stats = self._latency.setdefault(
+            name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        stats["count"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        self._cache[(name, key)] = result
+        return result
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Number of queries, total and maximum seconds per query name."""
+        return {name: dict(stats) for name, stats in self._latency.items()}
+
+    def hamsterwheel_between(self, start_time: Any, end_time: Any) -> pd.DataFrame:
+        """Samples between start_time and end_time (id, time, magnet)."""
+        return self._cached(
+            "hamsterwheel_between",
+            (str(start_time), str(end_time)),
+            lambda: self._hamsterwheel_between(start_time, end_time),
+        )
+
+    def hamsterwheel_after(self, last_id: int) -> pd.DataFrame:
+        """Samples with id > last_id (id, time, magnet), ordered by id."""
+        return self._cached(
+            "hamsterwheel_after", last_id, lambda: self._hamsterwheel_after(last_id)
+        )
+
+    def decisions_since(self, min_id: int) -> pd.DataFrame:
+        """The decisions with id >= min_id, ordered by id."""
+        return self._cached(
+            "decisions_since", min_id, lambda: self._decisions_since(min_id)
+        )
+
+    def wallet(self) -> pd.DataFrame:
+        """The wallet (id, currency, amount)."""
+        return self._cached("wallet", None, self._wallet)
+
+    def prices(self) -> pd.DataFrame:
+        """The current price per currency (id, currency, price)."""
+        return self._cached("prices", None, self._prices)
+
+
+class MySQLRepository(Repository):
+    def __init__(
+        self,
+        connection_manager: ConnectionManager,
+        now: Callable[[], datetime] = datetime.now,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        super().__init__(clock=clock)
+        self.connection_manager = connection_manager
+        self.now = now
+
+    def _read(self, qry: str, params: tuple = ()) -> pd.DataFrame:
+        return pd.read_sql(
+            sql=qry, con=self.connection_manager.get_connection(), params=params
+        )
+
+    def _hamsterwheel_between(self, start_time: Any, end_time: Any) -> pd.DataFrame:
+        return self._read(
+            "SELECT id, time, magnet FROM raw_hamsterwheel "
+            "WHERE time >= %s AND time <= %s ORDER BY id",
+            (str(start_time), str(end_time)),
+        )
+
+    def _hamsterwheel_after(self, last_id: int) -> pd.DataFrame:
+        return self._read(
+            "SELECT id, time, magnet FROM raw_hamsterwheel WHERE id > %s ORDER BY id",
+            (last_id,),
+        )
+
+    def _select_decisions(self, where: str, params: tuple = ()) -> pd.DataFrame:
+        return self._read(
+            "SELECT id, start_time, end_time, type, "
+            "number_hamsterwheels AS number_hamsterwheel_turns, status, result "
+            f"FROM decision {where}",
+            params,
+        )
+
+    def _decisions_since(self, min_id: int) -> pd.DataFrame:
+        return self._select_decisions("WHERE id >= %s ORDER BY id", (min_id,))
+
+    def _wallet(self) -> pd.DataFrame:
+        return self._read("SELECT id, currency_symbol AS currency, amount FROM wallet")
+
+    def _prices(self) -> pd.DataFrame:
+        return self._read(
+            "SELECT price.id, price.currency_symbol AS currency, price.price FROM price "
+            "JOIN (SELECT MAX(id) AS id FROM price GROUP BY currency_symbol) AS latest "
+            "ON latest.id = price.id"
+        )
+
+
+class InMemoryRepository(Repository):
+    """Repository on DataFrames shaped like the mockup DataFrames of main.py,
+    df_raw_hamsterwheel and df_decision ordered by id."""
+
+    def __init__(
+        self,
+        df_raw_hamsterwheel: pd.DataFrame,
+        df_decision: pd.DataFrame,
+        df_wallet: pd.DataFrame,
+        df_price: pd.DataFrame,
+        now: Callable[[], datetime] = datetime.now,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        super().__init__(clock=clock)
+        self.df_raw_hamsterwheel = df_raw_hamsterwheel
+        self.df_decision = df_decision
+        self.df_wallet = df_wallet
+        self.df_price = df_price
+        self.now = now
+
+    def _hamsterwheel_between(self, start_time: Any, end_time: Any) -> pd.DataFrame:
+        times = pd.to_datetime(self.df_raw_hamsterwheel["time"])
+        start_time, end_time = pd.Timestamp(start_time), pd.Timestamp(end_time)
+        return self.df_raw_hamsterwheel[(times >= start_time) & (times <= end_time)]
+
+    def _hamsterwheel_after(self, last_id: int) -> pd.DataFrame:
+        # df_raw_hamsterwheel is ordered by id
+        start = self.df_raw_hamsterwheel["id"].searchsorted(last_id, side="right")
+        return self.df_raw_hamsterwheel.iloc[start:]
+
+    def _decisions_since(self, min_id: int) -> pd.DataFrame:
+        # df_decision is ordered by id
+        start = self.df_decision["id"].searchsorted(min_id)
+        return self.df_decision.iloc[start:]
+
+    def _wallet(self) -> pd.DataFrame:
+        return self.df_wallet
+
+    def _prices(self) -> pd.DataFrame:
+        return self.df_price.drop_duplicates(subset="currency", keep="last")
@@ -0,0 +1,226 @@
+"""
+Retention job for the hamsterwheel tables.
+
+Expired rows are deleted in bounded primary key ranges with one commit and a
+short pause per chunk, so every DELETE only locks chunk_size rows and the
+logger can insert in between. Tables partitioned by time can expire whole
+partitions with a partition drop instead.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+import pymysql
+
+from bulk_insert import PLACEHOLDERS
+from db_connection import ConnectionManager
+
+logger = logging.getLogger()
+
+CHUNK_SIZE = 1000
+PAUSE_SECONDS = 0.05
+RETENTION_MINUTES = 15
+
+
+@dataclass
+class RetentionResult:
+    """Rows removed, chunks (or partitions) and the longest single lock hold."""
+
+    rows: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    max_lock_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return self.rows / self.seconds
+
+
+def get_cutoff(minutes: int, now: Optional[datetime] = None) -> str:
+    """Return the time before which rows are expired, formatted like the time column."""
+    now = now or datetime.now()
+    return str(now - timedelta(minutes=minutes))
+
+
+def delete_expired_rows(
+    mysql_connection: pymysql.connections.Connection,
+    table: str,
+    minutes: int = RETENTION_MINUTES,
+    chunk_size: int = CHUNK_SIZE,
+    pause_seconds: float = PAUSE_SECONDS,
+    max_id: Optional[int] = None,
+    dialect: str = "mysql",
+    now: Optional[datetime] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> RetentionResult:
+    """Delete the rows of table older than minutes, chunk_size ids at a time.
+
+    The ids are walked in order from the oldest row. Every chunk is a DELETE
+    on a primary key range (plus the time condition) and its own commit. The
+    walk stops at the first chunk without expired rows or after max_id, e.g.
+    the transform watermark, so rows that were not transformed yet are kept.
+    """
+    placeholder = PLACEHOLDERS[dialect]
+    cutoff = get_cutoff(minutes=minutes, now=now)
+    next_chunk_qry = (
+        f"SELECT MAX(id), COUNT(*) FROM (SELECT id FROM {table} "
+        f"WHERE id > {placeholder} ORDER BY id LIMIT {placeholder}) AS chunk"
+    )
+    delete_qry = (
+        f"DELETE FROM {table} WHERE id > {placeholder} AND id <= {placeholder} "
+        f"AND time < {placeholder}"
+    )
+    result = RetentionResult()
+    start = time.perf_counter()
+    last_id = 0
+    cursor = mysql_connection.cursor()
+    while True:
+        cursor.execute(next_chunk_qry, (last_id, chunk_size))
+        end_id, n_rows = cursor.fetchone()
+        if n_rows == 0:
+            break
+        if max_id is not None:
+            end_id = min(end_id, max_id)
+            if end_id <= last_id:
+                break
+        lock_start = time.perf_counter()
+        cursor.execute(delete_qry, (last_id, end_id, cutoff))
+        n_deleted = cursor.rowcount
+        mysql_connection.commit()
+        result.max_lock_seconds = max(
+            result.max_lock_seconds, time.perf_counter() - lock_start
+        )
+        result.rows += n_deleted
+        result.chunks += 1
+        if n_deleted == 0:
+            break
+        last_id = end_id
+        sleep(pause_seconds)
+    cursor.close()
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def get_expired_partitions(
+    mysql_connection: pymysql.connections.Connection,
+    table: str,
+    minutes: int = RETENTION_MINUTES,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """Return the partitions of table that only hold expired rows.
+
+    The table has to be partitioned with
+    PARTITION BY RANGE (UNIX_TIMESTAMP(time)), and MySQL requires time to be
+    part of the primary key and of every unique key of such a table.
+    """
+    cutoff = (now or datetime.now()) - timedelta(minutes=minutes)
+    qry = (
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+        "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+    )
+    cursor = mysql_connection.cursor()
+    cursor.execute(qry, (table,))
+    partitions = []
+    for name, less_than in cursor.fetchall():
+        # The partition holds rows with UNIX_TIMESTAMP(time) < less_than
+        if less_than != "MAXVALUE" and int(less_than) <= cutoff.timestamp():
+            partitions.append(name)
+    cursor.close()
+    return partitions
+
+
+def drop_expired_partitions(
+    mysql_connection: pymysql.connections.Connection,
+    table: str,
+    minutes: int = RETENTION_MINUTES,
+    now: Optional[datetime] = None,
+) -> RetentionResult:
+    """Expire the rows of a time partitioned table by dropping whole partitions."""
+    result = RetentionResult()
+    start = time.perf_counter()
+    cursor = mysql_connection.cursor()
+    for partition in get_expired_partitions(
+        mysql_connection=mysql_connection, table=table, minutes=minutes, now=now
+    ):
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME = %s",
+            (table, partition),
+        )
+        n_rows = int(cursor.fetchone()[0] or 0)
+        lock_start = time.perf_counter()
+        cursor.execute(f"ALTER TABLE {table} DROP PARTITION {partition}")
+        result.max_lock_seconds = max(
+            result.max_lock_seconds, time.perf_counter() - lock_start
+        )
+        # TABLE_ROWS is an estimate for InnoDB tables
+        result.rows += n_rows
+        result.chunks += 1
+    cursor.close()
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def run_retention(
+    mysql_connection: pymysql.connections.Connection,
+    table: str,
+    minutes: int = RETENTION_MINUTES,
+    partitioned: bool = False,
+    max_id: Optional[int] = None,
+    dialect: str = "mysql",
+) -> RetentionResult:
+    """Expire the rows of table and log rows/s and the longest lock hold."""
+    if partitioned:
+        result = drop_expired_partitions(
+            mysql_connection=mysql_connection, table=table, minutes=minutes
+        )
+    else:
+        result = delete_expired_rows(
+            mysql_connection=mysql_connection,
+            table=table,
+            minutes=minutes,
+            max_id=max_id,
+            dialect=dialect,
+        )
+    logger.info(
+        f"Removed {result.rows} rows from {table} in {result.chunks} chunks "
+        f"({result.rows_per_second:.0f} rows/s, "
+        f"longest lock {result.max_lock_seconds * 1e3:.1f} ms)."
+    )
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(
+        format="%(asctime)s,%(msecs)d %(name)s %(levelname)s %(message)s",
+        datefmt="%H:%M:%S",
+        level=logging.INFO,
+    )
+    parser = argparse.ArgumentParser(description="Remove expired hamsterwheel rows.")
+    parser.add_argument("--table", default="raw_hamsterwheel")
+    parser.add_argument("--minutes", type=int, default=RETENTION_MINUTES)
+    parser.add_argument(
+        "--partitioned", action="store_true", help="Drop expired time partitions"
+    )
+    args = parser.parse_args()
+
+    connection_manager = ConnectionManager()
+    try:
+        run_retention(
+            mysql_connection=connection_manager.get_connection(),
+            table=args.table,
+            minutes=args.minutes,
+            partitioned=args.partitioned,
+        )
+    except Exception as e:
+        logger.error(f"Error removing expired rows: {e}")
+    finally:
+        connection_manager.close()
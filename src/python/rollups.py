@@ -0,0 +1,266 @@
+"""
+Per-second, per-minute and per-hour rollups of the turn events.
+
+Every rollup row holds the turns, the active seconds (seconds in which a turn
+started) and the maximum RPM of one wheel in one bucket. When new turn events
+arrive, only the buckets they fall in are rebuilt: seconds from turn_event,
+minutes from the seconds and hours from the minutes. Rebuilding a bucket
+replaces its row, so running an update twice gives the same rollups.
+
+get_turn_stats() answers a time range from the coarsest rollups that fit, so
+a day needs about 24 hour rows instead of all raw samples.
+"""
+
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+import pymysql
+
+from bulk_insert import PLACEHOLDERS, bulk_insert
+
+# All turn events are of one wheel for now
+WHEEL = 0
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+EVENT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+ROLLUP_COLUMNS = ["wheel", "bucket_start", "turns", "active_seconds", "max_rpm"]
+
+
+class RollupLevel(NamedTuple):
+    table: str
+    freq: str
+    size: timedelta
+
+
+# From the finest to the coarsest level
+ROLLUP_LEVELS = [
+    RollupLevel("turn_rollup_second", "1s", timedelta(seconds=1)),
+    RollupLevel("turn_rollup_minute", "1min", timedelta(minutes=1)),
+    RollupLevel("turn_rollup_hour", "1h", timedelta(hours=1)),
+]
+
+
+class TurnStats(NamedTuple):
+    turns: int
+    active_seconds: int
+    max_rpm: Optional[float]
+
+
+class RangePart(NamedTuple):
+    """Part of a time range answered by table (turn_event or a rollup)."""
+
+    table: str
+    start: datetime
+    end: datetime
+
+
+def floor_time(time: datetime, size: timedelta) -> datetime:
+    return datetime.min + (time - datetime.min) // size * size
+
+
+def ceil_time(time: datetime, size: timedelta) -> datetime:
+    floor = floor_time(time, size)
+    return floor if floor == time else floor + size
+
+
+def aggregate_events(df_event: pd.DataFrame, wheel: int = WHEEL) -> pd.DataFrame:
+    """Per-second rollup rows of turn events (start_time and rpm columns)."""
+    buckets = pd.to_datetime(df_event["start_time"]).dt.floor("1s")
+    df = (
+        df_event.assign(bucket_start=buckets, rpm=df_event["rpm"].astype(float))
+        .groupby("bucket_start")
+        .agg(turns=("rpm", "size"), max_rpm=("rpm", "max"))
+        .reset_index()
+    )
+    df["active_seconds"] = 1
+    df["wheel"] = wheel
+    return df[ROLLUP_COLUMNS]
+
+
+def aggregate_rollup(df_rollup: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """Rollup rows of a coarser level (freq) from rollup rows of a finer one."""
+    buckets = pd.to_datetime(df_rollup["bucket_start"]).dt.floor(freq)
+    df = (
+        df_rollup.assign(bucket_start=buckets)
+        .groupby(["wheel", "bucket_start"])
+        .agg(
+            turns=("turns", "sum"),
+            active_seconds=("active_seconds", "sum"),
+            max_rpm=("max_rpm", "max"),
+        )
+        .reset_index()
+    )
+    return df[ROLLUP_COLUMNS]
+
+
+def read_rows(
+    mysql_connection: pymysql.connections.Connection,
+    table: str,
+    time_column: str,
+    start: datetime,
+    end: datetime,
+    dialect: str = "mysql",
+) -> pd.DataFrame:
+    """Read the rows of table with start <= time_column < end."""
+    placeholder = PLACEHOLDERS[dialect]
+    qry = (
+        f"SELECT * FROM {table} "
+        f"WHERE {time_column} >= {placeholder} AND {time_column} < {placeholder}"
+    )
+    return pd.read_sql(
+        sql=qry,
+        con=mysql_connection,
+        params=(start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT)),
+    )
+
+
+def write_rollup(
+    mysql_connection: pymysql.connections.Connection,
+    table: str,
+    df: pd.DataFrame,
+    dialect: str = "mysql",
+) -> None:
+    df = df.assign(
+        bucket_start=df["bucket_start"].dt.strftime(TIME_FORMAT),
+        # A bucket whose turns have no RPM (the first turn seen) has no max_rpm
+        max_rpm=df["max_rpm"].astype(object).where(df["max_rpm"].notna(), None),
+    )
+    bulk_insert(
+        connection=mysql_connection,
+        table=table,
+        df=df,
+        columns=ROLLUP_COLUMNS,
+        dialect=dialect,
+        commit=False,
+        replace_duplicates=True,
+    )
+
+
+def delete_rows(
+    mysql_connection: pymysql.connections.Connection,
+    table: str,
+    time_column: str,
+    start: datetime,
+    end: datetime,
+    dialect: str = "mysql",
+) -> None:
+    """Delete the rows of table with start <= time_column < end, without commit."""
+    placeholder = PLACEHOLDERS[dialect]
+    cursor = mysql_connection.cursor()
+    cursor.execute(
+        f"DELETE FROM {table} "
+        f"WHERE {time_column} >= {placeholder} AND {time_column} < {placeholder}",
+        (start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT)),
+    )
+    cursor.close()
+
+
+def update_rollups(
+    mysql_connection: pymysql.connections.Connection,
+    start: datetime,
+    end: datetime,
+    dialect: str = "mysql",
+    replace: bool = False,
+) -> None:
+    """Rebuild the rollup buckets of all levels that contain start to end,
+    the range of new turn events. Committing is left to the caller.
+
+    With replace the buckets are deleted before they are rebuilt, for turn
+    events in the range that were replaced, so a bucket left without turns
+    has no row anymore.
+    """
+    finer_table, finer_column = "turn_event", "start_time"
+    for level in ROLLUP_LEVELS:
+        bucket_start = floor_time(start, level.size)
+        bucket_end = floor_time(end, level.size) + level.size
+        if replace:
+            delete_rows(
+                mysql_connection=mysql_connection,
+                table=level.table,
+                time_column="bucket_start",
+                start=bucket_start,
+                end=bucket_end,
+                dialect=dialect,
+            )
+        df = read_rows(
+            mysql_connection=mysql_connection,
+            table=finer_table,
+            time_column=finer_column,
+            start=bucket_start,
+            end=bucket_end,
+            dialect=dialect,
+        )
+        if len(df) > 0:
+            if finer_table == "turn_event":
+                df = aggregate_events(df)
+            else:
+                df = aggregate_rollup(df, freq=level.freq)
+            write_rollup(
+                mysql_connection=mysql_connection,
+                table=level.table,
+                df=df,
+                dialect=dialect,
+            )
+        elif not replace:
+            return
+        finer_table, finer_column = level.table, "bucket_start"
+
+
+def plan_range(start: datetime, end: datetime) -> List[RangePart]:
+    """Split start to end into parts answered by the coarsest table that fits:
+    whole hours from the hour rollup, the minutes and seconds around them from
+    the finer rollups and the part of a second at the edges from turn_event."""
+    if start >= end:
+        return []
+    for level in reversed(ROLLUP_LEVELS):
+        inner_start = ceil_time(start, level.size)
+        inner_end = floor_time(end, level.size)
+        if inner_start < inner_end:
+            return (
+                plan_range(start, inner_start)
+                + [RangePart(level.table, inner_start, inner_end)]
+                + plan_range(inner_end, end)
+            )
+    return [RangePart("turn_event", start, end)]
+
+
+def get_turn_stats(
+    mysql_connection: pymysql.connections.Connection,
+    start: datetime,
+    end: datetime,
+    wheel: int = WHEEL,
+    dialect: str = "mysql",
+) -> TurnStats:
+    """Return turns, active seconds and maximum RPM for start <= time < end."""
+    placeholder = PLACEHOLDERS[dialect]
+    turns, active_seconds, max_rpms = 0, 0, []
+    cursor = mysql_connection.cursor()
+    for part in plan_range(start, end):
+        if part.table == "turn_event":
+            # Parts of a second at the edges count turns, but no active seconds
+            params = (
+                part.start.strftime(EVENT_TIME_FORMAT),
+                part.end.strftime(EVENT_TIME_FORMAT),
+            )
+            cursor.execute(
+                f"SELECT COUNT(*), 0, MAX(rpm) FROM turn_event "
+                f"WHERE start_time >= {placeholder} AND start_time < {placeholder}",
+                params,
+            )
+        else:
+            params = (part.start.strftime(TIME_FORMAT), part.end.strftime(TIME_FORMAT))
+            cursor.execute(
+                f"SELECT SUM(turns), SUM(active_seconds), MAX(max_rpm) FROM {part.table} "
+                f"WHERE wheel = {placeholder} AND bucket_start >= {placeholder} "
+                f"AND bucket_start < {placeholder}",
+                (wheel,) + params,
+            )
+        part_turns, part_active_seconds, part_max_rpm = cursor.fetchone()
+        turns += int(part_turns or 0)
+        active_seconds += int(part_active_seconds or 0)
+        if part_max_rpm is not None:
+            max_rpms.append(part_max_rpm)
+    cursor.close()
+    max_rpm = float(np.max(max_rpms)) if len(max_rpms) > 0 else None
+    return TurnStats(turns=turns, active_seconds=active_seconds, max_rpm=max_rpm)
@@ -0,0 +1,303 @@
+"""
+Optional binary sample log: a fixed-size memory-mapped ring of sensor samples.
+
+Instead of text lines like "2023-08-08 13:59:59.763742 - 0", every sample is a
+9 byte record (int64 epoch-ns, uint8 magnet). The header holds the capacity and
+the number of records written so far (the write cursor), so readers consume new
+records as numpy views on the mapped file without parsing anything.
+
+File layout (little endian):
+
+    header   64 bytes: magic (8 bytes), capacity (uint64), write count (uint64)
+    records  capacity * 9 bytes
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ingest_pipeline import POLL_INTERVAL
+from log_lines import format_lines, parse_lines
+
+logger = logging.getLogger()
+
+MAGIC = b"HWRING01"
+HEADER_SIZE = 64
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("capacity", "<u8"), ("write_count", "<u8")])
+RECORD_DTYPE = np.dtype([("time_ns", "<i8"), ("magnet", "u1")])
+CAPACITY = 1_000_000
+# Seconds between two saves of a RingFollower's read count
+SAVE_INTERVAL = 1.0
+
+
+class SampleRing:
+    """Memory-mapped ring of (int64 epoch-ns, uint8 magnet) records.
+
+    There is one writer (append()), any number of processes can read with
+    RingReader. The write count is updated after the records are written.
+    """
+
+    def __init__(self, path: str, mode: str = "r+") -> None:
+        self.path = path
+        self._header = np.memmap(path, dtype=HEADER_DTYPE, mode=mode, shape=(1,))
+        if self._header["magic"][0] != MAGIC:
+            raise ValueError(f"{path} is no sample ring file")
+        self.capacity = int(self._header["capacity"][0])
+        self.records = np.memmap(
+            path,
+            dtype=RECORD_DTYPE,
+            mode=mode,
+            offset=HEADER_SIZE,
+            shape=(self.capacity,),
+        )
+
+    @classmethod
+    def create(cls, path: str, capacity: int = CAPACITY) -> "SampleRing":
+        """Create an empty ring file for capacity records."""
+        with open(path, "wb") as f:
+            f.truncate(HEADER_SIZE + capacity * RECORD_DTYPE.itemsize)
+        header = np.memmap(path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        header["magic"] = MAGIC
+        header["capacity"] = capacity
+        header["write_count"] = 0
+        header.flush()
+        del header
+        return cls(path)
+
+    @classmethod
+    def open_or_create(cls, path: str, capacity: int = CAPACITY) -> "SampleRing":
+        if os.path.exists(path):
+            return cls(path)
+        return cls.create(path, capacity=capacity)
+
+    @property
+    def write_count(self) -> int:
+        """Number of records written since the ring was created."""
+        return int(self._header["write_count"][0])
+
+    def append(self, times_ns: np.ndarray, magnets: np.ndarray) -> None:
+        """Append samples, overwriting the oldest records when the ring is full."""
+        times_ns = np.asarray(times_ns, dtype=np.int64)
+        magnets = np.asarray(magnets, dtype=np.uint8)
+        n = len(times_ns)
+        # Only the last capacity samples fit, the ones before are skipped
+        skipped = max(n - self.capacity, 0)
+        times_ns = times_ns[skipped:]
+        magnets = magnets[skipped:]
+        count = self.write_count
+        start = (count + skipped) % self.capacity
+        first = min(len(times_ns), self.capacity - start)
+        self.records["time_ns"][start : start + first] = times_ns[:first]
+        self.records["magnet"][start : start + first] = magnets[:first]
+        rest = len(times_ns) - first
+        self.records["time_ns"][:rest] = times_ns[first:]
+        self.records["magnet"][:rest] = magnets[first:]
+        # Publish the records by moving the cursor last
+        self._header["write_count"] = count + n
+
+    def flush(self) -> None:
+        self.records.flush()
+        self._header.flush()
+
+
+class RingRead(NamedTuple):
+    """New records as views on the ring (two when they wrap) and the number of lost records."""
+
+    views: List[np.ndarray]
+    lost: int
+
+
+class RingReader:
+    """Consume the records appended to a SampleRing since the last read.
+
+    read_count resumes an earlier reader, records that were overwritten since
+    then are counted as lost by the first read.
+    """
+
+    def __init__(
+        self,
+        ring: SampleRing,
+        from_start: bool = False,
+        read_count: Optional[int] = None,
+    ) -> None:
+        self.ring = ring
+        if read_count is not None:
+            # A count past the write cursor is from a ring that was created again
+            self.read_count = read_count if read_count <= ring.write_count else 0
+        else:
+            self.read_count = 0 if from_start else ring.write_count
+        self.lost = 0
+
+    def read_new(self) -> RingRead:
+        """Return the new records as zero-copy views.
+
+        The views are only valid until the writer wraps around the ring again,
+        use read_new_arrays() to get a copy that is checked for overwrites.
+        """
+        count = self.ring.write_count
+        capacity = self.ring.capacity
+        lost = max(count - self.read_count - capacity, 0)
+        first_count = self.read_count + lost
+        self.read_count = count
+        self.lost += lost
+        if count == first_count:
+            return RingRead(views=[], lost=lost)
+        start = first_count % capacity
+        end = count % capacity
+        records = self.ring.records
+        if start < end:
+            views = [records[start:end]]
+        else:
+            views = [records[start:], records[:end]]
+        return RingRead(views=[view for view in views if len(view) > 0], lost=lost)
+
+    def read_new_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the new samples as datetime64[ns] times and uint8 magnets."""
+        first_count = self.read_count
+        read = self.read_new()
+        if len(read.views) == 0:
+            return np.array([], dtype="datetime64[ns]"), np.array([], dtype=np.uint8)
+        records = np.concatenate(read.views)
+        # Records overwritten by the writer while they were copied are dropped
+        overwritten = self.ring.write_count - self.ring.capacity - first_count
+        overwritten -= read.lost
+        if overwritten > 0:
+            records = records[overwritten:]
+            self.lost += overwritten
+        return records["time_ns"].view("datetime64[ns]"), records["magnet"]
+
+
+class SampleBatch(NamedTuple):
+    """Samples read from a ring, datetime64[ns] times and uint8 magnets."""
+
+    times: np.ndarray
+    magnets: np.ndarray
+
+
+class RingFollower:
+    """Follow a SampleRing for IngestPipeline, like logger.LogFollower follows
+    the text log. New samples are returned as SampleBatches instead of lines,
+    so the pipeline's parse has to take batches (logger.batches_to_df).
+
+    With a state_path the read count is saved there at most every
+    save_interval seconds, and a new follower resumes from it, so the samples
+    written while the logger was down are read too. Samples read again after
+    a restart are dropped by the hash dedupe of the writer.
+    """
+
+    def __init__(
+        self,
+        ring: SampleRing,
+        from_start: bool = False,
+        poll_interval: float = POLL_INTERVAL,
+        state_path: Optional[str] = None,
+        save_interval: float = SAVE_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ring = ring
+        self.state_path = state_path
+        self.save_interval = save_interval
+        self.clock = clock
+        self.reader = RingReader(
+            ring, from_start=from_start, read_count=self.load_read_count()
+        )
+        self.poll_interval = poll_interval
+        self._saved_at: Optional[float] = None
+
+    def load_read_count(self) -> Optional[int]:
+        """The read count saved by the last follower, None without one."""
+        if self.state_path is None:
+            return None
+        try:
+            with open(self.state_path) as f:
+                return int(f.read())
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning(f"Ignoring the invalid read count in {self.state_path}")
+            return None
+
+    def save_read_count(self) -> None:
+        """Write the read count to state_path, replacing the old one atomically."""
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(self.reader.read_count))
+        os.replace(tmp_path, self.state_path)
+        self._saved_at = self.clock()
+
+    def get_file_name(self) -> str:
+        return self.ring.path
+
+    def read_new_lines(self) -> List[SampleBatch]:
+        """The samples appended since the last call, at most one batch."""
+        lost = self.reader.lost
+        times, magnets = self.reader.read_new_arrays()
+        if self.reader.lost > lost:
+            logger.warning(
+                f"Lost {self.reader.lost - lost} ring records overwritten before read"
+            )
+        if self.state_path is not None and (
+            self._saved_at is None
+            or self.clock() - self._saved_at >= self.save_interval
+        ):
+            self.save_read_count()
+        if len(times) == 0:
+            return []
+        return [SampleBatch(times=times, magnets=magnets)]
+
+    def has_changed(self) -> bool:
+        return self.ring.write_count != self.reader.read_count
+
+    async def wait_for_change(self) -> None:
+        """Wait until samples were appended. The ring file keeps its size, so a
+        FileWatcher would not see them."""
+        while not self.has_changed():
+            await asyncio.sleep(self.poll_interval)
+
+
+def lines_to_ring(lines: List[str], ring: SampleRing) -> int:
+    """Append text log lines to ring, return the number of samples written."""
+    parsed = parse_lines(lines)
+    times_ns = parsed.times.astype("datetime64[ns]").view(np.int64)
+    ring.append(times_ns=times_ns, magnets=parsed.magnets)
+    return len(times_ns)
+
+
+def convert_log_file(log_file: str, ring_file: str, capacity: int = CAPACITY) -> int:
+    """Convert a text log file to a ring file, return the number of samples."""
+    ring = SampleRing.open_or_create(ring_file, capacity=capacity)
+    with open(log_file) as f:
+        n = lines_to_ring(f.readlines(), ring)
+    ring.flush()
+    return n
+
+
+def convert_ring_file(ring_file: str, log_file: str) -> int:
+    """Convert the records still in a ring file to a text log file."""
+    reader = RingReader(SampleRing(ring_file, mode="r"), from_start=True)
+    times, magnets = reader.read_new_arrays()
+    with open(log_file, "w") as f:
+        f.writelines(format_lines(times, magnets))
+    return len(times)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Convert between text log files and sample ring files."
+    )
+    parser.add_argument("direction", choices=["to-ring", "to-text"])
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--capacity", type=int, default=CAPACITY)
+    args = parser.parse_args()
+    if args.direction == "to-ring":
+        n = convert_log_file(args.source, args.target, capacity=args.capacity)
+    else:
+        n = convert_ring_file(args.source, args.target)
+    print(f"Converted {n} samples from {args.source} to {args.target}")
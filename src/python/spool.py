@@ -0,0 +1,174 @@
+"""
+Local write-ahead spool for hamsterwheel samples that could not be written to the database.
+
+Samples are appended to a SQLite database in WAL mode on the local disk while
+MySQL is unreachable. A background thread replays them in large batches once
+the database is back.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict
+
+import pandas as pd
+
+from db_connection import ConnectionManager
+
+logger = logging.getLogger()
+
+SPOOL_COLUMNS = ["hash", "time", "magnet"]
+DRAIN_BATCH_SIZE = 5000
+DRAIN_INTERVAL = 5.0
+
+
+class SampleSpool:
+    """Durable, append-only spool of samples backed by SQLite in WAL mode."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS spool(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash TEXT NOT NULL,
+            time TEXT NOT NULL,
+            magnet INTEGER NOT NULL,
+            spooled_at REAL NOT NULL
+            );
+            """
+        )
+        self._connection.commit()
+        self.drained_rows = 0
+        self.drain_seconds = 0.0
+
+    def append(self, df: pd.DataFrame) -> int:
+        """Append the samples in df, return the number of rows spooled."""
+        if len(df) == 0:
+            return 0
+        now = time.time()
+        rows = [
+            (str(hash), str(time_), int(magnet), now)
+            for hash, time_, magnet in df[SPOOL_COLUMNS].itertuples(
+                index=False, name=None
+            )
+        ]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT INTO spool (hash, time, magnet, spooled_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._connection.commit()
+        return len(rows)
+
+    def depth(self) -> int:
+        """Number of spooled samples not yet replayed."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def oldest_age(self) -> float:
+        """Seconds since the oldest sample still in the spool was spooled."""
+        with self._lock:
+            oldest = self._connection.execute(
+                "SELECT MIN(spooled_at) FROM spool"
+            ).fetchone()[0]
+        if oldest is None:
+            return 0.0
+        return time.time() - oldest
+
+    def drain(
+        self,
+        write: Callable[[pd.DataFrame], Any],
+        batch_size: int = DRAIN_BATCH_SIZE,
+    ) -> int:
+        """Replay the spool oldest first in batches of batch_size rows with write(df).
+
+        A batch is removed from the spool only after write() returned, so a
+        failing write leaves it in the spool for the next drain.
+        """
+        drained = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT id, hash, time, magnet FROM spool ORDER BY id LIMIT ?",
+                    (batch_size,),
+                ).fetchall()
+            if len(rows) == 0:
+                return drained
+            start = time.perf_counter()
+            df = pd.DataFrame(rows, columns=["id"] + SPOOL_COLUMNS)
+            write(df[SPOOL_COLUMNS])
+            with self._lock:
+                self._connection.execute(
+                    "DELETE FROM spool WHERE id <= ?", (int(df["id"].max()),)
+                )
+                self._connection.commit()
+            self.drain_seconds += time.perf_counter() - start
+            self.drained_rows += len(df)
+            drained += len(df)
+
+    def metrics(self) -> Dict[str, float]:
+        """Spool depth, age of the oldest sample and drain throughput."""
+        drain_rows_per_second = 0.0
+        if self.drain_seconds > 0:
+            drain_rows_per_second = self.drained_rows / self.drain_seconds
+        return {
+            "depth": self.depth(),
+            "oldest_age_seconds": self.oldest_age(),
+            "drained_rows": self.drained_rows,
+            "drain_rows_per_second": drain_rows_per_second,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class SpoolDrainer(threading.Thread):
+    """Background thread that replays the spool once the database is reachable.
+
+    It uses its own connection, write(mysql_connection, df) is called for every batch.
+    """
+
+    def __init__(
+        self,
+        spool: SampleSpool,
+        write: Callable[[Any, pd.DataFrame], Any],
+        interval: float = DRAIN_INTERVAL,
+        batch_size: int = DRAIN_BATCH_SIZE,
+    ) -> None:
+        super().__init__(name="spool-drainer", daemon=True)
+        self.spool = spool
+        self.write = write
+        self.interval = interval
+        self.batch_size = batch_size
+        self.connection_manager = ConnectionManager(max_attempts=1)
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.drain_once()
+
+    def drain_once(self) -> int:
+        """Replay the spool if it is not empty, return the number of rows replayed."""
+        if self.spool.depth() == 0:
+            return 0
+        try:
+            mysql_connection = self.connection_manager.get_connection()
+            drained = self.spool.drain(
+                write=lambda df: self.write(mysql_connection, df),
+                batch_size=self.batch_size,
+            )
+        except Exception as e:
+            logger.warning(f"Draining the spool failed: {e}")
+            self.connection_manager.close()
+            return 0
+        logger.info(f"Drained {drained} rows from the spool: {self.spool.metrics()}")
+        return drained
+
+    def stop(self) -> None:
+        self._stop_event.set()
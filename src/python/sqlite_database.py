@@ -0,0 +1,26 @@
+"""
+SQLite stand-in for the MySQL database, for the tests and benchmarks.
+
+The tables are created by the same migrations as the MySQL database, so they
+have its columns, unique keys and indexes.
+"""
+
+import os
+import sqlite3
+from typing import List
+
+from migrations import MIGRATIONS, Migration, run_migrations
+
+
+def create_connection(
+    file_name: str = ":memory:", migrations: List[Migration] = MIGRATIONS
+) -> sqlite3.Connection:
+    """Connect to a new SQLite database with the schema after migrations.
+
+    An existing file_name is removed first.
+    """
+    if file_name != ":memory:" and os.path.exists(file_name):
+        os.remove(file_name)
+    connection = sqlite3.connect(file_name)
+    run_migrations(connection, migrations=migrations, dialect="sqlite")
+    return connection
@@ -0,0 +1,97 @@
+"""
+Synthetic workload generator for the ingest pipeline.
+
+Writes log files like the hamsterwheel sensor does ("2023-08-08 13:59:59.763742 - 0"),
+for any number of wheels and sample rates from 1 Hz to 10 kHz. The magnet is
+closed (0) while it passes the sensor, once per wheel turn.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+
+from log_lines import format_lines
+
+START_TIME = datetime(2023, 8, 8, 13, 0, 0)
+
+
+def generate_samples(
+    rate_hz: float,
+    duration_s: float,
+    rpm: float = 40.0,
+    closed_fraction: float = 0.1,
+    start_time: datetime = START_TIME,
+    seed: Optional[int] = None,
+) -> tuple:
+    """Generate sample times and magnet values of one wheel.
+
+    The wheel turns with rpm (+-20 % jitter per turn) and the magnet is closed
+    for closed_fraction of every turn. Returns datetime64[us] times and uint8 magnets.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(rate_hz * duration_s)
+    offsets_us = (np.arange(n) * 1e6 / rate_hz).astype(np.int64)
+    times = np.datetime64(start_time, "us") + offsets_us.astype("timedelta64[us]")
+
+    # Phase of the wheel per sample, with a random speed per turn
+    # Enough turns to cover the duration even if every turn is the shortest
+    n_turns = int(duration_s * rpm / 60 / 0.8) + 2
+    turn_lengths = 60 / rpm * rng.uniform(0.8, 1.2, size=n_turns)
+    turn_starts = np.concatenate([[0.0], np.cumsum(turn_lengths)])
+    seconds = offsets_us / 1e6
+    turn = np.searchsorted(turn_starts, seconds, side="right") - 1
+    phase = (seconds - turn_starts[turn]) / turn_lengths[turn]
+    magnets = (phase >= closed_fraction).astype(np.uint8)
+    return times, magnets
+
+
+def get_wheel_file_name(directory: str, wheel: int) -> str:
+    return os.path.join(directory, f"wheel{wheel}_log.log")
+
+
+def write_log_files(
+    directory: str,
+    rate_hz: float,
+    duration_s: float,
+    n_wheels: int = 1,
+    realtime: bool = False,
+    seed: Optional[int] = None,
+) -> List[str]:
+    """Write one log file per wheel, return the file names.
+
+    With realtime, the lines are appended at rate_hz in wall clock time (in
+    chunks of 10 ms), otherwise all lines are written at once.
+    """
+    file_names = [get_wheel_file_name(directory, wheel) for wheel in range(n_wheels)]
+    lines = []
+    for wheel in range(n_wheels):
+        times, magnets = generate_samples(
+            rate_hz=rate_hz,
+            duration_s=duration_s,
+            start_time=(datetime.now() if realtime else START_TIME)
+            + timedelta(microseconds=wheel),
+            seed=None if seed is None else seed + wheel,
+        )
+        lines.append(format_lines(times, magnets))
+
+    if not realtime:
+        for file_name, wheel_lines in zip(file_names, lines):
+            with open(file_name, "a") as f:
+                f.writelines(wheel_lines)
+        return file_names
+
+    files = [open(file_name, "a") for file_name in file_names]
+    chunk = max(int(rate_hz * 0.01), 1)
+    start = time.monotonic()
+    for i in range(0, len(lines[0]), chunk):
+        due = start + i / rate_hz
+        time.sleep(max(due - time.monotonic(), 0))
+        for f, wheel_lines in zip(files, lines):
+            f.writelines(wheel_lines[i : i + chunk])
+            f.flush()
+    for f in files:
+        f.close()
+    return file_names
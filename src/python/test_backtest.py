@@ -0,0 +1,112 @@
+from backtest import (
+    PriceFeed,
+    SimulatedWallet,
+    generate_history,
+    get_running_changes,
+    run_backtest,
+)
+from domain import Order
+from main import mockup_price_df, mockup_wallet_df
+from window_store import WindowStore
+
+import numpy as np
+import pandas as pd
+
+
+def create_price_feed(times) -> PriceFeed:
+    return PriceFeed.random_walk(
+        start_prices=dict(zip(mockup_price_df["currency"], mockup_price_df["price"])),
+        start=pd.Timestamp(times[0]).to_pydatetime(),
+        end=pd.Timestamp(times[-1]).to_pydatetime(),
+        seed=0,
+    )
+
+
+def test_get_running_changes():
+    times = np.datetime64("2023-08-03T12:00:00") + np.arange(30) * np.timedelta64(
+        1, "s"
+    )
+    magnets = np.ones(30, dtype=np.uint8)
+    # Runs from 2 to 9 + 5 seconds and from 15 (a pause of 6 seconds) to 15 + 5
+    magnets[[2, 4, 9, 15]] = 0
+    change_times, running = get_running_changes(times, magnets)
+    assert list(change_times) == [times[2], times[14], times[15], times[20]]
+    assert list(running) == [True, False, True, False]
+    # The same as WindowStore.is_running at every sample
+    window_store = WindowStore(capacity=30)
+    window_store.append(times, magnets)
+    for time in times:
+        index = np.searchsorted(change_times, time, side="right") - 1
+        expected = bool(running[index]) if index >= 0 else False
+        assert window_store.is_running(now=pd.Timestamp(time)) == expected
+
+
+def test_get_running_changes_never_running():
+    times = np.datetime64("2023-08-03T12:00:00") + np.arange(10) * np.timedelta64(
+        1, "s"
+    )
+    change_times, running = get_running_changes(times, np.ones(10, dtype=np.uint8))
+    assert len(change_times) == 0 and len(running) == 0
+
+
+def test_simulated_wallet():
+    wallet = SimulatedWallet.from_df(mockup_wallet_df)
+    wallet.execute(
+        Order(wallet_id=1, type="sell", currency="BTC", amount=1.0, price=100, state="")
+    )
+    assert wallet.amounts["BTC"] == 0
+    assert wallet.amounts["USD"] == 11_000
+    # A sold out currency has no wallet entry anymore
+    assert "BTC" not in wallet.snapshot().by_currency
+    wallet.execute(
+        Order(
+            wallet_id=2, type="buy", currency="ETH", amount=0.5, price=1_100, state=""
+        )
+    )
+    assert wallet.amounts["USD"] == 5_500
+    assert wallet.amounts["ETH"] == 9
+    assert wallet.snapshot().wallet_id("ETH") == 2
+
+
+def test_price_feed():
+    feed = PriceFeed(
+        times=np.array(["2023-08-03T12:00", "2023-08-03T13:00"], dtype="datetime64"),
+        prices={"BTC": np.array([100.0, 200.0])},
+    )
+    assert feed.snapshot(np.datetime64("2023-08-03T11:00")).price("BTC") == 100
+    assert feed.snapshot(np.datetime64("2023-08-03T12:59")).price("BTC") == 100
+    assert feed.snapshot(np.datetime64("2023-08-03T13:00")).price("BTC") == 200
+    assert feed.snapshot(np.datetime64("2023-08-03T13:00")).price("USD") == 1
+
+
+def test_run_backtest_every_sample():
+    times, magnets = generate_history(days=0.5, seed=1)
+    results = [
+        run_backtest(
+            times=times,
+            magnets=magnets,
+            wallet=SimulatedWallet.from_df(mockup_wallet_df),
+            price_feed=create_price_feed(times),
+            every_sample=every_sample,
+        )
+        for every_sample in [False, True]
+    ]
+    assert len(results[0].orders) > 0
+    assert results[0].decisions == results[1].decisions
+    assert results[0].steps < results[1].steps
+    pd.testing.assert_frame_equal(results[0].orders, results[1].orders)
+    pd.testing.assert_frame_equal(results[0].wallet_path, results[1].wallet_path)
+
+
+def test_run_backtest_broke():
+    times, magnets = generate_history(days=0.5, seed=1)
+    wallet = SimulatedWallet({"USD": 1})
+    result = run_backtest(
+        times=times,
+        magnets=magnets,
+        wallet=wallet,
+        price_feed=create_price_feed(times),
+    )
+    assert result.broke
+    assert result.decisions == 0
+    assert len(result.orders) == 0
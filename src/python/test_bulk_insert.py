@@ -0,0 +1,114 @@
+from bulk_insert import bulk_insert, df_to_rows, get_insert_query
+from sqlite_database import create_connection
+
+import pandas as pd
+
+
+def test_get_insert_query():
+    """Function to test get_insert_query()"""
+    assert (
+        get_insert_query(table="raw_hamsterwheel", columns=["hash", "magnet"])
+        == "INSERT INTO raw_hamsterwheel (hash, magnet) VALUES (%s, %s)"
+    )
+    assert (
+        get_insert_query(table="t", columns=["a"], dialect="sqlite")
+        == "INSERT INTO t (a) VALUES (?)"
+    )
+    assert (
+        get_insert_query(table="t", columns=["a"], ignore_duplicates=True)
+        == "INSERT IGNORE INTO t (a) VALUES (%s)"
+    )
+    assert (
+        get_insert_query(table="t", columns=["a"], replace_duplicates=True)
+        == "REPLACE INTO t (a) VALUES (%s)"
+    )
+
+
+def test_df_to_rows():
+    """Function to test df_to_rows()"""
+    df = pd.DataFrame(
+        {
+            "time": pd.to_datetime(["2023-08-08 13:59:59.763742"]),
+            "magnet": pd.Series([0], dtype="uint8"),
+            "hash": ["abc"],
+        }
+    )
+    rows = df_to_rows(df=df, columns=["hash", "time", "magnet"])
+    assert rows == [("abc", "2023-08-08 13:59:59.763742", 0)]
+    assert type(rows[0][2]) == int
+
+
+def test_bulk_insert():
+    """Function to test bulk_insert()"""
+    connection = create_connection()
+    df = pd.DataFrame(
+        {
+            "hash": [f"h{i}" for i in range(25)],
+            "time": ["2023-08-08 13:59:59.763742"] * 25,
+            "magnet": [i % 2 for i in range(25)],
+        }
+    )
+    result = bulk_insert(
+        connection=connection,
+        table="raw_hamsterwheel",
+        df=df,
+        columns=["hash", "time", "magnet"],
+        chunk_size=10,
+        dialect="sqlite",
+    )
+    assert result.rows == 25
+    assert result.batches == 3
+    rows = connection.execute(
+        "SELECT hash, magnet FROM raw_hamsterwheel ORDER BY id"
+    ).fetchall()
+    assert rows == [(f"h{i}", i % 2) for i in range(25)]
+
+
+def test_bulk_insert_empty():
+    """Function to test bulk_insert() with an empty DataFrame"""
+    connection = create_connection()
+    df = pd.DataFrame({"hash": [], "time": [], "magnet": []})
+    result = bulk_insert(
+        connection=connection,
+        table="raw_hamsterwheel",
+        df=df,
+        columns=["hash", "time", "magnet"],
+        dialect="sqlite",
+    )
+    assert result.rows == 0
+    assert result.batches == 0
+
+
+def test_bulk_insert_ignore_duplicates():
+    """Function to test bulk_insert() skips rows with an existing unique key"""
+    connection = create_connection()
+    df = pd.DataFrame({"hash": ["a", "b"], "time": ["t", "t"], "magnet": [0, 1]})
+    for _ in range(2):
+        bulk_insert(
+            connection=connection,
+            table="raw_hamsterwheel",
+            df=df,
+            columns=["hash", "time", "magnet"],
+            dialect="sqlite",
+            ignore_duplicates=True,
+        )
+    rows = connection.execute("SELECT hash FROM raw_hamsterwheel").fetchall()
+    assert rows == [("a",), ("b",)]
+
+
+def test_bulk_insert_without_commit():
+    """Function to test bulk_insert() leaves the commit to the caller"""
+    connection = create_connection()
+    df = pd.DataFrame({"hash": ["a"], "time": ["2023-08-08 13:59:59"], "magnet": [0]})
+    bulk_insert(
+        connection=connection,
+        table="raw_hamsterwheel",
+        df=df,
+        columns=["hash", "time", "magnet"],
+        dialect="sqlite",
+        commit=False,
+    )
+    connection.rollback()
+    assert connection.execute("SELECT COUNT(*) FROM raw_hamsterwheel").fetchone() == (
+        0,
+    )
@@ -0,0 +1,78 @@
+from db_connection import ConnectionManager
+
+import pytest
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.alive = True
+        self.closed = False
+
+    def ping(self, reconnect: bool = False) -> None:
+        if not self.alive:
+            raise ConnectionError("gone away")
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeConnect:
+    """Connect function that fails the first n_failures calls."""
+
+    def __init__(self, n_failures: int = 0) -> None:
+        self.n_failures = n_failures
+        self.connections = []
+        self.kwargs = None
+
+    def __call__(self, **kwargs) -> FakeConnection:
+        self.kwargs = kwargs
+        if self.n_failures > 0:
+            self.n_failures -= 1
+            raise ConnectionError("refused")
+        connection = FakeConnection()
+        self.connections.append(connection)
+        return connection
+
+
+def test_get_connection_reuses_connection():
+    """Function to test that get_connection() keeps the connection open"""
+    connect = FakeConnect()
+    manager = ConnectionManager(connect=connect, read_timeout=3)
+    assert manager.get_connection() is manager.get_connection()
+    assert len(connect.connections) == 1
+    assert connect.kwargs["read_timeout"] == 3
+    assert manager.stats()["connect_count"] == 1
+
+
+def test_get_connection_reconnects_when_lost():
+    """Function to test that get_connection() reconnects a lost connection"""
+    connect = FakeConnect()
+    manager = ConnectionManager(connect=connect, ping_interval=0)
+    connection = manager.get_connection()
+    connection.alive = False
+    new_connection = manager.get_connection()
+    assert new_connection is not connection
+    assert connection.closed
+    assert manager.stats()["connect_count"] == 2
+
+
+def test_get_connection_backoff():
+    """Function to test the backoff between failed connects"""
+    sleeps = []
+    connect = FakeConnect(n_failures=3)
+    manager = ConnectionManager(
+        connect=connect, backoff_seconds=1, max_backoff_seconds=3, sleep=sleeps.append
+    )
+    manager.get_connection()
+    assert sleeps == [1, 2, 3]
+    assert manager.stats()["failed_connect_count"] == 3
+    assert manager.stats()["connect_count"] == 1
+
+
+def test_get_connection_gives_up():
+    """Function to test that get_connection() raises after max_attempts"""
+    connect = FakeConnect(n_failures=10)
+    manager = ConnectionManager(connect=connect, max_attempts=2, sleep=lambda s: None)
+    with pytest.raises(ConnectionError):
+        manager.get_connection()
+    assert manager.stats()["failed_connect_count"] == 2
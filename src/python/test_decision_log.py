@@ -0,0 +1,93 @@
+from decision_log import DecisionLog
+from domain import Decision
+from repository import InMemoryRepository
+
+import pandas as pd
+
+
+def create_df_decision() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4],
+            "start_time": [
+                "2023-08-03 11:00:00",
+                "2023-08-03 11:10:00",
+                "2023-08-03 11:20:00",
+                "2023-08-03 11:30:00",
+            ],
+            "end_time": [None] * 4,
+            "type": ["amount", "buy_or_sell", "currency", "amount"],
+            "number_hamsterwheel_turns": [2, 1, 3, None],
+            "status": ["closed", "closed", "closed", "open"],
+            "result": [0.1, "buy", "BTC", None],
+        }
+    )
+
+
+def create_repository(df_decision: pd.DataFrame) -> InMemoryRepository:
+    empty = pd.DataFrame()
+    return InMemoryRepository(
+        df_raw_hamsterwheel=empty,
+        df_decision=df_decision,
+        df_wallet=empty,
+        df_price=empty,
+    )
+
+
+def test_decision_log_latest_and_cycle():
+    decision_log = DecisionLog()
+    assert decision_log.latest() is None
+    assert decision_log.cycle() == []
+    decision_log.load(create_df_decision())
+    assert len(decision_log) == 4
+    assert decision_log.latest().id == 4
+    assert [decision.id for decision in decision_log.cycle()] == [2, 3, 4]
+
+
+def test_decision_log_append_starts_new_cycle():
+    decision_log = DecisionLog()
+    decision_log.load(create_df_decision())
+    decision = Decision(
+        None, "2023-08-03 11:40:00", None, "buy_or_sell", None, "open", None
+    )
+    decision_log.append(decision)
+    assert decision_log.latest() is decision
+    assert decision_log.cycle() == [decision]
+
+
+def test_decision_log_inserts_earlier_decision():
+    decision_log = DecisionLog()
+    decision_log.load(create_df_decision().iloc[[0, 2, 3]])
+    assert decision_log.cycle() == []
+    # A buy_or_sell decision that arrives late still starts the cycle
+    decision_log.load(create_df_decision().iloc[[1]])
+    assert [decision.id for decision in decision_log.decisions] == [1, 2, 3, 4]
+    assert [decision.id for decision in decision_log.cycle()] == [2, 3, 4]
+
+
+def test_decision_log_sync_reads_only_delta():
+    df_decision = create_df_decision()
+    repository = create_repository(df_decision)
+    decision_log = DecisionLog()
+    decision_log.sync(repository)
+    assert len(decision_log) == 4
+    # Decision 4 is open, so the next sync starts there
+    assert decision_log.sync_id() == 4
+
+    df_decision.loc[3, ["status", "result"]] = ["closed", 0.3]
+    decision_log.load(repository.decisions_since(decision_log.sync_id()))
+    assert decision_log.latest().status == "closed"
+    assert decision_log.latest().result == 0.3
+    assert decision_log.sync_id() == 5
+
+
+def test_decision_log_adopts_saved_decision():
+    decision_log = DecisionLog()
+    decision_log.load(create_df_decision().iloc[:3])
+    decision = Decision(None, "2023-08-03 11:30:00", None, "amount", None, "open", None)
+    decision_log.append(decision)
+    # The row saved for the appended decision updates it instead of adding one
+    decision_log.load(create_df_decision().iloc[[3]])
+    assert len(decision_log) == 4
+    assert decision_log.latest() is decision
+    assert decision.id == 4
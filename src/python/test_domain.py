@@ -0,0 +1,129 @@
+from domain import (
+    Decision,
+    Order,
+    PriceSnapshot,
+    SnapshotCache,
+    WalletEntry,
+    WalletSnapshot,
+    decision_from_df,
+    decisions_from_df,
+    prices_from_df,
+    to_df,
+    wallet_from_df,
+)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_domain_objects_have_slots():
+    decision = Decision(1, "2023-08-03 12:00:00", None, "amount", None, "open", None)
+    assert not hasattr(decision, "__dict__")
+    with pytest.raises(AttributeError):
+        decision.some_col = "A"
+
+
+def test_decisions_from_df():
+    df = pd.DataFrame(
+        {
+            "id": [1, 2],
+            "start_time": ["2023-08-03 12:00:00", "2023-08-03 12:00:05"],
+            "type": ["buy_or_sell", "currency"],
+            "result": ["buy", np.nan],
+            "some_col": ["A", "B"],
+        }
+    )
+    decisions = decisions_from_df(df)
+    # Missing columns and NaN become None, other columns are dropped
+    assert decisions == [
+        Decision(1, "2023-08-03 12:00:00", None, "buy_or_sell", None, None, "buy"),
+        Decision(2, "2023-08-03 12:00:05", None, "currency", None, None, None),
+    ]
+
+
+def test_decision_from_df_none():
+    assert decision_from_df(None) is None
+    assert decision_from_df(pd.DataFrame(columns=["id", "type"])) is None
+
+
+def test_wallet_and_prices_from_df():
+    df = pd.DataFrame({"id": [1, 2], "currency": ["BTC", "USD"], "amount": [0.5, 10]})
+    assert wallet_from_df(df) == [WalletEntry(1, "BTC", 0.5), WalletEntry(2, "USD", 10)]
+    prices = prices_from_df(
+        pd.DataFrame({"id": [3], "currency": ["BTC"], "price": [25_000]})
+    )
+    assert prices[0].price == 25_000
+
+
+def test_to_df_round_trip():
+    orders = [
+        Order(1, "buy", "BTC", 0.1, 25_000.0, "pending"),
+        Order(4, "sell", "ETH", 0.2, 1_595.0, "pending"),
+    ]
+    df = to_df(Order, orders)
+    assert list(df.columns) == [
+        "wallet_id",
+        "type",
+        "currency",
+        "amount",
+        "price",
+        "state",
+    ]
+    assert df["currency"].tolist() == ["BTC", "ETH"]
+    assert [Order(*row) for row in df.itertuples(index=False, name=None)] == orders
+
+
+def test_wallet_snapshot():
+    wallet = WalletSnapshot.from_df(
+        pd.DataFrame(
+            {
+                "id": [1, 2, 3, 4],
+                "currency": ["BTC", "ETH", "DOGE", "USD"],
+                "amount": [100, 2, 44, 6],
+            }
+        )
+    )
+    assert wallet.has_money == True
+    assert wallet.has_crypto == True
+    assert wallet.currencies_to_sell == ("BTC", "ETH", "DOGE")
+    assert wallet.wallet_id("DOGE") == 3
+    with pytest.raises(KeyError):
+        wallet.wallet_id("XRP")
+    with pytest.raises(TypeError):
+        wallet.by_currency["XRP"] = WalletEntry(5, "XRP", 1)
+
+
+def test_wallet_snapshot_broke():
+    wallet = WalletSnapshot.from_entries([WalletEntry(1, "USD", 5)])
+    assert wallet.has_money == False
+    assert wallet.has_crypto == False
+    assert wallet.currencies_to_sell == ()
+    assert WalletSnapshot.from_df(None).has_money == False
+
+
+def test_price_snapshot_uses_last_price():
+    prices = PriceSnapshot.from_df(
+        pd.DataFrame(
+            {"id": [1, 2, 3], "currency": ["BTC", "ETH", "BTC"], "price": [1, 2, 3]}
+        )
+    )
+    assert prices.price("BTC") == 3
+    assert prices.price("ETH") == 2
+
+
+def test_snapshot_cache_rebuilds_on_change():
+    built = []
+
+    def build(df: pd.DataFrame) -> PriceSnapshot:
+        built.append(df)
+        return PriceSnapshot.from_df(df)
+
+    cache = SnapshotCache(build)
+    df = pd.DataFrame({"id": [1], "currency": ["BTC"], "price": [25_000]})
+    first = cache.get(df)
+    # Equal rows read again give the same snapshot
+    assert cache.get(df.copy()) is first
+    second = cache.get(df.assign(price=[26_000]))
+    assert second.price("BTC") == 26_000
+    assert len(built) == 2
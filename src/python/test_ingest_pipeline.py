@@ -0,0 +1,78 @@
+from ingest_pipeline import FileWatcher, IngestPipeline
+from logger import LogFollower, lines_to_df
+
+import asyncio
+import pandas as pd
+
+
+def test_file_watcher(tmp_path):
+    """Function to test FileWatcher.has_changed()"""
+    log_file = tmp_path / "log.log"
+    watcher = FileWatcher(get_file_name=lambda: str(log_file))
+    assert not watcher.has_changed()
+    log_file.write_text("a\n")
+    assert watcher.has_changed()
+    assert not watcher.has_changed()
+    with open(log_file, "a") as f:
+        f.write("b\n")
+    assert watcher.has_changed()
+
+
+def test_ingest_pipeline(tmp_path):
+    """Function to test that IngestPipeline writes the lines appended to the log"""
+    log_file = tmp_path / "log.log"
+    log_file.write_text("2023-08-08 13:59:58.000001 - 1\n")
+    written = []
+
+    async def run() -> None:
+        pipeline = IngestPipeline(
+            followers=[LogFollower(get_file_name=lambda: str(log_file))],
+            parse=lines_to_df,
+            write=written.append,
+            poll_interval=0.01,
+        )
+        task = asyncio.create_task(pipeline.run())
+        await asyncio.sleep(0.05)
+        with open(log_file, "a") as f:
+            f.write("2023-08-08 13:59:59.763742 - 0\n")
+            f.write("not a log line\n")
+            f.write("2023-08-08 14:00:00.100000 - 1\n")
+        for _ in range(100):
+            if pipeline.rows_written == 3:
+                break
+            await asyncio.sleep(0.01)
+        assert pipeline.queue_depths() == {"parser": 0, "writer": 0}
+        pipeline.stop()
+        await task
+
+    asyncio.run(run())
+    df = pd.concat(written, ignore_index=True)
+    assert df["time"].astype(str).tolist() == [
+        "2023-08-08 13:59:58.000001",
+        "2023-08-08 13:59:59.763742",
+        "2023-08-08 14:00:00.100000",
+    ]
+    assert df["magnet"].tolist() == [1, 0, 1]
+    assert "hash" in df.columns
+
+
+def test_ingest_pipeline_write_error():
+    """Function to test that a failing write does not stop the pipeline"""
+    calls = []
+
+    def write(df: pd.DataFrame) -> None:
+        calls.append(len(df))
+        raise ConnectionError("DB down")
+
+    async def run() -> None:
+        pipeline = IngestPipeline(followers=[], parse=lines_to_df, write=write)
+        task = asyncio.create_task(pipeline.run())
+        await asyncio.sleep(0)
+        await pipeline.line_queue.put(["2023-08-08 13:59:59.763742 - 0"])
+        await pipeline.line_queue.put(["2023-08-08 13:59:59.863742 - 1"])
+        await asyncio.sleep(0.05)
+        pipeline.stop()
+        await task
+
+    asyncio.run(run())
+    assert sum(calls) == 2
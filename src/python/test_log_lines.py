@@ -0,0 +1,126 @@
+from log_lines import (
+    check_date,
+    check_line,
+    extract_date,
+    extract_magnet,
+    parse_lines,
+)
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize(
+    "date, expected",
+    [
+        ("2021-08-a 13:59:59.763742", False),
+        ("2021-08-8 13:59:59.763742", False),
+        ("2021-8-08 13:59:59.763742", False),
+        ("20-08-08 13:59:59.763742", False),
+        ("2021-08-08 13:59.763742", False),
+        ("2021-08-08 13:59:59.763742", True),
+        ("2021-08-08 13:59:59.4444", True),
+        ("2021-08-08 13:59:59", False),
+        ("2021-08-08 23:59:59.763742", True),
+    ],
+)
+def test_check_date(date, expected):
+    """Function to test check_date() function."""
+    assert check_date(date) == expected
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("2021-08-a 13:59:59.763742 - 0", False),
+        ("2021-08-8 13:59:59.763742 - 0", False),
+        ("2021-8-08 13:59:59.763742 - 0", False),
+        ("20-08-08 13:59:59.763742 - 0", False),
+        ("2021-08-08 13:59.763742 - 0", False),
+        ("2021-08-08 13:59:59.763742 - 0", True),
+        ("2021-08-08 13:59:59.4444 - 0", True),
+        ("2021-08-08 13:59:59 - 0", False),
+        ("2021-08-08 23:59:59.763742 - 0", True),
+        ("2021-08-08 23:59:59.763742 - 1", True),
+        ("2021-08-08 23:59:59.763742 - 2", False),
+        ("2021-08-08 23:59:59.763742 - 3", False),
+        ("2021-08-08 23:59:59.763742 - ", False),
+        ("2021-08-08 23:59:59.763742", False),
+        ("2021-08-08 23:59:59.763742 - 10x", False),
+        ("2021-08-08 23:59:59.763742 - 0\n", True),
+    ],
+)
+def test_check_line(line, expected):
+    """Function to test check_line() function."""
+    assert check_line(line) == expected
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("2021-08-a 13:59:59.763742 - 0", "2021-08-a 13:59:59.763742"),
+        ("2021-08-8 13:59:59.763742 - 0", "2021-08-8 13:59:59.763742"),
+        ("2021-8-08 13:59:59.763742 - 0", "2021-8-08 13:59:59.763742"),
+        ("20-08-08 13:59:59.763742 - 0", "20-08-08 13:59:59.763742"),
+        ("2021-08-08 13:59.763742 - 0", "2021-08-08 13:59.763742"),
+    ],
+)
+def test_extract_date(line, expected):
+    """Function to test extract_date() function."""
+    assert extract_date(line) == expected
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("2021-08-a 13:59:59.763742 - 0", "0"),
+        ("2021-08-8 13:59:59.763742 - 0", "0"),
+        ("2021-8-08 13:59:59.763742 - 0", "0"),
+        ("20-08-08 13:59:59.763742 - 0", "0"),
+        ("2021-08-08 13:59.763742 - 0", "0"),
+        ("2021-08-08 13:59:59.763742 - 1", "1"),
+        ("2021-08-08 13:59:59.4444 - 0", "0"),
+        ("2021-08-08 13:59:59 - 0", "0"),
+        ("2021-08-08 23:59:59.763742 - 3", "3"),
+    ],
+)
+def test_extract_magnet(line, expected):
+    """Function to test extract_magnet() function."""
+    assert extract_magnet(line) == expected
+
+
+def test_parse_lines():
+    """Function to test parse_lines()"""
+    lines = [
+        "2023-08-08 13:59:59.763742 - 0\n",
+        "2023-08-08 13:59:59.4444 - 1",
+        "2023-08-08 13:59:59.763742 - 10x",
+        "2023-08-08 13:59:59 - 0",
+        "2023-13-08 13:59:59.763742 - 0",
+        "",
+        "2023-08-08 14:00:00.000001 - 1",
+    ]
+    parsed = parse_lines(lines)
+    np.testing.assert_array_equal(
+        parsed.times,
+        np.array(
+            [
+                "2023-08-08T13:59:59.763742",
+                "2023-08-08T13:59:59.444400",
+                "2023-08-08T14:00:00.000001",
+            ],
+            dtype="datetime64[us]",
+        ),
+    )
+    assert parsed.times.dtype == np.dtype("datetime64[us]")
+    np.testing.assert_array_equal(parsed.magnets, np.array([0, 1, 1], dtype=np.uint8))
+    assert parsed.magnets.dtype == np.uint8
+    assert parsed.rejected == 4
+
+
+def test_parse_lines_empty():
+    """Function to test parse_lines() without lines"""
+    parsed = parse_lines([])
+    assert len(parsed.times) == 0
+    assert len(parsed.magnets) == 0
+    assert parsed.rejected == 0
@@ -1,86 +1,246 @@
 from logger import (
-    check_date,
-    check_line,
-    extract_date,
-    extract_magnet,
+    LogFollower,
+    RawHamsterwheelWriter,
+    RecentKeys,
+    add_hash_column,
+    lines_to_df,
+    samples_to_df,
 )
+from bulk_insert import bulk_insert
+from notifications import ChangeListener, Notifier
+from spool import SampleSpool
+from sqlite_database import create_connection
 
+import hashlib
+import sqlite3
 import pytest
+import numpy as np
 import pandas as pd
 
 
-@pytest.mark.parametrize(
-    "date, expected",
-    [
-        ("2021-08-a 13:59:59.763742", False),
-        ("2021-08-8 13:59:59.763742", False),
-        ("2021-8-08 13:59:59.763742", False),
-        ("20-08-08 13:59:59.763742", False),
-        ("2021-08-08 13:59.763742", False),
-        ("2021-08-08 13:59:59.763742", True),
-        ("2021-08-08 13:59:59.4444", True),
-        ("2021-08-08 13:59:59", False),
-        ("2021-08-08 23:59:59.763742", True),
-    ],
-)
-def test_check_date(date, expected):
-    """Function to test check_date() function."""
-    assert check_date(date) == expected
+def test_log_follower_reads_only_new_lines(tmp_path):
+    """Function to test LogFollower.read_new_lines() on appended lines."""
+    log_file = tmp_path / "log.log"
+    log_file.write_text("a\nb\nc\n")
+    follower = LogFollower(get_file_name=lambda: str(log_file), n_initial_lines=2)
+    assert follower.read_new_lines() == ["b", "c"]
+    assert follower.read_new_lines() == []
+    with open(log_file, "a") as f:
+        f.write("d\ne")
+    assert follower.read_new_lines() == ["d"]
+    with open(log_file, "a") as f:
+        f.write("f\n")
+    assert follower.read_new_lines() == ["ef"]
 
 
-@pytest.mark.parametrize(
-    "line, expected",
-    [
-        ("2021-08-a 13:59:59.763742 - 0", False),
-        ("2021-08-8 13:59:59.763742 - 0", False),
-        ("2021-8-08 13:59:59.763742 - 0", False),
-        ("20-08-08 13:59:59.763742 - 0", False),
-        ("2021-08-08 13:59.763742 - 0", False),
-        ("2021-08-08 13:59:59.763742 - 0", True),
-        ("2021-08-08 13:59:59.4444 - 0", True),
-        ("2021-08-08 13:59:59 - 0", False),
-        ("2021-08-08 23:59:59.763742 - 0", True),
-        ("2021-08-08 23:59:59.763742 - 1", True),
-        ("2021-08-08 23:59:59.763742 - 2", False),
-        ("2021-08-08 23:59:59.763742 - 3", False),
-        ("2021-08-08 23:59:59.763742 - ", False),
-        ("2021-08-08 23:59:59.763742", False),
-    ],
-)
-def test_check_line(line, expected):
-    """Function to test check_line() function."""
-    assert check_line(line) == expected
+def test_log_follower_file_switch(tmp_path):
+    """Function to test LogFollower.read_new_lines() when the hourly file changes."""
+    file_names = [str(tmp_path / "1_log.log")]
+    with open(file_names[0], "w") as f:
+        f.write("a\n")
+    follower = LogFollower(get_file_name=lambda: file_names[-1])
+    assert follower.read_new_lines() == ["a"]
+    with open(file_names[0], "a") as f:
+        f.write("b\n")
+    file_names.append(str(tmp_path / "2_log.log"))
+    with open(file_names[1], "w") as f:
+        f.write("c\n")
+    assert follower.read_new_lines() == ["b", "c"]
 
 
-@pytest.mark.parametrize(
-    "line, expected",
-    [
-        ("2021-08-a 13:59:59.763742 - 0", "2021-08-a 13:59:59.763742"),
-        ("2021-08-8 13:59:59.763742 - 0", "2021-08-8 13:59:59.763742"),
-        ("2021-8-08 13:59:59.763742 - 0", "2021-8-08 13:59:59.763742"),
-        ("20-08-08 13:59:59.763742 - 0", "20-08-08 13:59:59.763742"),
-        ("2021-08-08 13:59.763742 - 0", "2021-08-08 13:59.763742"),
-    ],
-)
-def test_extract_date(line, expected):
-    """Function to test extract_date() function."""
-    assert extract_date(line) == expected
+def test_log_follower_truncate(tmp_path):
+    """Function to test LogFollower.read_new_lines() when the file is truncated."""
+    log_file = tmp_path / "log.log"
+    log_file.write_text("a\nb\n")
+    follower = LogFollower(get_file_name=lambda: str(log_file))
+    assert follower.read_new_lines() == ["a", "b"]
+    log_file.write_text("")
+    assert follower.read_new_lines() == []
+    with open(log_file, "a") as f:
+        f.write("c\n")
+    assert follower.read_new_lines() == ["c"]
+
+
+def test_log_follower_missing_file(tmp_path):
+    """Function to test LogFollower.read_new_lines() if the file does not exist yet."""
+    log_file = tmp_path / "log.log"
+    follower = LogFollower(get_file_name=lambda: str(log_file))
+    assert follower.read_new_lines() == []
+    log_file.write_text("a\n")
+    assert follower.read_new_lines() == ["a"]
 
 
 @pytest.mark.parametrize(
-    "line, expected",
+    "time, magnet",
     [
-        ("2021-08-a 13:59:59.763742 - 0", "0"),
-        ("2021-08-8 13:59:59.763742 - 0", "0"),
-        ("2021-8-08 13:59:59.763742 - 0", "0"),
-        ("20-08-08 13:59:59.763742 - 0", "0"),
-        ("2021-08-08 13:59.763742 - 0", "0"),
-        ("2021-08-08 13:59:59.763742 - 1", "1"),
-        ("2021-08-08 13:59:59.4444 - 0", "0"),
-        ("2021-08-08 13:59:59 - 0", "0"),
-        ("2021-08-08 23:59:59.763742 - 3", "3"),
+        ("2023-08-08 13:59:59.763742", "0"),
+        ("2023-08-08 13:59:59.763742", "1"),
+        ("x", "10"),
+        ("", ""),
+        ("a b\nc", "1"),
+        ("x" * 60, "0"),
     ],
 )
-def test_extract_magnet(line, expected):
-    """Function to test extract_magnet() function."""
-    assert extract_magnet(line) == expected
+def test_add_hash_column_md5(time, magnet):
+    """Function to test add_hash_column() gives the MD5 of the row's to_string()"""
+    df = pd.DataFrame(
+        {"time": [time, "2023-08-08 13:59:59.1"], "magnet": [magnet, "0"]}
+    )
+    expected = (
+        df[["time", "magnet"]]
+        .astype(str)
+        .apply(lambda x: hashlib.md5(x.to_string().encode()).hexdigest(), axis=1)
+        .tolist()
+    )
+    df = add_hash_column(df=df, columns=["time", "magnet"], mode="md5")
+    assert df["hash"].tolist() == expected
+
+
+def test_add_hash_column_fast():
+    """Function to test add_hash_column() in fast mode"""
+    df = pd.DataFrame(
+        {
+            "time": ["2023-08-08 13:59:59.763742", "2023-08-08 13:59:59.763742", "x"],
+            "magnet": ["0", "0", "0"],
+        }
+    )
+    df = add_hash_column(df=df, columns=["time", "magnet"], mode="fast")
+    hashes = df["hash"].tolist()
+    assert hashes[0] == hashes[1]
+    assert hashes[0] != hashes[2]
+    assert all(len(h) == 16 for h in hashes)
+
+
+@pytest.mark.parametrize("mode", ["md5", "fast"])
+def test_samples_to_df_hash_independent_of_batch(mode):
+    """Function to test a sample hashes the same alone and in a mixed batch"""
+    times = np.array(
+        [
+            "2023-08-08 13:59:59.100000",
+            "2023-08-08 13:59:59.763742",
+            "2023-08-08 14:00:00.000000",
+        ],
+        dtype="datetime64[us]",
+    )
+    magnets = np.array([0, 1, 0], dtype=np.uint8)
+    hashes = add_hash_column(
+        df=samples_to_df(times, magnets).drop(columns="hash"),
+        columns=["time", "magnet"],
+        mode=mode,
+    )["hash"].tolist()
+    for i in range(len(times)):
+        alone = add_hash_column(
+            df=samples_to_df(times[i : i + 1], magnets[i : i + 1]).drop(columns="hash"),
+            columns=["time", "magnet"],
+            mode=mode,
+        )["hash"].tolist()
+        assert alone == [hashes[i]]
+    # The same hash as the line's date string, like the logger always stored
+    df_line = pd.DataFrame({"time": ["2023-08-08 13:59:59.100000"], "magnet": ["0"]})
+    line_hash = add_hash_column(df=df_line, columns=["time", "magnet"], mode=mode)
+    assert line_hash["hash"].tolist() == [hashes[0]]
+
+
+@pytest.mark.parametrize("mode", ["md5", "fast"])
+def test_add_hash_column_without_rows(mode, monkeypatch):
+    """Function to test a batch of only invalid or partial lines gives no rows"""
+    replace = np.char.replace
+
+    def replace_non_empty(a, *args):
+        # Like numpy versions whose np.char.replace raises on zero-length arrays
+        if np.size(a) == 0:
+            raise ValueError("zero-size array")
+        return replace(a, *args)
+
+    monkeypatch.setattr(np.char, "replace", replace_non_empty)
+    df = lines_to_df(["garbage", "2023-08-08 13:59", ""])
+    assert len(df) == 0
+    assert list(df.columns) == ["time", "magnet", "hash"]
+    df = add_hash_column(
+        df=df.drop(columns="hash"), columns=["time", "magnet"], mode=mode
+    )
+    assert df["hash"].tolist() == []
+
+
+def test_add_hash_column_unknown_mode():
+    """Function to test add_hash_column() with an unknown mode"""
+    df = pd.DataFrame({"time": ["x"], "magnet": ["0"]})
+    with pytest.raises(ValueError):
+        add_hash_column(df=df, columns=["time", "magnet"], mode="sha1")
+
+
+def test_recent_keys_remove_known():
+    """Function to test RecentKeys.remove_known()"""
+    recent_keys = RecentKeys(max_size=10)
+    recent_keys.add(["a", "b"])
+    df = pd.DataFrame({"hash": ["a", "c", "d", "c"], "magnet": [0, 1, 0, 1]})
+    df = recent_keys.remove_known(df=df, compare_col="hash")
+    assert df["hash"].tolist() == ["c", "d"]
+
+
+def test_recent_keys_evicts_oldest():
+    """Function to test RecentKeys.add() evicts the oldest keys"""
+    recent_keys = RecentKeys(max_size=3)
+    recent_keys.add(["a", "b", "c"])
+    recent_keys.add(["a", "d"])
+    assert len(recent_keys) == 3
+    assert "b" not in recent_keys
+    assert "a" in recent_keys
+    assert "c" in recent_keys
+    assert "d" in recent_keys
+
+
+class FakeConnectionManager:
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def get_connection(self) -> sqlite3.Connection:
+        return self.connection
+
+    def close(self) -> None:
+        pass
+
+
+def insert_sqlite(connection: sqlite3.Connection, df: pd.DataFrame) -> None:
+    bulk_insert(
+        connection=connection,
+        table="raw_hamsterwheel",
+        df=df.astype({"time": str}),
+        columns=["hash", "time", "magnet"],
+        dialect="sqlite",
+        ignore_duplicates=True,
+    )
+
+
+def test_raw_hamsterwheel_writer_notifies_running_starts(tmp_path):
+    """Function to test RawHamsterwheelWriter only wakes the main loop when the wheel starts running"""
+    connection = create_connection()
+    listener = ChangeListener(address=("127.0.0.1", 0))
+    notifier = Notifier(address=listener.address)
+    spool = SampleSpool(path=str(tmp_path / "spool.sqlite3"))
+    writer = RawHamsterwheelWriter(
+        connection_manager=FakeConnectionManager(connection),
+        spool=spool,
+        notifier=notifier,
+        write=insert_sqlite,
+    )
+    start = np.datetime64("2023-08-08T13:59:00", "us")
+
+    def write(second: int, magnet: int) -> bool:
+        """Write one sample, return whether the main loop woke up."""
+        times = np.array([start + np.timedelta64(second, "s")])
+        writer.write(samples_to_df(times, np.array([magnet], dtype=np.uint8)))
+        return not listener.wait(timeout=0.05).timed_out
+
+    try:
+        # The sensor logs about once per second while the wheel is idle
+        assert not any(write(second, 1) for second in range(5))
+        assert write(5, 0)
+        assert not any(write(second, magnet) for second, magnet in [(6, 1), (7, 0)])
+        assert connection.execute(
+            "SELECT COUNT(*) FROM raw_hamsterwheel"
+        ).fetchone() == (8,)
+    finally:
+        notifier.close()
+        listener.close()
+        spool.close()
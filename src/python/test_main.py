@@ -5,9 +5,11 @@ from main import (
     get_result_buy_or_sell,
     get_result_currency,
     get_result_amount,
+    get_results_buy_or_sell,
+    get_results_currency,
+    get_results_amount,
     close_decision,
-    get_latest_decision,
-    get_decision_cycle,
+    prepare_order,
     has_money,
     has_crypto,
     get_buy_or_sell_decision,
@@ -15,7 +17,17 @@ from main import (
     get_currency_decision,
     get_wallet_id,
     get_price,
+    decision_is_open,
+    get_next_decision_type,
+    finish_decision,
+    create_order,
+    save_new_decision,
+    get_wake_timeout,
+    mockup_wallet_df,
 )
+from domain import Decision, Order, Price, PriceSnapshot, WalletEntry, WalletSnapshot
+from datetime import datetime
+import numpy as np
 import pandas as pd
 import pytest
 from pandas.testing import assert_frame_equal
@@ -50,6 +62,22 @@ def test_get_number_hamsterwheel_turns():
     )
 
 
+def test_get_number_hamsterwheel_turns_slow_pass():
+    """Function to test a slow pass over the magnet counts as one turn"""
+    test_df = pd.DataFrame(
+        {"time": pd.date_range("2023-08-03 00:00:00", "2023-08-03 00:00:07", freq="1s")}
+    )
+    test_df["magnet"] = [1, 0, 0, 0, 1, 1, 0, 0]
+    assert (
+        get_number_hamsterwheel_turns(
+            df_raw_hamsterwheel=test_df,
+            start_time=pd.Timestamp("2023-08-03 00:00:00"),
+            end_time=pd.Timestamp("2023-08-03 00:00:07"),
+        )
+        == 2
+    )
+
+
 def test_get_result_buy_or_sell():
     """Function to test get_result_buy_or_sell()"""
     number_hamsterwheel_turns = 66
@@ -111,6 +139,49 @@ def test_get_result_amount():
     assert get_result_amount(number_hamsterwheel_turns) == 0.1
 
 
+def test_get_results():
+    """Function to test the array versions of get_result_*()"""
+    currency_list = ["BTC", "ETH", "DOGE"]
+    number_hamsterwheel_turns = np.array([0, 2, 3, 10, 11, 12_345])
+    assert list(get_results_buy_or_sell(number_hamsterwheel_turns)) == [
+        "buy",
+        "buy",
+        "sell",
+        "buy",
+        "sell",
+        "sell",
+    ]
+    assert list(get_results_currency(number_hamsterwheel_turns, currency_list)) == [
+        "BTC",
+        "DOGE",
+        "BTC",
+        "ETH",
+        "DOGE",
+        "BTC",
+    ]
+    assert list(get_results_amount(number_hamsterwheel_turns)) == [
+        0.1,
+        0.3,
+        0.4,
+        0.1,
+        0.2,
+        0.6,
+    ]
+    # The same as the scalar functions
+    for turns in range(25):
+        assert get_result_buy_or_sell(turns) == get_results_buy_or_sell([turns])[0]
+        assert (
+            get_result_currency(turns, currency_list)
+            == get_results_currency([turns], currency_list)[0]
+        )
+        assert get_result_amount(turns) == get_results_amount([turns])[0]
+    # Huge turn counts need no memory proportional to them
+    assert get_result_currency(10**12, currency_list) == "ETH"
+    assert get_result_amount(10**12 + 4) == 0.5
+    with pytest.raises(ValueError):
+        get_results_currency(number_hamsterwheel_turns, [])
+
+
 @pytest.mark.parametrize(
     "test_input, expected",
     [
@@ -146,114 +217,6 @@ def test_get_next_decision_none():
     assert next_decision == "buy_or_sell"
 
 
-def test_get_latest_decision():
-    """Function to test get_latest_decision()"""
-    df_decision = pd.DataFrame(
-        {
-            "some_col": [None, None, None],
-            "type": ["buy_or_sell", "amount", "currency"],
-            "start_time": [
-                pd.Timestamp("2023-08-03 00:00:00"),
-                pd.Timestamp("2023-08-04 00:00:03"),
-                pd.Timestamp("2023-08-02 00:00:06"),
-            ],
-        }
-    )
-    latest_decision = get_latest_decision(df_decision=df_decision)
-    expected_df = pd.DataFrame(
-        {
-            "some_col": [None],
-            "type": ["amount"],
-            "start_time": [pd.Timestamp("2023-08-04 00:00:03")],
-        }
-    )
-    assert_frame_equal(
-        latest_decision.reset_index(drop=True), expected_df.reset_index(drop=True)
-    )
-
-
-def test_get_latest_decision_none():
-    """Function to test get_latest_decision() if df_decision is None"""
-    df_decision = None
-    latest_decision = get_latest_decision(df_decision=df_decision)
-    assert latest_decision == None
-
-
-def test_get_decision_cycle():
-    """Function to test get_decision_cycle()"""
-    df_decision = pd.DataFrame(
-        {
-            "some_col": ["A", "CCC", "BBB"],
-            "type": ["currency", "buy_or_sell", "amount"],
-            "start_time": [
-                pd.Timestamp("2023-08-01 00:00:00"),
-                pd.Timestamp("2023-08-02 00:00:03"),
-                pd.Timestamp("2023-08-03 00:00:06"),
-            ],
-        }
-    )
-    decision_cycle = get_decision_cycle(df_decision=df_decision)
-    expected_df = pd.DataFrame(
-        {
-            "some_col": ["CCC", "BBB"],
-            "type": ["buy_or_sell", "amount"],
-            "start_time": [
-                pd.Timestamp("2023-08-02 00:00:03"),
-                pd.Timestamp("2023-08-03 00:00:06"),
-            ],
-        }
-    )
-    assert_frame_equal(
-        decision_cycle.reset_index(drop=True), expected_df.reset_index(drop=True)
-    )
-
-
-def test_get_decision_cycle_none():
-    """Function to test get_decision_cycle() if df_decision is None"""
-    df_decision = None
-    decision_cycle = get_decision_cycle(df_decision=df_decision)
-    assert decision_cycle == None
-
-
-def test_get_decision_cycle_more_rows():
-    """Function to test get_decision_cycle() if df_decision has more rows"""
-    df_decision = pd.DataFrame(
-        {
-            "type": [
-                "buy_or_sell",
-                "currency",
-                "buy_or_sell",
-                "amount",
-                "currency",
-                "buy_or_sell",
-                "amount",
-            ],
-            "start_time": [
-                pd.Timestamp("2023-08-01 00:00:00"),
-                pd.Timestamp("2023-08-02 00:00:03"),
-                pd.Timestamp("2023-08-03 00:00:06"),
-                pd.Timestamp("2023-08-04 00:00:09"),
-                pd.Timestamp("2023-08-05 00:00:12"),
-                pd.Timestamp("2023-08-06 00:00:15"),
-                pd.Timestamp("2023-08-07 00:00:18"),
-            ],
-        }
-    )
-    decision_cycle = get_decision_cycle(df_decision=df_decision)
-    expected_df = pd.DataFrame(
-        {
-            "type": ["buy_or_sell", "amount"],
-            "start_time": [
-                pd.Timestamp("2023-08-06 00:00:15"),
-                pd.Timestamp("2023-08-07 00:00:18"),
-            ],
-        }
-    )
-    assert_frame_equal(
-        decision_cycle.reset_index(drop=True), expected_df.reset_index(drop=True)
-    )
-
-
 @pytest.mark.parametrize(
     "test_input, expected",
     [
@@ -447,3 +410,100 @@ def test_get_price():
     )
     price = get_price(currency=currency, df_price=df_price)
     assert price == 12.48
+
+
+def create_wallet(usd: float = 0) -> WalletSnapshot:
+    return WalletSnapshot.from_entries(
+        [
+            WalletEntry(1, "BTC", 100),
+            WalletEntry(2, "ETH", 2),
+            WalletEntry(3, "DOGE", 44),
+            WalletEntry(4, "USD", usd),
+        ]
+    )
+
+
+def test_decision_objects():
+    """Function to test save_new_decision(), decision_is_open() and get_next_decision_type()"""
+    assert decision_is_open(None) == False
+    assert get_next_decision_type(None) == "buy_or_sell"
+    decision = save_new_decision("amount")
+    assert decision.type == "amount"
+    assert decision_is_open(decision) == True
+    assert get_next_decision_type(decision) == "buy_or_sell"
+
+
+def test_finish_decision_and_create_order():
+    """Function to test finish_decision() and create_order() like test_close_decision()"""
+    decision_cycle = [
+        Decision(1, "2023-08-02 00:00:03", None, "buy_or_sell", 1, "closed", "sell"),
+        Decision(2, "2023-08-02 00:00:06", None, "currency", 1, "closed", None),
+        Decision(3, "2023-08-03 00:00:06", None, "amount", None, "open", None),
+    ]
+    wallet = create_wallet()
+    # One turn of the currency decision picks ETH of the currencies to sell
+    finish_decision(
+        decision_latest=decision_cycle[1],
+        decision_cycle=decision_cycle,
+        number_hamsterwheel_turns=1,
+        end_time="2023-08-02 00:01:00",
+        wallet=wallet,
+    )
+    assert decision_cycle[1].result == "ETH"
+    decision_closed = finish_decision(
+        decision_latest=decision_cycle[2],
+        decision_cycle=decision_cycle,
+        number_hamsterwheel_turns=2,
+        end_time="2023-08-04 00:05:09",
+        wallet=wallet,
+    )
+    assert decision_closed.status == "closed"
+    assert decision_closed.number_hamsterwheel_turns == 2
+    assert decision_closed.result == 0.3
+    order = create_order(
+        decision_closed=decision_closed,
+        decision_cycle=decision_cycle,
+        wallet=wallet,
+        prices=PriceSnapshot.from_prices(
+            [Price(1, "BTC", 25_000), Price(2, "ETH", 1_595)]
+        ),
+    )
+    assert order == Order(2, "sell", "ETH", 0.3, 1_595, "pending")
+
+
+def test_prepare_order():
+    """Function to test prepare_order() gives the order of create_order() as a row"""
+    df_decision_cycle = pd.DataFrame(
+        {
+            "type": ["buy_or_sell", "currency", "amount"],
+            "result": ["sell", "ETH", 0.3],
+        }
+    )
+    df_price = pd.DataFrame({"currency": ["BTC", "ETH"], "price": [25_000, 1_595]})
+    df_order = prepare_order(
+        df_decision_closed=df_decision_cycle.iloc[[2]],
+        df_decision_cycle=df_decision_cycle,
+        df_wallet=mockup_wallet_df,
+        df_price=df_price,
+    )
+    assert df_order.to_dict("records") == [
+        {
+            "wallet_id": 2,
+            "type": "sell",
+            "currency": "ETH",
+            "amount": 0.3,
+            "price": 1_595,
+            "state": "pending",
+        }
+    ]
+
+
+def test_get_wake_timeout():
+    """Function to test get_wake_timeout()"""
+    now = datetime(2023, 8, 3, 12, 0, 9)
+    running_until = pd.Timestamp("2023-08-03 12:00:10.5")
+    assert get_wake_timeout(running_until=running_until, now=now, timeout=5) == 1.5
+    assert get_wake_timeout(running_until=running_until, now=now, timeout=1) == 1
+    assert get_wake_timeout(running_until=None, now=now, timeout=5) == 5
+    # The hamsterwheel already stopped
+    assert get_wake_timeout(running_until=pd.Timestamp(now), now=now, timeout=5) == 5
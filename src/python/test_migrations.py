@@ -0,0 +1,126 @@
+from migrations import (
+    MIGRATIONS,
+    Migration,
+    add_index,
+    get_schema_version,
+    has_index,
+    remove_duplicate_hashes,
+    run_migrations,
+)
+from sqlite_database import create_connection
+
+import os
+import re
+import sqlite3
+
+CREATE_TABLES_SQL = os.path.join(
+    os.path.dirname(__file__), "..", "sql", "create_tables.sql"
+)
+
+
+def create_tables() -> sqlite3.Connection:
+    """The tables as before migration 2, without indexes."""
+    return create_connection(migrations=MIGRATIONS[:1])
+
+
+def insert_rows(connection: sqlite3.Connection, table: str, hashes: list) -> None:
+    connection.executemany(
+        f"INSERT INTO {table} (hash, time, magnet) VALUES (?, '2023-08-08 13:59:00', 0)",
+        [(hash,) for hash in hashes],
+    )
+    connection.commit()
+
+
+def test_run_migrations():
+    """Function to test run_migrations() applies every migration once, in order"""
+    connection = sqlite3.connect(":memory:")
+    calls = []
+    migrations = [
+        Migration(2, "Second", lambda cursor, dialect: calls.append(2)),
+        Migration(1, "First", lambda cursor, dialect: calls.append(1)),
+    ]
+    assert get_schema_version(mysql_connection=connection) == 0
+    assert run_migrations(connection, migrations=migrations, dialect="sqlite") == [1, 2]
+    assert run_migrations(connection, migrations=migrations, dialect="sqlite") == []
+    assert calls == [1, 2]
+    assert get_schema_version(mysql_connection=connection) == 2
+
+    migrations.append(Migration(3, "Third", lambda cursor, dialect: calls.append(3)))
+    assert run_migrations(connection, migrations=migrations, dialect="sqlite") == [3]
+    assert calls == [1, 2, 3]
+
+
+def test_add_index_idempotent():
+    """Function to test has_index() and add_index() add an index only once"""
+    connection = create_tables()
+    cursor = connection.cursor()
+    assert not has_index(cursor, "raw_hamsterwheel", "time", dialect="sqlite")
+    for _ in range(2):
+        add_index(cursor, "raw_hamsterwheel", "time", dialect="sqlite")
+    assert has_index(cursor, "raw_hamsterwheel", "time", dialect="sqlite")
+    # A plain index is not a unique one
+    assert not has_index(
+        cursor, "raw_hamsterwheel", "time", unique=True, dialect="sqlite"
+    )
+    indexes = connection.execute("PRAGMA index_list(raw_hamsterwheel)").fetchall()
+    assert len(indexes) == 1
+
+
+def test_remove_duplicate_hashes():
+    """Function to test remove_duplicate_hashes() keeps the first row of every hash over chunks"""
+    connection = create_tables()
+    hashes = [f"h{i % 7}" for i in range(50)] + ["unique"]
+    insert_rows(connection, "raw_hamsterwheel", hashes)
+    removed = remove_duplicate_hashes(
+        connection.cursor(), "raw_hamsterwheel", chunk_size=4, dialect="sqlite"
+    )
+    assert removed == 43
+    rows = connection.execute("SELECT id, hash FROM raw_hamsterwheel ORDER BY id")
+    assert rows.fetchall() == [(i + 1, f"h{i}") for i in range(7)] + [(51, "unique")]
+    # Again without duplicates, the temporary table is dropped in between
+    assert (
+        remove_duplicate_hashes(
+            connection.cursor(), "raw_hamsterwheel", dialect="sqlite"
+        )
+        == 0
+    )
+
+
+def test_run_index_migrations():
+    """Function to test the index migrations on tables with duplicate hashes, and again"""
+    connection = create_tables()
+    insert_rows(connection, "raw_hamsterwheel", ["a", "b", "a", "c", "b"])
+    insert_rows(connection, "closed_hamsterwheel", ["a", "a"])
+    migrations = [migration for migration in MIGRATIONS if migration.version in (2, 3)]
+    assert run_migrations(connection, migrations=migrations, dialect="sqlite") == [2, 3]
+    cursor = connection.cursor()
+    for table in ["raw_hamsterwheel", "closed_hamsterwheel"]:
+        assert has_index(cursor, table, "time", dialect="sqlite")
+        assert has_index(cursor, table, "hash", unique=True, dialect="sqlite")
+    assert connection.execute(
+        "SELECT id, hash FROM raw_hamsterwheel ORDER BY id"
+    ).fetchall() == [(1, "a"), (2, "b"), (4, "c")]
+    assert connection.execute("SELECT id FROM closed_hamsterwheel").fetchall() == [(1,)]
+    # Applying the migrations again, e.g. after a crash before their version
+    # record, changes nothing
+    for migration in migrations:
+        migration.apply(cursor, "sqlite")
+    indexes = connection.execute("PRAGMA index_list(raw_hamsterwheel)").fetchall()
+    assert len(indexes) == 2
+
+
+def test_migrations_match_create_tables_sql():
+    """Function to test the migrations create the columns, unique keys and indexes of create_tables.sql"""
+    connection = create_connection()
+    cursor = connection.cursor()
+    with open(CREATE_TABLES_SQL) as f:
+        statements = re.findall(r"CREATE TABLE (\w+)\((.*?)\);", f.read(), re.DOTALL)
+    assert len(statements) > 0
+    for table, body in statements:
+        columns = re.findall(r"^\s*(?!PRIMARY|UNIQUE|INDEX|FOREIGN)(\w+) ", body, re.M)
+        rows = connection.execute(f"PRAGMA table_info({table})").fetchall()
+        assert [row[1] for row in rows] == columns
+        for column in re.findall(r"UNIQUE KEY \( (\w+) \)", body):
+            assert has_index(cursor, table, column, unique=True, dialect="sqlite")
+        for column in re.findall(r"\bINDEX \( (\w+) \)", body):
+            assert has_index(cursor, table, column, dialect="sqlite")
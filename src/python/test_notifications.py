@@ -0,0 +1,74 @@
+from notifications import (
+    TOPIC_DECISION,
+    TOPIC_SAMPLES,
+    ChangeListener,
+    Notifier,
+    RunningStarts,
+    WakeLatency,
+    WakeUp,
+)
+
+import numpy as np
+import time
+
+
+def test_notification_wakes_listener():
+    listener = ChangeListener(address=("127.0.0.1", 0))
+    notifier = Notifier(address=listener.address)
+    try:
+        for _ in range(3):
+            notifier.notify(TOPIC_SAMPLES)
+        notifier.notify(TOPIC_DECISION)
+        start = time.perf_counter()
+        wake_up = listener.wait(timeout=5)
+        assert time.perf_counter() - start < 1
+        # A burst of notifications wakes the listener once
+        assert wake_up.topics == {TOPIC_SAMPLES, TOPIC_DECISION}
+        assert not wake_up.timed_out
+        assert listener.wait(timeout=0).timed_out
+    finally:
+        notifier.close()
+        listener.close()
+
+
+def test_listener_times_out():
+    listener = ChangeListener(address=("127.0.0.1", 0))
+    try:
+        start = time.perf_counter()
+        wake_up = listener.wait(timeout=0.05)
+        assert wake_up.timed_out
+        assert time.perf_counter() - start >= 0.04
+    finally:
+        listener.close()
+
+
+def test_notify_without_listener():
+    notifier = Notifier(address=("127.0.0.1", 9))
+    notifier.notify(TOPIC_SAMPLES)
+    notifier.close()
+
+
+def test_wake_latency():
+    wake_latency = WakeLatency()
+    wake_latency.record(WakeUp(topics={TOPIC_SAMPLES}, woke_at=10.0), now=10.25)
+    wake_latency.record(WakeUp(topics={TOPIC_SAMPLES}, woke_at=20.0), now=20.5)
+    wake_latency.record(WakeUp(topics=set(), woke_at=30.0), now=30.125)
+    assert wake_latency.stats() == {
+        "notification": {"count": 2, "total_seconds": 0.75, "max_seconds": 0.5},
+        "timeout": {"count": 1, "total_seconds": 0.125, "max_seconds": 0.125},
+    }
+
+
+def test_running_starts():
+    start = np.datetime64("2023-08-03T12:00:00", "ns")
+    seconds = [np.timedelta64(s, "s") for s in range(20)]
+    running_starts = RunningStarts(seconds=5)
+    # Idle samples do not start it, the first closed sample does
+    assert not running_starts.update([start + seconds[0]], [1])
+    assert running_starts.update([start + seconds[1], start + seconds[2]], [1, 0])
+    # Closed samples while it runs do not start it again
+    assert not running_starts.update([start + seconds[3], start + seconds[6]], [0, 0])
+    assert not running_starts.update([start + seconds[7]], [1])
+    # A closed sample 5 seconds or more after the last one starts it again
+    assert running_starts.update([start + seconds[11], start + seconds[12]], [0, 0])
+    assert running_starts.update([start + seconds[13], start + seconds[18]], [0, 0])
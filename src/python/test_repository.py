@@ -0,0 +1,72 @@
+from repository import InMemoryRepository
+
+from datetime import datetime
+import pandas as pd
+
+
+def create_repository() -> InMemoryRepository:
+    return InMemoryRepository(
+        df_raw_hamsterwheel=pd.DataFrame(
+            {
+                "id": [1, 2, 3, 4],
+                "time": [
+                    "2023-08-03 12:00:00",
+                    "2023-08-03 12:00:03",
+                    "2023-08-03 12:00:06",
+                    "2023-08-03 12:00:09",
+                ],
+                "magnet": [1, 0, 1, 0],
+            }
+        ),
+        df_decision=pd.DataFrame(
+            {
+                "id": [1, 2, 3, 4],
+                "start_time": [
+                    "2023-08-03 11:00:00",
+                    "2023-08-03 11:10:00",
+                    "2023-08-03 11:20:00",
+                    "2023-08-03 11:30:00",
+                ],
+                "type": ["amount", "buy_or_sell", "currency", "amount"],
+                "status": ["closed", "closed", "closed", "open"],
+                "result": [0.1, "buy", "BTC", None],
+            }
+        ),
+        df_wallet=pd.DataFrame(
+            {"id": [1, 2], "currency": ["BTC", "USD"], "amount": [1, 100]}
+        ),
+        df_price=pd.DataFrame(
+            {"id": [1, 2, 3], "currency": ["BTC", "ETH", "BTC"], "price": [1, 2, 3]}
+        ),
+        now=lambda: datetime(2023, 8, 3, 12, 0, 9),
+    )
+
+
+def test_in_memory_repository():
+    """Function to test the queries of InMemoryRepository"""
+    repository = create_repository()
+    assert repository.hamsterwheel_between(
+        start_time="2023-08-03 12:00:03", end_time="2023-08-03 12:00:06"
+    )["id"].tolist() == [2, 3]
+    assert repository.decisions_since(3)["id"].tolist() == [3, 4]
+    assert repository.hamsterwheel_after(2)["id"].tolist() == [3, 4]
+    assert len(repository.decisions_since(5)) == 0
+    assert repository.prices().set_index("currency")["price"].to_dict() == {
+        "ETH": 2,
+        "BTC": 3,
+    }
+
+
+def test_repository_caches_within_tick():
+    """Function to test the repository caches results until the next tick and counts queries"""
+    repository = create_repository()
+    wallet = repository.wallet()
+    assert repository.wallet() is wallet
+    repository.hamsterwheel_after(2)
+    repository.hamsterwheel_after(2)
+    repository.start_tick()
+    repository.hamsterwheel_after(2)
+    stats = repository.latency_stats()
+    assert stats["wallet"]["count"] == 1
+    assert stats["hamsterwheel_after"]["count"] == 2
+    assert stats["hamsterwheel_after"]["max_seconds"] > 0
@@ -0,0 +1,67 @@
+from retention import delete_expired_rows, get_cutoff
+from sqlite_database import create_connection
+
+import sqlite3
+from datetime import datetime, timedelta
+
+NOW = datetime(2023, 8, 8, 14, 0, 0)
+
+
+def create_raw_hamsterwheel(minutes_ago: list) -> sqlite3.Connection:
+    connection = create_connection()
+    connection.executemany(
+        "INSERT INTO raw_hamsterwheel (hash, time, magnet) VALUES (?, ?, ?)",
+        [
+            (f"h{i}", str(NOW - timedelta(minutes=minutes)), 0)
+            for i, minutes in enumerate(minutes_ago)
+        ],
+    )
+    connection.commit()
+    return connection
+
+
+def remaining_ids(connection: sqlite3.Connection) -> list:
+    rows = connection.execute("SELECT id FROM raw_hamsterwheel ORDER BY id").fetchall()
+    return [row[0] for row in rows]
+
+
+def test_get_cutoff():
+    """Function to test get_cutoff()"""
+    assert get_cutoff(minutes=15, now=NOW) == "2023-08-08 13:45:00"
+
+
+def test_delete_expired_rows():
+    """Function to test delete_expired_rows() deletes in chunks up to the new rows"""
+    connection = create_raw_hamsterwheel([30, 29, 28, 27, 26, 5, 4])
+    pauses = []
+    result = delete_expired_rows(
+        mysql_connection=connection,
+        table="raw_hamsterwheel",
+        minutes=15,
+        chunk_size=2,
+        dialect="sqlite",
+        now=NOW,
+        sleep=pauses.append,
+    )
+    assert remaining_ids(connection) == [6, 7]
+    assert result.rows == 5
+    assert result.chunks == 4
+    assert len(pauses) == 3
+    assert result.max_lock_seconds > 0
+
+
+def test_delete_expired_rows_keeps_rows_after_max_id():
+    """Function to test delete_expired_rows() keeps rows after max_id"""
+    connection = create_raw_hamsterwheel([30, 29, 28, 27])
+    result = delete_expired_rows(
+        mysql_connection=connection,
+        table="raw_hamsterwheel",
+        minutes=15,
+        chunk_size=3,
+        max_id=2,
+        dialect="sqlite",
+        now=NOW,
+        sleep=lambda seconds: None,
+    )
+    assert remaining_ids(connection) == [3, 4]
+    assert result.rows == 2
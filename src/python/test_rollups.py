@@ -0,0 +1,75 @@
+from rollups import RangePart, get_turn_stats, plan_range, update_rollups
+from sqlite_database import create_connection
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+START = datetime(2023, 8, 8, 13, 0, 0)
+
+
+def create_turn_events(start_times: list, rpms: list) -> sqlite3.Connection:
+    connection = create_connection()
+    connection.executemany(
+        "INSERT INTO turn_event (start_time, duration, rpm) VALUES (?, ?, ?)",
+        [
+            (time.strftime("%Y-%m-%d %H:%M:%S.%f"), 0.1, rpm)
+            for time, rpm in zip(start_times, rpms)
+        ],
+    )
+    return connection
+
+
+def test_plan_range():
+    """Function to test plan_range() uses the coarsest rollup that fits"""
+    start = datetime(2023, 8, 8, 12, 59, 58, 500000)
+    end = datetime(2023, 8, 8, 15, 1, 0)
+    assert plan_range(start, end) == [
+        RangePart("turn_event", start, datetime(2023, 8, 8, 12, 59, 59)),
+        RangePart(
+            "turn_rollup_second",
+            datetime(2023, 8, 8, 12, 59, 59),
+            datetime(2023, 8, 8, 13, 0, 0),
+        ),
+        RangePart(
+            "turn_rollup_hour",
+            datetime(2023, 8, 8, 13, 0, 0),
+            datetime(2023, 8, 8, 15, 0, 0),
+        ),
+        RangePart("turn_rollup_minute", datetime(2023, 8, 8, 15, 0, 0), end),
+    ]
+
+
+def test_get_turn_stats():
+    """Function to test get_turn_stats() from rollups updated in batches"""
+    rng = np.random.default_rng(0)
+    offsets = np.sort(rng.uniform(0, 3 * 3600, size=2000))
+    start_times = [START + timedelta(seconds=offset) for offset in offsets]
+    rpms = [None] + list(rng.uniform(10, 80, size=len(offsets) - 1))
+    connection = create_turn_events(start_times, rpms)
+    for i in range(0, len(start_times), 300):
+        batch = start_times[i : i + 300]
+        update_rollups(connection, start=batch[0], end=batch[-1], dialect="sqlite")
+
+    df_event = pd.DataFrame({"start_time": start_times, "rpm": rpms})
+    for _ in range(20):
+        start, end = sorted(
+            START + timedelta(seconds=offset)
+            for offset in rng.uniform(-600, 3 * 3600 + 600, size=2)
+        )
+        stats = get_turn_stats(connection, start=start, end=end, dialect="sqlite")
+        in_range = df_event[
+            (df_event["start_time"] >= start) & (df_event["start_time"] < end)
+        ]
+        assert stats.turns == len(in_range)
+        if in_range["rpm"].notna().any():
+            assert np.isclose(stats.max_rpm, in_range["rpm"].max())
+
+    day = get_turn_stats(
+        connection, start=START, end=START + timedelta(days=1), dialect="sqlite"
+    )
+    seconds = df_event["start_time"].dt.floor("1s")
+    assert day.turns == len(df_event)
+    assert day.active_seconds == seconds.nunique()
@@ -0,0 +1,159 @@
+from sample_ring import (
+    RingFollower,
+    RingReader,
+    SampleRing,
+    convert_log_file,
+    convert_ring_file,
+)
+
+from ingest_pipeline import IngestPipeline
+from logger import add_hash_column, batches_to_df
+
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_sample_ring_append_and_read(tmp_path):
+    """Function to test SampleRing.append() and RingReader.read_new()"""
+    ring = SampleRing.create(str(tmp_path / "ring.bin"), capacity=5)
+    reader = RingReader(ring)
+    ring.append(times_ns=[1, 2, 3], magnets=[1, 0, 1])
+    read = reader.read_new()
+    assert read.lost == 0
+    assert len(read.views) == 1
+    assert read.views[0]["time_ns"].tolist() == [1, 2, 3]
+    # The view is on the mapped file, not a copy
+    assert np.shares_memory(read.views[0], ring.records)
+
+    # Wraps around the end of the ring
+    ring.append(times_ns=[4, 5, 6, 7], magnets=[0, 0, 1, 1])
+    read = reader.read_new()
+    assert [view["time_ns"].tolist() for view in read.views] == [[4, 5], [6, 7]]
+    assert reader.read_new().views == []
+
+
+def test_ring_reader_lost_records(tmp_path):
+    """Function to test that RingReader counts records overwritten before they were read"""
+    ring = SampleRing.create(str(tmp_path / "ring.bin"), capacity=4)
+    reader = RingReader(ring)
+    ring.append(times_ns=np.arange(10), magnets=np.zeros(10))
+    times, magnets = reader.read_new_arrays()
+    assert times.view(np.int64).tolist() == [6, 7, 8, 9]
+    assert reader.lost == 6
+
+
+def test_sample_ring_reopen(tmp_path):
+    """Function to test that a ring file can be opened again"""
+    path = str(tmp_path / "ring.bin")
+    ring = SampleRing.create(path, capacity=10)
+    ring.append(times_ns=[1, 2], magnets=[0, 1])
+    ring.flush()
+    ring = SampleRing(path)
+    assert ring.capacity == 10
+    assert ring.write_count == 2
+    with pytest.raises(ValueError):
+        (tmp_path / "other.bin").write_bytes(b"\0" * 100)
+        SampleRing(str(tmp_path / "other.bin"))
+
+
+def test_convert_log_file_round_trip(tmp_path):
+    """Function to test converting a text log to a ring and back"""
+    lines = [
+        "2023-08-08 13:59:59.763742 - 0\n",
+        "2023-08-08 13:59:59.863742 - 1\n",
+        "not a log line\n",
+        "2023-08-08 14:00:00.000001 - 0\n",
+    ]
+    log_file = tmp_path / "log.log"
+    log_file.write_text("".join(lines))
+    ring_file = str(tmp_path / "ring.bin")
+    assert convert_log_file(str(log_file), ring_file, capacity=100) == 3
+    out_file = tmp_path / "out.log"
+    assert convert_ring_file(ring_file, str(out_file)) == 3
+    assert out_file.read_text() == "".join(lines[:2] + lines[3:])
+
+
+def test_ring_follower(tmp_path):
+    """Function to test RingFollower.read_new_lines() and has_changed()"""
+    ring = SampleRing.create(str(tmp_path / "ring.bin"), capacity=5)
+    follower = RingFollower(ring)
+    assert not follower.has_changed()
+    assert follower.read_new_lines() == []
+    ring.append(times_ns=[1, 2], magnets=[1, 0])
+    assert follower.has_changed()
+    batches = follower.read_new_lines()
+    assert len(batches) == 1
+    assert batches[0].times.view("int64").tolist() == [1, 2]
+    assert batches[0].magnets.tolist() == [1, 0]
+    assert not follower.has_changed()
+
+
+def test_ring_follower_resumes_after_restart(tmp_path):
+    """Function to test that a restarted RingFollower reads the samples written while it was down"""
+    ring = SampleRing.create(str(tmp_path / "ring.bin"), capacity=5)
+    state_path = str(tmp_path / "ring.bin.read_count")
+    follower = RingFollower(ring, state_path=state_path, save_interval=0)
+    ring.append(times_ns=[1, 2], magnets=[1, 0])
+    assert follower.read_new_lines()[0].times.view("int64").tolist() == [1, 2]
+    # Written while the logger was down
+    ring.append(times_ns=[3, 4], magnets=[0, 1])
+    follower = RingFollower(ring, state_path=state_path, save_interval=0)
+    assert follower.read_new_lines()[0].times.view("int64").tolist() == [3, 4]
+    # Down for longer than the ring holds: resume from the oldest record left
+    ring.append(times_ns=np.arange(5, 12), magnets=np.zeros(7))
+    follower = RingFollower(ring, state_path=state_path, save_interval=0)
+    batches = follower.read_new_lines()
+    assert batches[0].times.view("int64").tolist() == [7, 8, 9, 10, 11]
+    assert follower.reader.lost == 2
+    # A ring created again starts from its first record
+    ring = SampleRing.create(str(tmp_path / "ring.bin"), capacity=5)
+    ring.append(times_ns=[1], magnets=[1])
+    follower = RingFollower(ring, state_path=state_path, save_interval=0)
+    assert follower.read_new_lines()[0].times.view("int64").tolist() == [1]
+
+
+def test_ingest_pipeline_ring_follower(tmp_path):
+    """Function to test that IngestPipeline writes the samples appended to a ring"""
+    ring = SampleRing.create(str(tmp_path / "ring.bin"), capacity=100)
+    written = []
+
+    async def run() -> None:
+        pipeline = IngestPipeline(
+            followers=[RingFollower(ring, poll_interval=0.01)],
+            parse=batches_to_df,
+            write=written.append,
+        )
+        task = asyncio.create_task(pipeline.run())
+        await asyncio.sleep(0.05)
+        times = np.array(
+            ["2023-08-08 13:59:59.100000", "2023-08-08 13:59:59.763742"],
+            dtype="datetime64[ns]",
+        )
+        ring.append(times_ns=times.view(np.int64), magnets=[0, 1])
+        for _ in range(100):
+            if pipeline.rows_written == 2:
+                break
+            await asyncio.sleep(0.01)
+        pipeline.stop()
+        await task
+
+    asyncio.run(run())
+    df = pd.concat(written, ignore_index=True)
+    assert df["magnet"].tolist() == [0, 1]
+    assert (
+        df["hash"].tolist()
+        == add_hash_column(
+            pd.DataFrame(
+                {
+                    "time": [
+                        "2023-08-08 13:59:59.100000",
+                        "2023-08-08 13:59:59.763742",
+                    ],
+                    "magnet": ["0", "1"],
+                }
+            ),
+            columns=["time", "magnet"],
+        )["hash"].tolist()
+    )
@@ -0,0 +1,53 @@
+from spool import SampleSpool
+
+import pandas as pd
+import pytest
+
+
+def create_df(n: int, start: int = 0) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "hash": [f"h{i}" for i in range(start, start + n)],
+            "time": pd.date_range("2023-08-08 13:00:00", periods=n, freq="1s"),
+            "magnet": [i % 2 for i in range(n)],
+        }
+    )
+
+
+def test_spool_append_and_drain(tmp_path):
+    """Function to test SampleSpool.append() and SampleSpool.drain()"""
+    spool = SampleSpool(path=str(tmp_path / "spool.sqlite3"))
+    assert spool.append(create_df(5)) == 5
+    assert spool.append(create_df(3, start=5)) == 3
+    assert spool.depth() == 8
+    assert spool.oldest_age() >= 0
+
+    batches = []
+    assert spool.drain(write=batches.append, batch_size=3) == 8
+    assert [len(batch) for batch in batches] == [3, 3, 2]
+    assert pd.concat(batches)["hash"].tolist() == [f"h{i}" for i in range(8)]
+    assert batches[0]["time"].iloc[0] == "2023-08-08 13:00:00"
+    assert spool.depth() == 0
+    assert spool.metrics()["drained_rows"] == 8
+
+
+def test_spool_keeps_rows_on_failed_write(tmp_path):
+    """Function to test that a failed write leaves the rows in the spool"""
+    spool = SampleSpool(path=str(tmp_path / "spool.sqlite3"))
+    spool.append(create_df(4))
+
+    def write(df: pd.DataFrame) -> None:
+        raise ConnectionError("DB down")
+
+    with pytest.raises(ConnectionError):
+        spool.drain(write=write)
+    assert spool.depth() == 4
+
+
+def test_spool_is_durable(tmp_path):
+    """Function to test that spooled rows survive reopening the spool"""
+    path = str(tmp_path / "spool.sqlite3")
+    spool = SampleSpool(path=path)
+    spool.append(create_df(2))
+    spool.close()
+    assert SampleSpool(path=path).depth() == 2
@@ -0,0 +1,38 @@
+from synthetic_workload import format_lines, generate_samples, write_log_files
+from log_lines import parse_lines
+
+import numpy as np
+
+
+def test_generate_samples():
+    """Function to test generate_samples()"""
+    times, magnets = generate_samples(rate_hz=100, duration_s=60, rpm=30, seed=1)
+    assert len(times) == 6000
+    assert times.dtype == np.dtype("datetime64[us]")
+    assert magnets.dtype == np.uint8
+    assert np.all(np.diff(times) == np.timedelta64(10_000, "us"))
+    # About 30 turns per minute, one 1 -> 0 edge per turn
+    n_turns = np.sum(np.diff(magnets.astype(np.int8)) == -1)
+    assert 24 <= n_turns <= 36
+
+
+def test_format_lines_can_be_parsed():
+    """Function to test that the lines of format_lines() are valid log lines"""
+    times, magnets = generate_samples(rate_hz=10, duration_s=10, seed=1)
+    lines = format_lines(times, magnets)
+    assert lines[0] == "2023-08-08 13:00:00.000000 - 0\n"
+    parsed = parse_lines(lines)
+    assert parsed.rejected == 0
+    np.testing.assert_array_equal(parsed.times, times)
+    np.testing.assert_array_equal(parsed.magnets, magnets)
+
+
+def test_write_log_files(tmp_path):
+    """Function to test write_log_files()"""
+    file_names = write_log_files(
+        directory=str(tmp_path), rate_hz=10, duration_s=2, n_wheels=3
+    )
+    assert len(file_names) == 3
+    for file_name in file_names:
+        with open(file_name) as f:
+            assert len(f.readlines()) == 20
@@ -0,0 +1,239 @@
+from transform_closed_hamsterwheel import (
+    TransformService,
+    read_watermark,
+    transform,
+    transform_in_sql,
+    transform_incremental,
+    transform_turn_events,
+    write_watermark,
+)
+
+from rollups import get_turn_stats
+from sqlite_database import create_connection
+
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+
+def insert_raw(connection: sqlite3.Connection, magnets: list) -> None:
+    start = connection.execute("SELECT COUNT(*) FROM raw_hamsterwheel").fetchone()[0]
+    connection.executemany(
+        "INSERT INTO raw_hamsterwheel (hash, time, magnet) VALUES (?, ?, ?)",
+        [
+            (f"h{start + i}", f"2023-08-08 13:59:{start + i:02d}", magnet)
+            for i, magnet in enumerate(magnets)
+        ],
+    )
+    connection.commit()
+
+
+def test_watermark():
+    """Function to test read_watermark() and write_watermark()"""
+    connection = create_connection()
+    assert read_watermark(mysql_connection=connection, dialect="sqlite") == 0
+    write_watermark(cursor=connection.cursor(), last_id=5, dialect="sqlite")
+    write_watermark(cursor=connection.cursor(), last_id=7, dialect="sqlite")
+    assert read_watermark(mysql_connection=connection, dialect="sqlite") == 7
+    assert connection.execute("SELECT COUNT(*) FROM control").fetchone() == (1,)
+
+
+def test_transform_incremental():
+    """Function to test transform_incremental() only processes new raw rows"""
+    connection = create_connection()
+    insert_raw(connection, [1, 0, 0, 1, 0])
+    assert (
+        transform_incremental(
+            mysql_connection=connection, batch_size=2, dialect="sqlite"
+        )
+        == 5
+    )
+    assert read_watermark(mysql_connection=connection, dialect="sqlite") == 5
+    assert transform_incremental(mysql_connection=connection, dialect="sqlite") == 0
+
+    insert_raw(connection, [0, 1])
+    assert transform_incremental(mysql_connection=connection, dialect="sqlite") == 2
+    closed = connection.execute("SELECT hash FROM closed_hamsterwheel").fetchall()
+    assert sorted(row[0] for row in closed) == ["h1", "h2", "h4", "h5"]
+
+
+def test_transform_in_sql():
+    """Function to test transform_in_sql() gives the same rows as the pandas mode"""
+    connection = create_connection()
+    insert_raw(connection, [1, 0, 0, 1, 0])
+    assert (
+        transform_in_sql(mysql_connection=connection, batch_size=2, dialect="sqlite")
+        == 5
+    )
+    assert read_watermark(mysql_connection=connection, dialect="sqlite") == 5
+    insert_raw(connection, [0, 1])
+    assert transform_in_sql(mysql_connection=connection, dialect="sqlite") == 2
+    assert transform_in_sql(mysql_connection=connection, dialect="sqlite") == 0
+    closed = connection.execute("SELECT hash FROM closed_hamsterwheel").fetchall()
+    assert sorted(row[0] for row in closed) == ["h1", "h2", "h4", "h5"]
+
+
+def test_transform_falls_back_to_pandas():
+    """Function to test transform() runs the pandas mode when the SQL mode fails"""
+    connection = create_connection()
+    insert_raw(connection, [0, 1])
+    connection.execute("ALTER TABLE closed_hamsterwheel RENAME COLUMN id TO row_id")
+    assert transform(mysql_connection=connection, dialect="sqlite") == 2
+    closed = connection.execute("SELECT hash FROM closed_hamsterwheel").fetchall()
+    assert closed == [("h0",)]
+
+
+def test_transform_turn_events():
+    """Function to test transform_turn_events() stores one event per turn over runs"""
+    connection = create_connection()
+    insert_raw(connection, [1, 0, 0, 1, 0])
+    assert (
+        transform_turn_events(
+            mysql_connection=connection, batch_size=2, dialect="sqlite"
+        )
+        == 1
+    )
+    insert_raw(connection, [0, 1, 0, 1])
+    assert transform_turn_events(mysql_connection=connection, dialect="sqlite") == 2
+    assert transform_turn_events(mysql_connection=connection, dialect="sqlite") == 0
+    events = connection.execute(
+        "SELECT start_time, duration, rpm FROM turn_event ORDER BY id"
+    ).fetchall()
+    assert events == [
+        ("2023-08-08 13:59:01.000000", 2.0, None),
+        ("2023-08-08 13:59:04.000000", 2.0, 20.0),
+        ("2023-08-08 13:59:07.000000", 1.0, 20.0),
+    ]
+    assert connection.execute(
+        "SELECT wheel, bucket_start, turns, active_seconds, max_rpm FROM turn_rollup_minute"
+    ).fetchall() == [(0, "2023-08-08 13:59:00", 3, 3, 20.0)]
+
+
+def test_transform_turn_events_late_rows():
+    """Function to test transform_turn_events() with rows committed late or out of time order"""
+    connection = create_connection()
+
+    def insert(rows: list) -> None:
+        connection.executemany(
+            "INSERT INTO raw_hamsterwheel (id, hash, time, magnet) VALUES (?, ?, ?, ?)",
+            [
+                (i, f"h{i}", f"2023-08-08 13:59:{time}.{us:06d}", m)
+                for i, time, us, m in rows
+            ],
+        )
+        connection.commit()
+
+    insert([(i + 1, f"{i:02d}", 0, m) for i, m in enumerate([1, 0, 0, 1, 0])])
+    assert transform_turn_events(mysql_connection=connection, dialect="sqlite") == 1
+    # A row with a higher id but an older time, e.g. drained from the spool
+    insert([(7, "06", 0, 1), (8, "02", 500_000, 1)])
+    assert transform_turn_events(mysql_connection=connection, dialect="sqlite") == 1
+    # A row with a lower id than the watermark, committed late
+    insert([(6, "07", 0, 0), (9, "08", 0, 1)])
+    assert transform_turn_events(mysql_connection=connection, dialect="sqlite") == 1
+    events = connection.execute(
+        "SELECT start_time, duration, rpm FROM turn_event ORDER BY start_time"
+    ).fetchall()
+    # The late open sample at 13:59:02.5 shortens the first turn
+    assert events == [
+        ("2023-08-08 13:59:01.000000", 1.5, None),
+        ("2023-08-08 13:59:04.000000", 2.0, 20.0),
+        ("2023-08-08 13:59:07.000000", 1.0, 20.0),
+    ]
+
+
+def test_transform_turn_events_outage():
+    """Function to test transform_turn_events() stores the turns of rows drained after an outage with higher ids but older times"""
+    magnets = np.random.default_rng(0).choice([0, 1], p=[0.4, 0.6], size=120)
+    rows = [
+        (f"h{i}", f"2023-08-08 13:5{8 + i // 60}:{i % 60:02d}.000000", int(magnet))
+        for i, magnet in enumerate(magnets)
+    ]
+
+    def insert(connection: sqlite3.Connection, rows: list) -> None:
+        connection.executemany(
+            "INSERT INTO raw_hamsterwheel (hash, time, magnet) VALUES (?, ?, ?)", rows
+        )
+        connection.commit()
+
+    def read_tables(connection: sqlite3.Connection) -> list:
+        return [
+            connection.execute(f"SELECT * FROM {table} ORDER BY 2").fetchall()
+            for table in ["turn_event", "turn_rollup_second", "turn_rollup_minute"]
+        ]
+
+    expected = create_connection()
+    insert(expected, rows)
+    transform_turn_events(mysql_connection=expected, dialect="sqlite")
+    expected = read_tables(expected)
+    # A plain outage, one within a turn that is stored and one within a turn
+    # that is still closed
+    for outage_start, outage_end in [(30, 90), (32, 89), (32, 119)]:
+        connection = create_connection()
+        # Live rows before and after the outage, then the spooled ones
+        insert(connection, rows[:outage_start])
+        transform_turn_events(mysql_connection=connection, dialect="sqlite")
+        insert(connection, rows[outage_end:])
+        transform_turn_events(mysql_connection=connection, dialect="sqlite")
+        insert(connection, rows[outage_start:outage_end])
+        transform_turn_events(
+            mysql_connection=connection, batch_size=20, dialect="sqlite"
+        )
+        actual = read_tables(connection)
+        # The ids of the events differ
+        assert [row[1:] for row in actual[0]] == [row[1:] for row in expected[0]]
+        assert actual[1:] == expected[1:]
+        stats = get_turn_stats(
+            connection,
+            start=datetime(2023, 8, 8, 13, 58),
+            end=datetime(2023, 8, 8, 14, 0),
+            dialect="sqlite",
+        )
+        assert stats.turns == len(expected[0])
+
+
+class FakeConnectionManager:
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+        self.closed = 0
+
+    def get_connection(self) -> sqlite3.Connection:
+        return self.connection
+
+    def close(self) -> None:
+        self.closed += 1
+
+
+def test_transform_service():
+    """Function to test TransformService.run_once() transforms new rows and measures the freshness lag"""
+    connection = create_connection()
+    service = TransformService(
+        connection_manager=FakeConnectionManager(connection),
+        now=lambda: datetime(2023, 8, 8, 14, 0, 0),
+        dialect="sqlite",
+    )
+    insert_raw(connection, [1, 0, 0, 1])
+    service.run_once()
+    insert_raw(connection, [0, 1])
+    service.run_once()
+    assert connection.execute("SELECT COUNT(*) FROM turn_event").fetchone() == (2,)
+    metrics = service.metrics()
+    assert metrics["batches"] == 2
+    assert metrics["failed_batches"] == 0
+    # The last sample is from 13:59:05
+    assert metrics["freshness_lag_seconds"] == 55.0
+    assert metrics["max_freshness_lag_seconds"] == 57.0
+
+
+def test_transform_service_drops_detector_on_error():
+    """Function to test TransformService.run_once() reloads the detector state after an error"""
+    connection = create_connection()
+    manager = FakeConnectionManager(connection)
+    service = TransformService(connection_manager=manager, dialect="sqlite")
+    insert_raw(connection, [1, 0, 1])
+    connection.execute("DROP TABLE turn_event")
+    service.run_once()
+    assert service.detector is None
+    assert service.metrics()["failed_batches"] == 1
+    assert manager.closed == 1
@@ -0,0 +1,65 @@
+from turn_events import TurnDetector, falling_edges
+
+import numpy as np
+
+START = np.datetime64("2023-08-08T13:00:00", "us")
+TIMES = START + np.arange(10) * np.timedelta64(1, "s")
+MAGNETS = np.array([1, 0, 0, 1, 1, 0, 1, 0, 0, 1], dtype=np.uint8)
+
+
+def test_falling_edges():
+    """Function to test falling_edges()"""
+    assert falling_edges(MAGNETS).tolist() == [1, 5, 7]
+    assert falling_edges(np.array([0, 0, 1, 0])).tolist() == [0, 3]
+    assert falling_edges(np.array([0, 0, 1, 0]), previous_magnet=0).tolist() == [3]
+
+
+def test_turn_detector():
+    """Function to test TurnDetector.process() on one batch"""
+    events = TurnDetector().process(TIMES, MAGNETS)
+    assert events.start_times.tolist() == TIMES[[1, 5, 7]].tolist()
+    assert events.durations.tolist() == [2.0, 1.0, 2.0]
+    assert np.isnan(events.rpms[0])
+    assert events.rpms[1:].tolist() == [15.0, 30.0]
+
+
+def test_turn_detector_batches():
+    """Function to test TurnDetector gives the same turns over batches and a state round trip"""
+    expected = TurnDetector().process(TIMES, MAGNETS)
+    detector = TurnDetector()
+    start_times, durations = [], []
+    for i in range(0, len(TIMES), 3):
+        events = detector.process(TIMES[i : i + 3], MAGNETS[i : i + 3])
+        start_times += events.start_times.tolist()
+        durations += events.durations.tolist()
+        detector = TurnDetector.from_state(detector.to_state())
+    assert start_times == expected.start_times.tolist()
+    assert durations == expected.durations.tolist()
+
+
+def test_turn_detector_out_of_order():
+    """Function to test TurnDetector sorts a batch and drops samples older than an earlier batch"""
+    expected = TurnDetector().process(TIMES, MAGNETS)
+    detector = TurnDetector()
+    order = np.random.default_rng(0).permutation(6)
+    events = detector.process(TIMES[:6][order], MAGNETS[:6][order])
+    start_times = events.start_times.tolist()
+    # The first batch again and a late sample are dropped
+    late = np.array([TIMES[2]])
+    events = detector.process(
+        np.concatenate([TIMES[:6], late, TIMES[6:]]),
+        np.concatenate([MAGNETS[:6], [1], MAGNETS[6:]]),
+    )
+    start_times += events.start_times.tolist()
+    assert start_times == expected.start_times.tolist()
+    assert np.all(events.rpms > 0)
+    assert detector.dropped == 7
+    # The time of the last sample is kept in the state
+    assert TurnDetector.from_state(detector.to_state()).last_time == TIMES[-1]
+
+
+def test_turn_events_to_df():
+    """Function to test TurnEvents.to_df()"""
+    df = TurnDetector().process(TIMES, MAGNETS).to_df()
+    assert df["start_time"].tolist()[0] == "2023-08-08 13:00:01.000000"
+    assert df["rpm"].tolist() == [None, 15.0, 30.0]
@@ -0,0 +1,180 @@
+from window_store import WindowStore
+from repository import InMemoryRepository
+from turn_events import falling_edges
+
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+
+def create_samples(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    times = np.datetime64("2023-08-03T12:00:00") + np.arange(n) * np.timedelta64(
+        100, "ms"
+    )
+    magnets = (rng.random(n) < 0.6).astype(np.uint8)
+    return times, magnets
+
+
+def count_turns(times, magnets, start_time, end_time) -> int:
+    edges = falling_edges(magnets)
+    edge_times = times[edges]
+    return int(
+        np.sum(
+            (edge_times >= np.datetime64(start_time))
+            & (edge_times <= np.datetime64(end_time))
+        )
+    )
+
+
+def test_turns_between():
+    times, magnets = create_samples(1000)
+    window_store = WindowStore(capacity=1000)
+    # Appended in batches, the turns at the batch borders are counted once
+    for start in range(0, 1000, 7):
+        window_store.append(times[start : start + 7], magnets[start : start + 7])
+    assert len(window_store) == 1000
+    for start_time, end_time in [
+        ("2023-08-03T12:00:00", "2023-08-03T12:01:40"),
+        ("2023-08-03T12:00:10.05", "2023-08-03T12:00:30"),
+        ("2023-08-03T12:00:30", "2023-08-03T12:00:30"),
+        ("2023-08-03T11:00:00", "2023-08-03T11:59:00"),
+    ]:
+        assert window_store.turns_between(start_time, end_time) == count_turns(
+            times, magnets, start_time, end_time
+        )
+
+
+def test_turns_between_after_compaction():
+    times, magnets = create_samples(2500)
+    window_store = WindowStore(capacity=1000)
+    for start in range(0, 2500, 300):
+        window_store.append(times[start : start + 300], magnets[start : start + 300])
+    # At least the latest capacity samples are kept
+    assert 1000 <= len(window_store) <= 2000
+    assert window_store.last_time == times[-1]
+    start_time = window_store.first_time
+    assert window_store.covers(start_time)
+    assert not window_store.covers(times[0])
+    assert window_store.turns_between(start_time, times[-1]) == count_turns(
+        times, magnets, start_time, times[-1]
+    )
+
+
+def test_append_more_than_capacity():
+    times, magnets = create_samples(2500)
+    window_store = WindowStore(capacity=1000)
+    window_store.append(times, magnets)
+    start_time = window_store.first_time
+    assert window_store.turns_between(start_time, times[-1]) == count_turns(
+        times, magnets, start_time, times[-1]
+    )
+
+
+def test_append_out_of_order():
+    times, magnets = create_samples(1000)
+    window_store = WindowStore(capacity=1000)
+    # Batches in shuffled order, and shuffled within a batch
+    rng = np.random.default_rng(1)
+    for start in rng.permutation(np.arange(0, 1000, 50)):
+        order = rng.permutation(50)
+        window_store.append(
+            times[start : start + 50][order], magnets[start : start + 50][order]
+        )
+    assert len(window_store) == 1000
+    assert np.all(window_store.times[:1000] == times)
+    for start_time, end_time in [
+        (times[0], times[-1]),
+        (times[123], times[456]),
+    ]:
+        assert window_store.turns_between(start_time, end_time) == count_turns(
+            times, magnets, start_time, end_time
+        )
+        assert window_store.closed_between(start_time, end_time) == int(
+            np.sum((magnets == 0) & (times >= start_time) & (times <= end_time))
+        )
+
+
+def test_append_older_than_window():
+    times, magnets = create_samples(400)
+    late = np.array([10, 350])
+    on_time = np.setdiff1d(np.arange(400), late)
+    window_store = WindowStore(capacity=100)
+    window_store.append(times[on_time], magnets[on_time])
+    first_time = window_store.first_time
+    assert first_time > times[10]
+    # The sample older than the window is dropped, the one in it merged
+    window_store.append(times[late], magnets[late])
+    assert window_store.late_dropped == 1
+    assert window_store.first_time == first_time
+    assert window_store.turns_between(first_time, times[-1]) == count_turns(
+        times, magnets, first_time, times[-1]
+    )
+
+
+def test_is_running():
+    window_store = WindowStore(capacity=100)
+    times = np.array(
+        ["2023-08-03T12:00:00", "2023-08-03T12:00:03", "2023-08-03T12:00:06"],
+        dtype="datetime64[ns]",
+    )
+    window_store.append(times, np.array([0, 1, 1]))
+    assert window_store.is_running(now=datetime(2023, 8, 3, 12, 0, 4))
+    # Like the repository query, the sample 5 seconds ago is not in the window
+    assert not window_store.is_running(now=datetime(2023, 8, 3, 12, 0, 5))
+    assert not window_store.is_running(now=datetime(2023, 8, 3, 12, 0, 9))
+
+
+def test_sync():
+    df_raw_hamsterwheel = pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4],
+            "time": [
+                "2023-08-03 12:00:00",
+                "2023-08-03 12:00:03",
+                "2023-08-03 12:00:06",
+                "2023-08-03 12:00:09",
+            ],
+            "magnet": [1, 0, 1, 0],
+        }
+    )
+    repository = InMemoryRepository(
+        df_raw_hamsterwheel=df_raw_hamsterwheel.iloc[:3],
+        df_decision=pd.DataFrame(),
+        df_wallet=pd.DataFrame(),
+        df_price=pd.DataFrame(),
+    )
+    window_store = WindowStore(capacity=100)
+    window_store.sync(repository)
+    assert window_store.last_id == 3
+    repository.df_raw_hamsterwheel = df_raw_hamsterwheel
+    repository.start_tick()
+    window_store.sync(repository)
+    assert len(window_store) == 4
+    assert window_store.turns_between("2023-08-03 12:00:00", "2023-08-03 12:00:09") == 2
+    # A row drained from the logger's spool: a higher id but an older time
+    repository.df_raw_hamsterwheel = pd.concat(
+        [
+            df_raw_hamsterwheel,
+            pd.DataFrame({"id": [5], "time": ["2023-08-03 12:00:07"], "magnet": [1]}),
+        ],
+        ignore_index=True,
+    )
+    repository.start_tick()
+    window_store.sync(repository)
+    assert window_store.last_id == 5
+    assert len(window_store) == 5
+    assert window_store.turns_between("2023-08-03 12:00:00", "2023-08-03 12:00:09") == 2
+
+
+def test_running_until():
+    window_store = WindowStore(capacity=100)
+    assert window_store.running_until() is None
+    times = np.array(
+        ["2023-08-03T12:00:00", "2023-08-03T12:00:03", "2023-08-03T12:00:06"],
+        dtype="datetime64[ns]",
+    )
+    window_store.append(times[:1], np.array([1]))
+    assert window_store.running_until() is None
+    window_store.append(times[1:], np.array([0, 1]))
+    assert window_store.running_until() == pd.Timestamp("2023-08-03 12:00:08")
@@ -1,11 +1,25 @@
 """
-In this script the raw_hamsterwheel table is transformed into the closed_hamsterwheel table.
+In this script the raw_hamsterwheel table is transformed into turn events (and the
+closed_hamsterwheel table if STORE_CLOSED_SAMPLES is set).
+
+It runs once, e.g. from cron, or with --service as a resident service that runs
+a micro-batch every --interval seconds.
 """
 
+import numpy as np
 import pymysql
 import pandas as pd
 import logging
-from logger import remove_rows
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+from bulk_insert import INSERT_IGNORE, PLACEHOLDERS, BulkInsertResult, bulk_insert
+from constants import table_closed_hamsterwheel, table_control, table_turn_event
+from db_connection import ConnectionManager
+from retention import run_retention
+from rollups import EVENT_TIME_FORMAT, update_rollups
+from turn_events import NO_TIME, TurnDetector, TurnEvents
 
 logging.basicConfig(
     filename=f"/home/done4/log_logger.log",
@@ -19,6 +33,23 @@ logging.info("Running Logger")
 
 logger = logging.getLogger()
 
+# Variable in the control table with the id of the last transformed raw row
+WATERMARK_VARIABLE = "closed_hamsterwheel_watermark"
+# Number of ids before the watermark that are read again on every run
+WATERMARK_LOOKBACK = 100
+BATCH_SIZE = 10_000
+# "sql" runs the transform as INSERT ... SELECT in the database, "pandas"
+# reads the rows and filters them in python
+TRANSFORM_MODE = "sql"
+# Turn events replace the closed samples, set to also keep every closed sample
+STORE_CLOSED_SAMPLES = False
+TURN_EVENT_WATERMARK_VARIABLE = "turn_event_watermark"
+TURN_EVENT_STATE_VARIABLE = "turn_event_detector_state"
+# Service mode: seconds between micro-batches, retention runs and metric reports
+SERVICE_INTERVAL = 0.5
+RETENTION_INTERVAL = 60.0
+REPORT_INTERVAL = 60.0
+
 
 def read_last_mins_from_table(
     mysql_connection: pymysql.connections.Connection, table: str, minutes: int
@@ -38,75 +69,632 @@ def filter_on_closed(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def update_closed_hamsterwheel(
-    cursor: pymysql.cursors.Cursor,
     mysql_connection: pymysql.connections.Connection,
     df: pd.DataFrame,
+    commit: bool = True,
+    dialect: str = "mysql",
+) -> BulkInsertResult:
+    result = bulk_insert(
+        connection=mysql_connection,
+        table=table_closed_hamsterwheel.table_name,
+        df=df,
+        columns=list(table_closed_hamsterwheel.columns),
+        dialect=dialect,
+        ignore_duplicates=True,
+        commit=commit,
+    )
+    logger.info(
+        f"Inserted {result.rows} rows into closed_hamsterwheel ({result.rows_per_second:.0f} rows/s)."
+    )
+    return result
+
+
+def read_control(
+    mysql_connection: pymysql.connections.Connection,
+    variable: str,
+    dialect: str = "mysql",
+) -> Optional[str]:
+    """Read the state of variable from the control table, None if it is not set."""
+    qry = f"SELECT state FROM {table_control.table_name} WHERE variable = {PLACEHOLDERS[dialect]}"
+    cursor = mysql_connection.cursor()
+    cursor.execute(qry, (variable,))
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None:
+        return None
+    return row[0]
+
+
+def write_control(
+    cursor: pymysql.cursors.Cursor, variable: str, state: str, dialect: str = "mysql"
 ) -> None:
-    for index, row in df.iterrows():
-        time = row["time"]
-        magnet = row["magnet"]
-        hash = row["hash"]
-        query = f"INSERT INTO closed_hamsterwheel (hash, time, magnet) VALUES ('{hash}', '{time}', {magnet})"
-        cursor.execute(query)
-        mysql_connection.commit()
+    """Save the state of variable in the control table, without commit."""
+    placeholder = PLACEHOLDERS[dialect]
+    cursor.execute(
+        f"UPDATE {table_control.table_name} SET state = {placeholder} WHERE variable = {placeholder}",
+        (state, variable),
+    )
+    if cursor.rowcount == 0:
+        cursor.execute(
+            f"INSERT INTO {table_control.table_name} (variable, state) VALUES ({placeholder}, {placeholder})",
+            (variable, state),
+        )
 
 
-def delete_rows_raw_hamsterwheel(
+def read_watermark(
+    mysql_connection: pymysql.connections.Connection,
+    dialect: str = "mysql",
+    variable: str = WATERMARK_VARIABLE,
+) -> int:
+    """Read the id of the last raw_hamsterwheel row that was transformed."""
+    state = read_control(
+        mysql_connection=mysql_connection, variable=variable, dialect=dialect
+    )
+    if state is None:
+        return 0
+    return int(state)
+
+
+def write_watermark(
     cursor: pymysql.cursors.Cursor,
-    minutes: int,
+    last_id: int,
+    dialect: str = "mysql",
+    variable: str = WATERMARK_VARIABLE,
 ) -> None:
-    query = (
-        f"DELETE FROM raw_hamsterwheel WHERE time < NOW() - INTERVAL {minutes} MINUTE;"
+    """Save the id of the last transformed raw_hamsterwheel row, without commit."""
+    write_control(cursor=cursor, variable=variable, state=str(last_id), dialect=dialect)
+
+
+def read_raw_after_id(
+    mysql_connection: pymysql.connections.Connection,
+    last_id: int,
+    limit: int,
+    dialect: str = "mysql",
+) -> pd.DataFrame:
+    """Read at most limit rows of raw_hamsterwheel with an id above last_id."""
+    placeholder = PLACEHOLDERS[dialect]
+    qry = (
+        f"SELECT id, hash, time, magnet FROM raw_hamsterwheel "
+        f"WHERE id > {placeholder} ORDER BY id LIMIT {placeholder}"
+    )
+    df = pd.read_sql(
+        sql=qry, con=mysql_connection, index_col="id", params=(last_id, limit)
     )
-    cursor.execute(query)
+    df["time"] = df["time"].astype(str)
+    return df
 
 
-if __name__ == "__main__":
+def transform_incremental(
+    mysql_connection: pymysql.connections.Connection,
+    batch_size: int = BATCH_SIZE,
+    dialect: str = "mysql",
+) -> int:
+    """Copy the closed samples of raw_hamsterwheel rows above the watermark to
+    closed_hamsterwheel, return the number of raw rows processed.
+
+    The inserts and the new watermark of every batch are committed together.
+    """
+    processed = 0
+    while True:
+        last_id = read_watermark(mysql_connection=mysql_connection, dialect=dialect)
+        # Rows committed late with a lower id are picked up by the lookback,
+        # rows already in closed_hamsterwheel are ignored by the unique hash
+        df_raw = read_raw_after_id(
+            mysql_connection=mysql_connection,
+            last_id=max(last_id - WATERMARK_LOOKBACK, 0),
+            limit=batch_size + WATERMARK_LOOKBACK,
+            dialect=dialect,
+        )
+        new_last_id = int(df_raw.index.max()) if len(df_raw) > 0 else last_id
+        if new_last_id <= last_id:
+            return processed
+        update_closed_hamsterwheel(
+            mysql_connection=mysql_connection,
+            df=filter_on_closed(df=df_raw),
+            commit=False,
+            dialect=dialect,
+        )
+        cursor = mysql_connection.cursor()
+        write_watermark(cursor=cursor, last_id=new_last_id, dialect=dialect)
+        cursor.close()
+        mysql_connection.commit()
+        processed += int((df_raw.index > last_id).sum())
+
+
+def get_next_batch(
+    mysql_connection: pymysql.connections.Connection,
+    last_id: int,
+    limit: int,
+    dialect: str = "mysql",
+) -> Tuple[int, int]:
+    """Return the last id and the number of rows of the next batch of at most
+    limit raw_hamsterwheel rows above last_id."""
+    placeholder = PLACEHOLDERS[dialect]
+    qry = (
+        f"SELECT MAX(id), COUNT(*) FROM (SELECT id FROM raw_hamsterwheel "
+        f"WHERE id > {placeholder} ORDER BY id LIMIT {placeholder}) AS batch"
+    )
+    cursor = mysql_connection.cursor()
+    cursor.execute(qry, (last_id, limit))
+    end_id, n_rows = cursor.fetchone()
+    cursor.close()
+    if n_rows == 0:
+        return last_id, 0
+    return int(end_id), int(n_rows)
+
+
+def transform_in_sql(
+    mysql_connection: pymysql.connections.Connection,
+    batch_size: int = BATCH_SIZE,
+    dialect: str = "mysql",
+) -> int:
+    """Like transform_incremental(), but filter, anti-join and insert in one
+    INSERT ... SELECT per batch, so no rows are sent to python."""
+    placeholder = PLACEHOLDERS[dialect]
+    columns = ", ".join(table_closed_hamsterwheel.columns)
+    raw_columns = ", ".join(
+        f"raw.{column}" for column in table_closed_hamsterwheel.columns
+    )
+    qry = (
+        f"{INSERT_IGNORE[dialect]} {table_closed_hamsterwheel.table_name} ({columns}) "
+        f"SELECT {raw_columns} FROM raw_hamsterwheel AS raw "
+        f"LEFT JOIN {table_closed_hamsterwheel.table_name} AS closed ON closed.hash = raw.hash "
+        f"WHERE raw.id > {placeholder} AND raw.id <= {placeholder} "
+        f"AND raw.magnet = 0 AND closed.id IS NULL"
+    )
+    processed = 0
+    while True:
+        last_id = read_watermark(mysql_connection=mysql_connection, dialect=dialect)
+        end_id, n_rows = get_next_batch(
+            mysql_connection=mysql_connection,
+            last_id=last_id,
+            limit=batch_size,
+            dialect=dialect,
+        )
+        if n_rows == 0:
+            return processed
+        cursor = mysql_connection.cursor()
+        # Rows committed late with a lower id are picked up by the lookback
+        cursor.execute(qry, (max(last_id - WATERMARK_LOOKBACK, 0), end_id))
+        logger.info(f"Inserted {cursor.rowcount} rows into closed_hamsterwheel.")
+        write_watermark(cursor=cursor, last_id=end_id, dialect=dialect)
+        cursor.close()
+        mysql_connection.commit()
+        processed += n_rows
+
+
+def transform(
+    mysql_connection: pymysql.connections.Connection,
+    mode: str = TRANSFORM_MODE,
+    batch_size: int = BATCH_SIZE,
+    dialect: str = "mysql",
+) -> int:
+    """Run the incremental transform in mode "sql" or "pandas".
+
+    When the "sql" mode fails, its batch is rolled back and the "pandas"
+    mode is run instead.
+    """
+    if mode == "pandas":
+        return transform_incremental(
+            mysql_connection=mysql_connection, batch_size=batch_size, dialect=dialect
+        )
+    if mode != "sql":
+        raise ValueError(f"Unknown transform mode: {mode}")
     try:
-        mysql_connection = pymysql.connect(
-            host="192.168.1.121",
-            user="tiberius",
-            password="q123",
-            db="cryptohamster",
-            port=3306,
-            charset="utf8",
+        return transform_in_sql(
+            mysql_connection=mysql_connection, batch_size=batch_size, dialect=dialect
         )
-        # Read everything from closed_hamsterwheel from last 30 min
-        df_closed_hamsterwheel = read_last_mins_from_table(
-            mysql_connection=mysql_connection, table="closed_hamsterwheel", minutes=30
+    except Exception as e:
+        logger.error(f"Error in SQL transform, falling back to pandas: {e}")
+        mysql_connection.rollback()
+        return transform_incremental(
+            mysql_connection=mysql_connection, batch_size=batch_size, dialect=dialect
         )
-        logger.info(
-            f"Read {len(df_closed_hamsterwheel)} rows from closed_hamsterwheel."
+
+
+def update_turn_event(
+    mysql_connection: pymysql.connections.Connection,
+    events: TurnEvents,
+    commit: bool = True,
+    dialect: str = "mysql",
+) -> BulkInsertResult:
+    return bulk_insert(
+        connection=mysql_connection,
+        table=table_turn_event.table_name,
+        df=events.to_df(),
+        columns=list(table_turn_event.columns),
+        dialect=dialect,
+        ignore_duplicates=True,
+        commit=commit,
+    )
+
+
+def format_event_time(time: np.datetime64) -> str:
+    return pd.Timestamp(time).strftime(EVENT_TIME_FORMAT)
+
+
+def read_raw_in_time_range(
+    mysql_connection: pymysql.connections.Connection,
+    start: np.datetime64,
+    end: np.datetime64,
+    dialect: str = "mysql",
+) -> pd.DataFrame:
+    """Read the raw_hamsterwheel rows with start <= time <= end."""
+    placeholder = PLACEHOLDERS[dialect]
+    qry = (
+        f"SELECT id, time, magnet FROM raw_hamsterwheel "
+        f"WHERE time >= {placeholder} AND time <= {placeholder}"
+    )
+    df = pd.read_sql(
+        sql=qry,
+        con=mysql_connection,
+        index_col="id",
+        params=(format_event_time(start), format_event_time(end)),
+    )
+    df["time"] = df["time"].astype(str)
+    return df
+
+
+def read_turn_before(
+    mysql_connection: pymysql.connections.Connection,
+    time: np.datetime64,
+    dialect: str = "mysql",
+) -> Optional[Tuple[np.datetime64, np.datetime64]]:
+    """Return the start and the end (the opening of the magnet) of the last
+    turn event that started before time, None if there is none."""
+    qry = (
+        f"SELECT start_time, duration FROM {table_turn_event.table_name} "
+        f"WHERE start_time < {PLACEHOLDERS[dialect]} ORDER BY start_time DESC LIMIT 1"
+    )
+    cursor = mysql_connection.cursor()
+    cursor.execute(qry, (format_event_time(time),))
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None:
+        return None
+    start = np.datetime64(pd.Timestamp(row[0]), "us")
+    return start, start + np.timedelta64(round(float(row[1]) * 1e6), "us")
+
+
+def redetect_turn_events(
+    mysql_connection: pymysql.connections.Connection,
+    detector: TurnDetector,
+    start: np.datetime64,
+    dialect: str = "mysql",
+) -> int:
+    """Detect the turns again from start, the time of the oldest late raw row,
+    to the last sample of the detector, and replace their turn events and
+    rollups. Return the number of turns detected again.
+
+    Late rows, e.g. drained from the spool after an outage, have older times
+    than rows the detector processed already. The edges around them are
+    found again from all raw rows of the range, starting from the turn events
+    before it, and the detector takes over the state at its last sample.
+    Committing is left to the caller.
+    """
+    end = detector.last_time
+    redo = TurnDetector()
+    turn = read_turn_before(
+        mysql_connection=mysql_connection, time=start, dialect=dialect
+    )
+    replace_start = start
+    if not np.isnat(detector.pending_start) and detector.pending_start < start:
+        # The late rows fall in the turn that is still closed
+        replace_start = detector.pending_start
+        redo.previous_magnet = 0
+        redo.pending_start = detector.pending_start
+        redo.last_start = detector.last_start
+    elif turn is not None and turn[1] >= start:
+        # The late rows fall in a stored turn, whose duration may change
+        replace_start = turn[0]
+        redo.previous_magnet = 0
+        redo.pending_start = turn[0]
+        before = read_turn_before(
+            mysql_connection=mysql_connection, time=turn[0], dialect=dialect
         )
-        # Read everything from raw_hamsterwheel from last 2 min
-        df_raw_hamsterwheel = read_last_mins_from_table(
-            mysql_connection=mysql_connection, table="raw_hamsterwheel", minutes=10
+        redo.last_start = before[0] if before is not None else NO_TIME
+    elif turn is not None:
+        redo.last_start = turn[0]
+    df_raw = read_raw_in_time_range(
+        mysql_connection=mysql_connection, start=start, end=end, dialect=dialect
+    )
+    events = redo.process(
+        times=pd.to_datetime(df_raw["time"]).to_numpy(dtype="datetime64[us]"),
+        magnets=df_raw["magnet"].to_numpy(),
+    )
+    placeholder = PLACEHOLDERS[dialect]
+    cursor = mysql_connection.cursor()
+    cursor.execute(
+        f"DELETE FROM {table_turn_event.table_name} "
+        f"WHERE start_time >= {placeholder} AND start_time <= {placeholder}",
+        (format_event_time(replace_start), format_event_time(end)),
+    )
+    cursor.close()
+    update_turn_event(
+        mysql_connection=mysql_connection,
+        events=events,
+        commit=False,
+        dialect=dialect,
+    )
+    update_rollups(
+        mysql_connection=mysql_connection,
+        start=pd.Timestamp(replace_start).to_pydatetime(),
+        end=pd.Timestamp(end).to_pydatetime(),
+        dialect=dialect,
+        replace=True,
+    )
+    detector.previous_magnet = redo.previous_magnet
+    detector.pending_start = redo.pending_start
+    detector.last_start = redo.last_start
+    return len(events.start_times)
+
+
+def transform_turn_events(
+    mysql_connection: pymysql.connections.Connection,
+    batch_size: int = BATCH_SIZE,
+    dialect: str = "mysql",
+    detector: Optional[TurnDetector] = None,
+) -> int:
+    """Detect the turns in the raw_hamsterwheel rows above the turn event
+    watermark and store them in turn_event, return the number of turns.
+
+    The edge detector state is kept in the control table and committed
+    together with the events, their rollups and the watermark of every batch. A detector
+    that is kept between calls saves reading the state, it has to be
+    dropped when a call fails.
+    """
+    n_turns = 0
+    while True:
+        last_id = read_watermark(
+            mysql_connection=mysql_connection,
+            dialect=dialect,
+            variable=TURN_EVENT_WATERMARK_VARIABLE,
         )
-        # Filter on closed
-        df_raw_hamsterwheel = filter_on_closed(df=df_raw_hamsterwheel)
-        logger.info(f"Read {len(df_raw_hamsterwheel)} rows from raw_hamsterwheel.")
-        # Remove rows from raw_hamsterwheel that are already in closed_hamsterwheel
-        df_raw_hamsterwheel = remove_rows(
-            df_1=df_raw_hamsterwheel,
-            df_2=df_closed_hamsterwheel,
-            compare_col="hash",
+        # Like transform_incremental, rows committed late with a lower id are
+        # picked up by the lookback. The detector drops the rows it processed
+        # already, new rows older than its last sample are detected again.
+        df_raw = read_raw_after_id(
+            mysql_connection=mysql_connection,
+            last_id=max(last_id - WATERMARK_LOOKBACK, 0),
+            limit=batch_size + WATERMARK_LOOKBACK,
+            dialect=dialect,
         )
-        # Update closed_hamsterwheel
-        update_closed_hamsterwheel(
-            cursor=mysql_connection.cursor(),
+        new_last_id = int(df_raw.index.max()) if len(df_raw) > 0 else last_id
+        if new_last_id <= last_id:
+            return n_turns
+        if detector is None:
+            detector = TurnDetector.from_state(
+                read_control(
+                    mysql_connection=mysql_connection,
+                    variable=TURN_EVENT_STATE_VARIABLE,
+                    dialect=dialect,
+                )
+            )
+        times = pd.to_datetime(df_raw["time"]).to_numpy(dtype="datetime64[us]")
+        is_new = df_raw.index.to_numpy() > last_id
+        if np.isnat(detector.last_time):
+            # Without the time of the last sample (a new or an older state)
+            # the rows up to the watermark cannot be told apart
+            times, magnets = times[is_new], df_raw["magnet"].to_numpy()[is_new]
+        else:
+            magnets = df_raw["magnet"].to_numpy()
+            is_late = is_new & (times <= detector.last_time)
+            if np.any(is_late):
+                n_redetected = redetect_turn_events(
+                    mysql_connection=mysql_connection,
+                    detector=detector,
+                    start=times[is_late].min(),
+                    dialect=dialect,
+                )
+                logger.info(
+                    f"Detected {n_redetected} turns again for "
+                    f"{np.count_nonzero(is_late)} late raw rows."
+                )
+        events = detector.process(times=times, magnets=magnets)
+        update_turn_event(
             mysql_connection=mysql_connection,
-            df=df_raw_hamsterwheel,
+            events=events,
+            commit=False,
+            dialect=dialect,
         )
-        logger.info(
-            f"Closed hamsterwheel updated, added {len(df_raw_hamsterwheel)} rows."
+        if len(events.start_times) > 0:
+            update_rollups(
+                mysql_connection=mysql_connection,
+                start=events.start_times[0].astype(datetime),
+                end=events.start_times[-1].astype(datetime),
+                dialect=dialect,
+            )
+        cursor = mysql_connection.cursor()
+        write_control(
+            cursor=cursor,
+            variable=TURN_EVENT_STATE_VARIABLE,
+            state=detector.to_state(),
+            dialect=dialect,
         )
-        # Delete rows from raw_hamsterwheel
-        delete_rows_raw_hamsterwheel(
-            cursor=mysql_connection.cursor(),
-            minutes=15,
+        write_watermark(
+            cursor=cursor,
+            last_id=new_last_id,
+            dialect=dialect,
+            variable=TURN_EVENT_WATERMARK_VARIABLE,
         )
+        cursor.close()
         mysql_connection.commit()
-        mysql_connection.close()
-    except Exception as e:
-        logger.error(f"Error connecting to MySQL: {e}")
-        mysql_connection.close()
+        n_turns += len(events.start_times)
+
+
+def read_sample_time(
+    mysql_connection: pymysql.connections.Connection,
+    raw_id: int,
+    dialect: str = "mysql",
+) -> Optional[datetime]:
+    """Return the sample time of the raw_hamsterwheel row with raw_id."""
+    qry = f"SELECT time FROM raw_hamsterwheel WHERE id = {PLACEHOLDERS[dialect]}"
+    cursor = mysql_connection.cursor()
+    cursor.execute(qry, (raw_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None:
+        return None
+    return pd.Timestamp(row[0]).to_pydatetime()
+
+
+def run_transform(
+    mysql_connection: pymysql.connections.Connection,
+    detector: Optional[TurnDetector] = None,
+    dialect: str = "mysql",
+) -> int:
+    """Transform the new raw rows, return the id of the last transformed row."""
+    n_turns = transform_turn_events(
+        mysql_connection=mysql_connection, dialect=dialect, detector=detector
+    )
+    if n_turns > 0:
+        logger.info(f"Stored {n_turns} new turn events.")
+    max_id = read_watermark(
+        mysql_connection=mysql_connection,
+        dialect=dialect,
+        variable=TURN_EVENT_WATERMARK_VARIABLE,
+    )
+    if STORE_CLOSED_SAMPLES:
+        n_rows = transform(mysql_connection=mysql_connection, dialect=dialect)
+        logger.info(f"Closed hamsterwheel updated from {n_rows} new raw rows.")
+        max_id = min(
+            max_id, read_watermark(mysql_connection=mysql_connection, dialect=dialect)
+        )
+    return max_id
+
+
+class TransformService:
+    """Resident transform that runs a micro-batch every interval seconds.
+
+    The connection and the turn detector are kept between batches. After
+    every batch the freshness lag is measured: the time between now and the
+    sensor time of the last transformed sample.
+    """
+
+    def __init__(
+        self,
+        connection_manager: ConnectionManager,
+        interval: float = SERVICE_INTERVAL,
+        retention_interval: float = RETENTION_INTERVAL,
+        report_interval: float = REPORT_INTERVAL,
+        now: Callable[[], datetime] = datetime.now,
+        clock: Callable[[], float] = time.monotonic,
+        dialect: str = "mysql",
+    ) -> None:
+        self.connection_manager = connection_manager
+        self.dialect = dialect
+        self.interval = interval
+        self.retention_interval = retention_interval
+        self.report_interval = report_interval
+        self.now = now
+        self.clock = clock
+        self.detector: Optional[TurnDetector] = None
+        self.batches = 0
+        self.failed_batches = 0
+        self.freshness_lag_seconds: Optional[float] = None
+        self.max_freshness_lag_seconds = 0.0
+        self._last_retention = clock()
+        self._last_report = clock()
+        self._stop_event = threading.Event()
+
+    def run_once(self) -> None:
+        """Run one micro-batch, and the retention when it is due."""
+        try:
+            mysql_connection = self.connection_manager.get_connection()
+            if self.detector is None:
+                self.detector = TurnDetector.from_state(
+                    read_control(
+                        mysql_connection=mysql_connection,
+                        variable=TURN_EVENT_STATE_VARIABLE,
+                        dialect=self.dialect,
+                    )
+                )
+            max_id = run_transform(
+                mysql_connection=mysql_connection,
+                detector=self.detector,
+                dialect=self.dialect,
+            )
+            sample_time = read_sample_time(
+                mysql_connection=mysql_connection, raw_id=max_id, dialect=self.dialect
+            )
+            if sample_time is not None:
+                self.freshness_lag_seconds = (self.now() - sample_time).total_seconds()
+                self.max_freshness_lag_seconds = max(
+                    self.max_freshness_lag_seconds, self.freshness_lag_seconds
+                )
+            if self.clock() - self._last_retention >= self.retention_interval:
+                self._last_retention = self.clock()
+                run_retention(
+                    mysql_connection=mysql_connection,
+                    table="raw_hamsterwheel",
+                    minutes=15,
+                    max_id=max_id,
+                    dialect=self.dialect,
+                )
+            self.batches += 1
+        except Exception as e:
+            logger.error(f"Error in transform batch: {e}")
+            self.failed_batches += 1
+            # The detector may be ahead of the rolled back state
+            self.detector = None
+            self.connection_manager.close()
+
+    def metrics(self) -> Dict[str, Optional[float]]:
+        """Batches run and failed and the current and maximum freshness lag."""
+        return {
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "freshness_lag_seconds": self.freshness_lag_seconds,
+            "max_freshness_lag_seconds": self.max_freshness_lag_seconds,
+        }
+
+    def run(self) -> None:
+        """Run micro-batches until stop() is called."""
+        while not self._stop_event.is_set():
+            start = self.clock()
+            self.run_once()
+            if self.clock() - self._last_report >= self.report_interval:
+                self._last_report = self.clock()
+                logger.info(f"Transform service: {self.metrics()}")
+                self.max_freshness_lag_seconds = 0.0
+            self._stop_event.wait(max(self.interval - (self.clock() - start), 0))
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Transform raw_hamsterwheel into turn events."
+    )
+    parser.add_argument(
+        "--service", action="store_true", help="Keep running micro-batches"
+    )
+    parser.add_argument("--interval", type=float, default=SERVICE_INTERVAL)
+    args = parser.parse_args()
+
+    connection_manager = ConnectionManager()
+    if args.service:
+        try:
+            TransformService(
+                connection_manager=connection_manager, interval=args.interval
+            ).run()
+        finally:
+            connection_manager.close()
+    else:
+        try:
+            mysql_connection = connection_manager.get_connection()
+            max_id = run_transform(mysql_connection=mysql_connection)
+            # Delete expired rows from raw_hamsterwheel that were transformed
+            run_retention(
+                mysql_connection=mysql_connection,
+                table="raw_hamsterwheel",
+                minutes=15,
+                max_id=max_id,
+            )
+        except Exception as e:
+            logger.error(f"Error connecting to MySQL: {e}")
+        finally:
+            connection_manager.close()
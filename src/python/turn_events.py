@@ -0,0 +1,132 @@
+"""
+Edge detection of hamsterwheel turns in the magnet sample stream.
+
+A turn starts when the magnet closes, i.e. at a 1 -> 0 transition. All closed
+samples of one slow pass over the magnet belong to the same turn. The turn
+event holds the start time, how long the magnet was closed and the RPM since
+the start of the turn before.
+"""
+
+import json
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+NO_TIME = np.datetime64("NaT", "us")
+
+
+class TurnEvents(NamedTuple):
+    """Completed turns as arrays: datetime64[us] start times, closed
+    durations in seconds and RPM (nan for the first turn seen)."""
+
+    start_times: np.ndarray
+    durations: np.ndarray
+    rpms: np.ndarray
+
+    def to_df(self) -> pd.DataFrame:
+        """Rows for the turn_event table, a missing RPM is None."""
+        return pd.DataFrame(
+            {
+                "start_time": pd.Series(self.start_times).dt.strftime(
+                    "%Y-%m-%d %H:%M:%S.%f"
+                ),
+                "duration": self.durations,
+                "rpm": pd.Series(self.rpms, dtype=object).where(
+                    ~np.isnan(self.rpms), None
+                ),
+            }
+        )
+
+
+def falling_edges(magnets: np.ndarray, previous_magnet: int = 1) -> np.ndarray:
+    """Return the indices of the samples where the magnet changes from 1 to 0.
+
+    previous_magnet is the sample before magnets[0], an open magnet by default,
+    so a closed first sample is a turn.
+    """
+    steps = np.diff(
+        np.asarray(magnets, dtype=np.int8), prepend=np.int8(previous_magnet)
+    )
+    return np.flatnonzero(steps < 0)
+
+
+class TurnDetector:
+    """Turn samples into turn events, batch after batch.
+
+    A turn is emitted once the magnet opens again, since only then its closed
+    duration is known. The state between batches is the last magnet value,
+    the start of the turn that is still closed, the start of the last turn and
+    the time of the last sample.
+    """
+
+    def __init__(self) -> None:
+        self.previous_magnet = 1
+        self.pending_start = NO_TIME
+        self.last_start = NO_TIME
+        self.last_time = NO_TIME
+        # Samples dropped for not being after the last processed sample
+        self.dropped = 0
+
+    def process(self, times: np.ndarray, magnets: np.ndarray) -> TurnEvents:
+        """Return the turns completed by the samples.
+
+        The samples are sorted by time. Samples at or before the last sample of
+        an earlier batch are dropped: they were processed already (e.g. read
+        again by a lookback) or arrived late, and would give negative periods.
+        The turns around late samples have to be detected again from all
+        samples of their time range (see redetect_turn_events()).
+        """
+        times = np.asarray(times, dtype="datetime64[us]")
+        magnets = np.asarray(magnets, dtype=np.int8)
+        if np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind="stable")
+            times, magnets = times[order], magnets[order]
+        if not np.isnat(self.last_time):
+            new = times > self.last_time
+            self.dropped += len(times) - int(np.count_nonzero(new))
+            times, magnets = times[new], magnets[new]
+        if len(magnets) == 0:
+            return TurnEvents(
+                start_times=times, durations=np.array([]), rpms=np.array([])
+            )
+        steps = np.diff(magnets, prepend=np.int8(self.previous_magnet))
+        starts = times[steps < 0]
+        ends = times[steps > 0]
+        if self.previous_magnet == 0:
+            # The first opening ends the turn that started in an earlier batch
+            starts = np.concatenate([[self.pending_start], starts])
+        complete = starts[: len(ends)]
+        self.pending_start = starts[len(ends)] if len(starts) > len(ends) else NO_TIME
+        self.previous_magnet = int(magnets[-1])
+        self.last_time = times[-1]
+
+        durations = (ends - complete) / np.timedelta64(1, "s")
+        periods = np.diff(np.concatenate([[self.last_start], complete]))
+        rpms = 60 / (periods / np.timedelta64(1, "s"))
+        if len(complete) > 0:
+            self.last_start = complete[-1]
+        return TurnEvents(start_times=complete, durations=durations, rpms=rpms)
+
+    def to_state(self) -> str:
+        """Serialize the state between batches, e.g. to the control table."""
+        return json.dumps(
+            {
+                "previous_magnet": self.previous_magnet,
+                "pending_start": str(self.pending_start),
+                "last_start": str(self.last_start),
+                "last_time": str(self.last_time),
+            }
+        )
+
+    @classmethod
+    def from_state(cls, state: Optional[str]) -> "TurnDetector":
+        detector = cls()
+        if state:
+            values = json.loads(state)
+            detector.previous_magnet = values["previous_magnet"]
+            detector.pending_start = np.datetime64(values["pending_start"], "us")
+            detector.last_start = np.datetime64(values["last_start"], "us")
+            # States saved before last_time was kept have none
+            detector.last_time = np.datetime64(values.get("last_time", "NaT"), "us")
+        return detector
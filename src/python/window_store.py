@@ -0,0 +1,199 @@
+"""
+Columnar in-memory window of the latest wheel samples for the main loop.
+
+The samples are kept in time order in numpy arrays (datetime64 times, uint8
+magnets) together with two prefix sums: the closed samples (magnet 0) and the
+turns (falling edges of the magnet, see turn_events.falling_edges) up to every
+sample. The number of turns between two times is then two searchsorted calls
+and a subtraction, and "was the magnet closed in the last seconds" is the same
+on the closed samples.
+
+The arrays have room for twice the capacity. When they are full, the latest
+capacity samples are moved to the front, so appending stays amortized O(1)
+and the window is always one contiguous, sorted slice.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from repository import Repository
+from turn_events import falling_edges
+
+# The sensor logs about once per second (see notifications.RunningStarts)
+SAMPLE_RATE_HZ = 1
+# Decisions further back than the window count their turns from the database
+WINDOW_SECONDS = 3600
+# One window of samples, with room for twice the sample rate
+CAPACITY = 2 * SAMPLE_RATE_HZ * WINDOW_SECONDS
+RUNNING_SECONDS = 5
+
+
+class WindowStore:
+    def __init__(self, capacity: int = CAPACITY) -> None:
+        self.capacity = capacity
+        self.times = np.empty(2 * capacity, dtype="datetime64[ns]")
+        self.magnets = np.empty(2 * capacity, dtype=np.uint8)
+        # Closed samples and turns up to and including every sample
+        self.closed = np.empty(2 * capacity, dtype=np.int64)
+        self.turns = np.empty(2 * capacity, dtype=np.int64)
+        self._size = 0
+        # The counts of the samples that were dropped from the window
+        self._closed_before = 0
+        self._turns_before = 0
+        self._last_magnet = 1
+        # The magnet of the last dropped sample, before the first in the window
+        self._magnet_before = 1
+        self._dropped = False
+        # Late samples older than the window, which they cannot be merged into
+        self.late_dropped = 0
+        self.last_id = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def first_time(self) -> Optional[np.datetime64]:
+        return self.times[0] if self._size > 0 else None
+
+    @property
+    def last_time(self) -> Optional[np.datetime64]:
+        return self.times[self._size - 1] if self._size > 0 else None
+
+    def _compact(self, n_new: int) -> None:
+        """Drop the oldest samples so that n_new more fit."""
+        keep = min(self._size, self.capacity - n_new)
+        drop = self._size - keep
+        if drop == 0:
+            return
+        self._closed_before = int(self.closed[drop - 1])
+        self._turns_before = int(self.turns[drop - 1])
+        self._magnet_before = int(self.magnets[drop - 1])
+        for array in [self.times, self.magnets, self.closed, self.turns]:
+            array[:keep] = array[drop : self._size]
+        self._size = keep
+        self._dropped = True
+
+    def append(self, times: np.ndarray, magnets: np.ndarray) -> None:
+        """Add samples in any order. Samples before the last one, e.g. drained
+        from the logger's spool, are merged in and the counts after them
+        recomputed. Samples older than the window are dropped."""
+        times = np.asarray(times, dtype="datetime64[ns]")
+        magnets = np.asarray(magnets, dtype=np.uint8)
+        if len(times) == 0:
+            return
+        if np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind="stable")
+            times, magnets = times[order], magnets[order]
+        if self._size > 0 and times[0] < self.last_time:
+            self._merge(times, magnets)
+            return
+        if len(times) > self.capacity:
+            # Compacting makes room for at most capacity samples at once
+            for start in range(0, len(times), self.capacity):
+                end = start + self.capacity
+                self._append_sorted(times[start:end], magnets[start:end])
+            return
+        self._append_sorted(times, magnets)
+
+    def _merge(self, times: np.ndarray, magnets: np.ndarray) -> None:
+        """Merge sorted samples that start before the last one into the window."""
+        if self._dropped:
+            in_window = times >= self.first_time
+            self.late_dropped += len(times) - int(np.count_nonzero(in_window))
+            times, magnets = times[in_window], magnets[in_window]
+            if len(times) == 0:
+                return
+        # Cut the window before the first new sample and append the merged rest
+        start = int(np.searchsorted(self.times[: self._size], times[0], "right"))
+        merged_times = np.concatenate([self.times[start : self._size], times])
+        merged_magnets = np.concatenate([self.magnets[start : self._size], magnets])
+        order = np.argsort(merged_times, kind="stable")
+        self._size = start
+        self._last_magnet = (
+            int(self.magnets[start - 1]) if start > 0 else self._magnet_before
+        )
+        self.append(merged_times[order], merged_magnets[order])
+
+    def _append_sorted(self, times: np.ndarray, magnets: np.ndarray) -> None:
+        """Append at most capacity samples in time order after the last one."""
+        n = len(times)
+        if self._size + n > len(self.times):
+            self._compact(n)
+        start, end = self._size, self._size + n
+        closed_total = self.closed[start - 1] if start > 0 else self._closed_before
+        turns_total = self.turns[start - 1] if start > 0 else self._turns_before
+        edges = np.zeros(n, dtype=np.int64)
+        edges[falling_edges(magnets, previous_magnet=self._last_magnet)] = 1
+        self.times[start:end] = times
+        self.magnets[start:end] = magnets
+        self.closed[start:end] = closed_total + np.cumsum(magnets == 0)
+        self.turns[start:end] = turns_total + np.cumsum(edges)
+        self._size = end
+        self._last_magnet = int(magnets[-1])
+
+    def append_df(self, df: pd.DataFrame) -> None:
+        """Append rows read from raw_hamsterwheel (id, time, magnet), ordered by id."""
+        if len(df) == 0:
+            return
+        self.append(
+            pd.to_datetime(df["time"]).values, df["magnet"].to_numpy(dtype=np.uint8)
+        )
+        self.last_id = int(df["id"].values[-1])
+
+    def sync(self, repository: Repository) -> None:
+        """Append the samples logged since the last sync."""
+        self.append_df(repository.hamsterwheel_after(self.last_id))
+
+    def covers(self, start_time: Any) -> bool:
+        """Whether the window holds all samples from start_time on."""
+        if self._size == 0:
+            return False
+        # Without dropped samples, the window holds all samples ever read
+        if not self._dropped:
+            return True
+        return pd.Timestamp(start_time).to_datetime64() >= self.first_time
+
+    def _count_until(self, counts: np.ndarray, before: int, index: int) -> int:
+        """The count of the samples before index."""
+        return int(counts[index - 1]) if index > 0 else before
+
+    def _count_between(
+        self, counts: np.ndarray, before: int, start_time: Any, end_time: Any
+    ) -> int:
+        times = self.times[: self._size]
+        start = np.searchsorted(times, pd.Timestamp(start_time).to_datetime64(), "left")
+        end = np.searchsorted(times, pd.Timestamp(end_time).to_datetime64(), "right")
+        return self._count_until(counts, before, end) - self._count_until(
+            counts, before, start
+        )
+
+    def turns_between(self, start_time: Any, end_time: Any) -> int:
+        """The number of turns with start_time <= time <= end_time."""
+        return self._count_between(self.turns, self._turns_before, start_time, end_time)
+
+    def closed_between(self, start_time: Any, end_time: Any) -> int:
+        """The number of closed samples with start_time <= time <= end_time."""
+        return self._count_between(
+            self.closed, self._closed_before, start_time, end_time
+        )
+
+    def running_until(self, seconds: int = RUNNING_SECONDS) -> Optional[pd.Timestamp]:
+        """The time is_running() turns False without new closed samples, None
+        without closed samples in the window."""
+        if self._size == 0 or self.closed[self._size - 1] == self._closed_before:
+            return None
+        # The last closed sample is the first one with the final count
+        last_closed = np.searchsorted(
+            self.closed[: self._size], self.closed[self._size - 1], "left"
+        )
+        return pd.Timestamp(self.times[last_closed]) + timedelta(seconds=seconds)
+
+    def is_running(self, now: datetime, seconds: int = RUNNING_SECONDS) -> bool:
+        """Whether the magnet was closed in the last seconds, like
+        main.is_hamsterwheel_running() on the samples of the last seconds."""
+        since = pd.Timestamp(now) - timedelta(seconds=seconds)
+        # Like the repository query (time > since), since itself is excluded
+        return self.closed_between(since + pd.Timedelta(1, "ns"), now) > 0
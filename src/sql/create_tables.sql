@@ -1,15 +1,57 @@
 CREATE TABLE raw_hamsterwheel(
     id INT NOT NULL AUTO_INCREMENT,
+    hash VARCHAR(255) NOT NULL,
     time TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP NOT NULL,
     magnet TINYINT(1) NOT NULL,
-    PRIMARY KEY ( id )
+    PRIMARY KEY ( id ),
+    UNIQUE KEY ( hash ),
+    INDEX ( time )
 );
 
 CREATE TABLE closed_hamsterwheel(
     id INT NOT NULL AUTO_INCREMENT,
+    hash VARCHAR(255) NOT NULL,
     time TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP NOT NULL,
     magnet TINYINT(1) NOT NULL,
-    PRIMARY KEY ( id )
+    PRIMARY KEY ( id ),
+    UNIQUE KEY ( hash ),
+    INDEX ( time )
+);
+
+CREATE TABLE turn_event(
+    id INT NOT NULL AUTO_INCREMENT,
+    start_time TIMESTAMP(6) NOT NULL,
+    duration FLOAT NOT NULL,
+    rpm FLOAT,
+    PRIMARY KEY ( id ),
+    UNIQUE KEY ( start_time )
+);
+
+CREATE TABLE turn_rollup_second(
+    wheel INT NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    turns INT NOT NULL,
+    active_seconds INT NOT NULL,
+    max_rpm FLOAT,
+    PRIMARY KEY ( wheel, bucket_start )
+);
+
+CREATE TABLE turn_rollup_minute(
+    wheel INT NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    turns INT NOT NULL,
+    active_seconds INT NOT NULL,
+    max_rpm FLOAT,
+    PRIMARY KEY ( wheel, bucket_start )
+);
+
+CREATE TABLE turn_rollup_hour(
+    wheel INT NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    turns INT NOT NULL,
+    active_seconds INT NOT NULL,
+    max_rpm FLOAT,
+    PRIMARY KEY ( wheel, bucket_start )
 );
 
 CREATE TABLE log(
@@ -19,6 +61,14 @@ CREATE TABLE log(
     PRIMARY KEY ( id )
 );
 
+CREATE TABLE control(
+    id INT NOT NULL AUTO_INCREMENT,
+    variable VARCHAR(100) NOT NULL,
+    state VARCHAR(255),
+    PRIMARY KEY ( id ),
+    UNIQUE KEY ( variable )
+);
+
 CREATE TABLE wallet(
     id INT NOT NULL AUTO_INCREMENT,
     currency_symbol VARCHAR(50) NOT NULL,
@@ -44,6 +94,7 @@ CREATE TABLE orderbook(
     type VARCHAR(50) NOT NULL,
     state VARCHAR(50) NOT NULL,
     PRIMARY KEY ( id ),
+    INDEX ( state ),
     FOREIGN KEY ( wallet_id ) REFERENCES wallet( id )
 );
 
@@ -55,5 +106,6 @@ CREATE TABLE decision(
     type VARCHAR(50) NOT NULL,
     status VARCHAR(100),
     result VARCHAR(50),
-    PRIMARY KEY ( id )
+    PRIMARY KEY ( id ),
+    INDEX ( start_time )
 );
\ No newline at end of file